@@ -26,7 +26,8 @@ from app.models import User, LeaderboardEntry, ActiveGame
 
 target_metadata = Base.metadata
 
-config.set_main_option("sqlalchemy.url", DATABASE_URL)
+# Callers (e.g. tests) can point migrations elsewhere via config.attributes
+config.set_main_option("sqlalchemy.url", config.attributes.get("database_url", DATABASE_URL))
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
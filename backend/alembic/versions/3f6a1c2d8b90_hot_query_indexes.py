@@ -0,0 +1,49 @@
+"""Composite indexes for the hot query shapes
+
+Revision ID: 3f6a1c2d8b90
+Revises: 90917fa5dc0f
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a1c2d8b90'
+down_revision: Union[str, Sequence[str], None] = '90917fa5dc0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Each index matches an ORDER BY in crud.py column for column, so the
+    # leaderboard reads are index range scans with no sort step.
+    # crud.get_leaderboard with a game mode
+    op.create_index(
+        "ix_leaderboard_mode_score", "leaderboard",
+        ["game_mode", sa.text("score DESC"), "date", "id"], if_not_exists=True,
+    )
+    # crud.get_leaderboard across all modes
+    op.create_index(
+        "ix_leaderboard_score", "leaderboard",
+        [sa.text("score DESC"), "date", "id"], if_not_exists=True,
+    )
+    # crud.get_best_entry
+    op.create_index(
+        "ix_leaderboard_user_mode_score", "leaderboard",
+        ["username", "game_mode", sa.text("score DESC"), "date", "id"], if_not_exists=True,
+    )
+    # crud.list_games_by_status
+    op.create_index("ix_active_games_status", "active_games", ["status"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_active_games_status", table_name="active_games")
+    op.drop_index("ix_leaderboard_user_mode_score", table_name="leaderboard")
+    op.drop_index("ix_leaderboard_score", table_name="leaderboard")
+    op.drop_index("ix_leaderboard_mode_score", table_name="leaderboard")
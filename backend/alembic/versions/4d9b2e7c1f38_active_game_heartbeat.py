@@ -0,0 +1,31 @@
+"""Active game heartbeat
+
+Revision ID: 4d9b2e7c1f38
+Revises: e1a8c4f09b27
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d9b2e7c1f38'
+down_revision: Union[str, Sequence[str], None] = 'e1a8c4f09b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("active_games", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+    # Existing rows count as last seen when they started; abandoned ones are
+    # then evicted on the reaper's first run
+    op.execute("UPDATE active_games SET heartbeat_at = started_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("active_games", "heartbeat_at")
@@ -0,0 +1,82 @@
+"""Personal bests and day/week leaderboard rollups
+
+Revision ID: 7c2e9a41d5b3
+Revises: 3f6a1c2d8b90
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a41d5b3'
+down_revision: Union[str, Sequence[str], None] = '3f6a1c2d8b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "personal_bests",
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("game_mode", sa.String(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("entry_id", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("username", "game_mode"),
+    )
+    op.create_index("ix_personal_bests_mode_score", "personal_bests",
+                    ["game_mode", sa.text("score DESC"), "date", "entry_id"])
+    op.create_index("ix_personal_bests_score", "personal_bests",
+                    [sa.text("score DESC"), "date", "entry_id"])
+
+    op.create_table(
+        "leaderboard_rollups",
+        sa.Column("period", sa.String(), nullable=False),
+        sa.Column("period_start", sa.DateTime(), nullable=False),
+        sa.Column("game_mode", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("entry_id", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("period", "period_start", "game_mode", "username"),
+    )
+    op.create_index("ix_rollups_mode_score", "leaderboard_rollups",
+                    ["period", "period_start", "game_mode", sa.text("score DESC"), "date", "entry_id"])
+    op.create_index("ix_rollups_score", "leaderboard_rollups",
+                    ["period", "period_start", sa.text("score DESC"), "date", "entry_id"])
+
+    op.create_table(
+        "rollup_state",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("watermark", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+    # Backfill personal bests from the score log. Rollups backfill themselves:
+    # the job starts with no watermark and reads everything once.
+    op.execute("""
+        INSERT INTO personal_bests (username, game_mode, score, date, entry_id)
+        SELECT username, game_mode, score, date, id FROM (
+            SELECT username, game_mode, score, date, id,
+                   ROW_NUMBER() OVER (PARTITION BY username, game_mode
+                                      ORDER BY score DESC, date, id) AS pos
+            FROM leaderboard
+        ) ranked
+        WHERE pos = 1
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("rollup_state")
+    op.drop_index("ix_rollups_score", table_name="leaderboard_rollups")
+    op.drop_index("ix_rollups_mode_score", table_name="leaderboard_rollups")
+    op.drop_table("leaderboard_rollups")
+    op.drop_index("ix_personal_bests_score", table_name="personal_bests")
+    op.drop_index("ix_personal_bests_mode_score", table_name="personal_bests")
+    op.drop_table("personal_bests")
@@ -20,13 +20,56 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # Databases created before migrations existed already have these tables
+    # (from Base.metadata.create_all); adopt them instead of failing.
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "leaderboard" not in existing:
+        op.create_table(
+            "leaderboard",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("score", sa.Integer(), nullable=False),
+            sa.Column("game_mode", sa.String(), nullable=False),
+            sa.Column("date", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_leaderboard_username", "leaderboard", ["username"], unique=False)
+
+    if "active_games" not in existing:
+        op.create_table(
+            "active_games",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("score", sa.Integer(), nullable=True),
+            sa.Column("game_mode", sa.String(), nullable=False),
+            sa.Column("snake", sa.JSON(), nullable=False),
+            sa.Column("food", sa.JSON(), nullable=False),
+            sa.Column("direction", sa.String(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_table("active_games")
+    op.drop_index("ix_leaderboard_username", table_name="leaderboard")
+    op.drop_table("leaderboard")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_table("users")
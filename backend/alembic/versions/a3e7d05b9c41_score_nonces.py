@@ -0,0 +1,52 @@
+"""Spend score nonces once and refuse resubmitted input logs
+
+Revision ID: a3e7d05b9c41
+Revises: c8f35a9e0d12
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e7d05b9c41'
+down_revision: Union[str, Sequence[str], None] = 'c8f35a9e0d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("score_verifications", sa.Column("nonce", sa.String(), nullable=True))
+    op.add_column("score_verifications", sa.Column("proof_hash", sa.String(), nullable=True))
+
+    # Same hash as crud.proof_hash. Earlier resubmissions of one log keep
+    # their rows but only the oldest gets a hash, so the index can be built.
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, username, seed, inputs FROM score_verifications ORDER BY created_at"))
+    seen, updates = set(), []
+    for id, username, seed, inputs in rows:
+        inputs = json.loads(inputs) if isinstance(inputs, str) else inputs
+        proof = hashlib.sha256(json.dumps([seed, inputs], separators=(",", ":")).encode()).hexdigest()
+        if (username, proof) not in seen:
+            seen.add((username, proof))
+            updates.append({"id": id, "proof": proof})
+    if updates:
+        bind.execute(sa.text("UPDATE score_verifications SET proof_hash = :proof WHERE id = :id"), updates)
+
+    op.create_index("ux_score_verifications_nonce", "score_verifications", ["nonce"], unique=True)
+    op.create_index("ux_score_verifications_proof", "score_verifications", ["username", "proof_hash"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ux_score_verifications_proof", table_name="score_verifications")
+    op.drop_index("ux_score_verifications_nonce", table_name="score_verifications")
+    with op.batch_alter_table("score_verifications") as batch:
+        batch.drop_column("proof_hash")
+        batch.drop_column("nonce")
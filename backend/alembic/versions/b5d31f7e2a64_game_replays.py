@@ -0,0 +1,39 @@
+"""Game replay logs
+
+Revision ID: b5d31f7e2a64
+Revises: 7c2e9a41d5b3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d31f7e2a64'
+down_revision: Union[str, Sequence[str], None] = '7c2e9a41d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "game_replays",
+        sa.Column("game_id", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("game_mode", sa.String(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("game_id"),
+    )
+    op.create_index(op.f("ix_game_replays_username"), "game_replays", ["username"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_game_replays_username"), table_name="game_replays")
+    op.drop_table("game_replays")
@@ -0,0 +1,74 @@
+"""Store user, leaderboard and verification ids in 16 bytes
+
+Revision ID: c8f35a9e0d12
+Revises: 4d9b2e7c1f38
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f35a9e0d12'
+down_revision: Union[str, Sequence[str], None] = '4d9b2e7c1f38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every column holding a users / leaderboard / score_verifications id
+# (models.BinaryId). active_games and game_replays keep text game ids.
+COLUMNS = [
+    ("users", "id"),
+    ("leaderboard", "id"),
+    ("personal_bests", "entry_id"),
+    ("leaderboard_rollups", "entry_id"),
+    ("score_verifications", "id"),
+    ("score_verifications", "entry_id"),
+]
+
+
+def _retype_sqlite(table: str, column: str, convert, type_, existing_type) -> None:
+    # SQLite has no uuid type, and no unhex() before 3.41: convert the values
+    # here, then let batch mode rebuild the table with the new column type.
+    # Batch mode would rebuild the score DESC indexes as ascending ones, so
+    # they are dropped first and recreated from their original SQL.
+    bind = op.get_bind()
+    values = [row[0] for row in bind.execute(sa.text(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL"))]
+    if values:
+        bind.execute(sa.text(f"UPDATE {table} SET {column} = :new WHERE {column} = :old"),
+                     [{"old": v, "new": convert(v)} for v in values])
+    indexes = bind.execute(sa.text("SELECT name, sql FROM sqlite_master "
+                                   "WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+                           {"table": table}).all()
+    for name, _ in indexes:
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table(table) as batch:
+        batch.alter_column(column, type_=type_, existing_type=existing_type)
+    for _, sql in indexes:
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    postgres = op.get_bind().dialect.name == "postgresql"
+    for table, column in COLUMNS:
+        if postgres:
+            op.alter_column(table, column, type_=postgresql.UUID(as_uuid=False), existing_type=sa.String(),
+                            postgresql_using=f"{column}::uuid")
+            continue
+        _retype_sqlite(table, column, lambda v: uuid.UUID(v).bytes, sa.LargeBinary(16), sa.String())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    postgres = op.get_bind().dialect.name == "postgresql"
+    for table, column in reversed(COLUMNS):
+        if postgres:
+            op.alter_column(table, column, type_=sa.String(), existing_type=postgresql.UUID(as_uuid=False),
+                            postgresql_using=f"{column}::text")
+            continue
+        _retype_sqlite(table, column, lambda v: str(uuid.UUID(bytes=v)), sa.String(), sa.LargeBinary(16))
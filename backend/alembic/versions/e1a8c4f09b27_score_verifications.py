@@ -0,0 +1,47 @@
+"""Score verification queue
+
+Revision ID: e1a8c4f09b27
+Revises: b5d31f7e2a64
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a8c4f09b27'
+down_revision: Union[str, Sequence[str], None] = 'b5d31f7e2a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "score_verifications",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("game_mode", sa.String(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("seed", sa.Integer(), nullable=False),
+        sa.Column("inputs", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.Column("ticks", sa.Integer(), nullable=True),
+        sa.Column("entry_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("verified_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_score_verifications_username"), "score_verifications", ["username"], unique=False)
+    op.create_index(op.f("ix_score_verifications_status"), "score_verifications", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_score_verifications_status"), table_name="score_verifications")
+    op.drop_index(op.f("ix_score_verifications_username"), table_name="score_verifications")
+    op.drop_table("score_verifications")
@@ -3,12 +3,13 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-import bcrypt
-import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas import User, AuthCredentials, AuthResponse
 from app.database import get_db
+from app.ids import new_id
+from app.user_cache import user_cache
+from app.hashing import password_hasher, HasherBusy
 import app.crud as crud
 
 
@@ -21,12 +22,25 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def verify_password(plain_password, hashed_password):
-    # keys are stored as strings in mock db, bcrypt needs bytes
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+def hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
-def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# bcrypt runs on the hasher's thread pool, never on the event loop
+async def verify_password(plain_password, hashed_password):
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise hasher_busy_exception()
+
+async def get_password_hash(password):
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise hasher_busy_exception()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -38,23 +52,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> Optional[str]:
+    # Username from a valid, unexpired token, else None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
-    user = await crud.get_user_by_username(db, username)
+        return None
+    return payload.get("sub")
+
+async def get_token_username(token: str = Depends(oauth2_scheme)) -> str:
+    # Claims-only authentication: a valid, unexpired signature is trusted
+    # without looking the user up. Only for endpoints that neither read nor
+    # change anything belonging to the user.
+    username = decode_token(token)
+    if username is None:
+        raise credentials_exception()
+    return username
+
+async def get_current_user(username: str = Depends(get_token_username), db: AsyncSession = Depends(get_db)) -> User:
+    async def load():
+        row = await crud.get_user_by_username(db, username)
+        return User.model_validate(row) if row is not None else None
+
+    # Served from the in-process user cache; the DB is only hit on a miss
+    user = await user_cache.get_or_load(username, load)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
 
 @router.post("/login", response_model=AuthResponse)
@@ -70,7 +100,7 @@ async def login(credentials: AuthCredentials, db: AsyncSession = Depends(get_db)
         )
     
     stored_hash = await crud.get_password_hash(db, credentials.email)
-    if not verify_password(credentials.password, stored_hash):
+    if not await verify_password(credentials.password, stored_hash):
          raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -90,12 +120,12 @@ async def signup(credentials: AuthCredentials, db: AsyncSession = Depends(get_db
         
     try:
         new_user = User(
-            id=str(uuid.uuid4()),
+            id=new_id(),
             username=credentials.username,
             email=credentials.email,
             createdAt=datetime.now(timezone.utc)
         )
-        hashed_pw = get_password_hash(credentials.password)
+        hashed_pw = await get_password_hash(credentials.password)
         await crud.create_user(db, new_user, hashed_pw)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -107,7 +137,7 @@ async def signup(credentials: AuthCredentials, db: AsyncSession = Depends(get_db
     return AuthResponse(user=new_user, token=access_token)
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(username: str = Depends(get_token_username)):
     # Stateless JWT logout is handled on client side usually by discarding token.
     return {"description": "Successfully logged out"}
 
@@ -1,33 +1,236 @@
-from datetime import datetime, timezone
-from typing import List, Optional
+import base64
+import json
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas import LeaderboardEntry, User, GameMode, ScoreSubmission
-from app.api.auth import get_current_user
+from app.schemas import (LeaderboardEntry, User, GameMode, ScoreSubmission, ScoreVerification, ScoreBatch,
+                         ScoreBatchResult, ScoreSeed)
+from app.api.auth import ALGORITHM, SECRET_KEY, create_access_token, get_current_user, get_token_username
 from app.database import get_db
+from app.leaderboard_cache import leaderboard_cache, make_etag
+from app.leaderboard_stream import leaderboard_feed, STREAM_MAX_TOP
+from app.ranking import ALL_MODES, rankings
+from app.rollups import period_start
+from app.serialization import dumps, leaderboard_entries
+from app.sse import event_stream
+from app.verification import score_verifier, VerifierBusy, REQUIRE_VERIFIED_SCORES, SEED_TTL
 import app.crud as crud
-import uuid
+from app.ids import is_id, new_id
 
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
+MAX_PAGE_SIZE = 100
+
+ENTRIES = TypeAdapter(List[LeaderboardEntry])
+
+def encode_cursor(entry) -> str:
+    raw = json.dumps([entry.score, entry.date.isoformat(), entry.id, entry.rank])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        score, date, id, rank = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not is_id(id):
+            raise ValueError(id)
+        return (int(score), datetime.fromisoformat(date), id), int(rank)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def respond(request: Request, body: bytes, etag: str, next_cursor: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("", response_model=List[LeaderboardEntry])
-async def get_leaderboard(gameMode: Optional[GameMode] = None, db: AsyncSession = Depends(get_db)):
-    return await crud.get_leaderboard(db, game_mode=gameMode)
+async def get_leaderboard(
+    request: Request,
+    gameMode: Optional[GameMode] = None,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    username: Optional[str] = None,
+    since: Optional[datetime] = None,
+    period: Literal["day", "week", "all"] = "all",
+    distinct: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    # cursor:   X-Next-Cursor from the previous page (keyset pagination)
+    # username: that player's best entry with up to limit // 2 rows either side
+    # since:    only scores on or after this time
+    # period/distinct: one row per player, served from the personal-best
+    #           (period=all) and day/week rollup tables instead of raw scores
+    mode = gameMode.value if gameMode else None
+    if period != "all" or distinct:
+        if username or since:
+            raise HTTPException(status_code=400, detail="username and since apply to raw scores only")
+        after, start_rank = decode_cursor(cursor) if cursor else (None, 0)
+        if period == "all":
+            entries = await crud.get_personal_bests(db, limit, mode, after, start_rank)
+        else:
+            start = period_start(period, datetime.now(timezone.utc))
+            entries = await crud.get_rollup(db, period, start, limit, mode, after, start_rank)
+        next_cursor = encode_cursor(entries[-1]) if len(entries) == limit else None
+        body = ENTRIES.dump_json(entries, by_alias=True)
+        return respond(request, body, make_etag(body), next_cursor)
+
+    cacheable = cursor is None and username is None and since is None
+    if cacheable:
+        page = leaderboard_cache.get(mode, limit)
+        if page is not None:
+            return respond(request, page.body, page.etag, page.next_cursor)
+
+    next_cursor = None
+    if username:
+        best = await crud.get_best_entry(db, username, mode, since)
+        if best is None:
+            raise HTTPException(status_code=404, detail="No scores for this player")
+        rank = rankings.index(mode).rank(best.id) if since is None else None
+        if rank is None:
+            rank = await crud.count_better(db, best, mode, since) + 1
+        entries = await crud.get_leaderboard_around(db, best, rank, limit // 2, mode, since)
+    else:
+        after, start_rank = decode_cursor(cursor) if cursor else (None, 0)
+        entries = await crud.get_leaderboard(db, limit=limit, game_mode=mode, after=after, start_rank=start_rank, since=since)
+        if len(entries) == limit:
+            next_cursor = encode_cursor(entries[-1])
+
+    body = dumps(leaderboard_entries(entries))
+    if cacheable:
+        page = leaderboard_cache.put(mode, limit, body, entries, next_cursor)
+        return respond(request, body, page.etag, next_cursor)
+    return respond(request, body, make_etag(body), next_cursor)
+
+@router.get("/stream")
+async def stream_leaderboard(request: Request, gameMode: Optional[GameMode] = None,
+                             limit: int = Query(10, ge=1, le=STREAM_MAX_TOP)):
+    # SSE: the current top `limit` once, then a change event each time a new
+    # score enters it (app/leaderboard_stream.py). Instead of polling
+    # GET /leaderboard. Reconnecting starts again with a snapshot.
+    listener = leaderboard_feed.subscribe(gameMode.value if gameMode else ALL_MODES, limit)
+
+    return event_stream(request, listener.get, listener.close)
 
-@router.post("/score", response_model=LeaderboardEntry)
+def new_seed() -> int:
+    return secrets.randbelow(0x80000000)
+
+def claim_seed(submission: ScoreSubmission, username: str) -> Tuple[int, str]:
+    # (seed, nonce id) of the submission's nonce, ValueError if it is not this
+    # player's or has expired. The nonce id is spent by create_verification.
+    try:
+        claims = jwt.decode(submission.nonce, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise ValueError("Invalid or expired nonce")
+    if claims.get("typ") != "seed" or claims.get("sub") != username:
+        raise ValueError("Invalid or expired nonce")
+    if submission.seed is not None and submission.seed != claims["seed"]:
+        raise ValueError("seed does not match the nonce")
+    return claims["seed"], claims["jti"]
+
+@router.post("/seed", response_model=ScoreSeed)
+async def issue_seed(username: str = Depends(get_token_username)):
+    # The seed for a game whose score will be verified. The client cannot
+    # pick it, and its nonce is good for one submission, so a replay that
+    # verified once cannot be sent again.
+    seed = new_seed()
+    nonce = create_access_token({"sub": username, "typ": "seed", "seed": seed, "jti": new_id()},
+                                expires_delta=timedelta(seconds=SEED_TTL))
+    return ScoreSeed(seed=seed, nonce=nonce, expiresIn=SEED_TTL)
+
+@router.post("/score", response_model=LeaderboardEntry, responses={202: {"model": ScoreVerification}})
 async def submit_score(submission: ScoreSubmission, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if submission.inputLog is not None:
+        # Verified path: 202 now, the entry appears once a replay of the
+        # input log reproduces the score. Poll GET /score/{id} for the outcome.
+        try:
+            seed, nonce = claim_seed(submission, current_user.username)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            score_verifier.check_capacity()
+        except VerifierBusy:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many scores awaiting verification, try again shortly",
+                                headers={"Retry-After": "1"})
+        try:
+            row = await crud.create_verification(db, current_user.username, submission, seed, nonce)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        score_verifier.submit(row)
+        body = ScoreVerification.model_validate(row).model_dump(mode="json", by_alias=True)
+        return JSONResponse(body, status_code=status.HTTP_202_ACCEPTED)
+    if REQUIRE_VERIFIED_SCORES:
+        raise HTTPException(status_code=422, detail="Scores must come with nonce and inputLog")
+
     entry = LeaderboardEntry(
-        id=str(uuid.uuid4()),
-        rank=0, # Will be updated by crud
+        id=new_id(),
+        rank=0, # Filled in from the rank index below
         username=current_user.username,
         score=submission.score,
         gameMode=submission.gameMode,
         date=datetime.now(timezone.utc)
     )
-    await crud.add_score(db, entry)
-    # The rank is not updated in the object returned here unless we refetch or calc it.
-    # crud.add_score doesn't calculate rank for the single entry returned.
-    # But schema requires rank. 0 is fine if we accept it.
+    entry.rank = await crud.add_score(db, entry)
     return entry
+
+def describe(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'item'}: {e['msg']}" for e in error.errors())
+
+@router.post("/scores:batch", response_model=List[ScoreBatchResult])
+async def submit_scores(batch: ScoreBatch, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # A client's offline backlog in one request: one token check and user
+    # lookup, then every plain score goes in with a single INSERT
+    # (crud.add_scores). Scores with an inputLog are queued for verification
+    # as in POST /score. Each item gets a result at its index: accepted (with
+    # its global rank), pending or rejected.
+    results: List[Optional[ScoreBatchResult]] = [None] * len(batch.scores)
+    plain, verified = [], []
+    now = datetime.now(timezone.utc)
+    for i, item in enumerate(batch.scores):
+        try:
+            submission = ScoreSubmission.model_validate(item)
+        except ValidationError as e:
+            results[i] = ScoreBatchResult(index=i, status="rejected", reason=describe(e))
+            continue
+        if submission.inputLog is not None:
+            verified.append((i, submission))
+        elif REQUIRE_VERIFIED_SCORES:
+            results[i] = ScoreBatchResult(index=i, status="rejected", reason="Scores must come with nonce and inputLog")
+        else:
+            plain.append((i, LeaderboardEntry(id=new_id(), username=current_user.username,
+                                              score=submission.score, gameMode=submission.gameMode, date=now)))
+
+    ranks = await crud.add_scores(db, [entry for _, entry in plain])
+    for (i, entry), rank in zip(plain, ranks):
+        entry.rank = rank
+        results[i] = ScoreBatchResult(index=i, status="accepted", entry=entry)
+
+    for i, submission in verified:
+        try:
+            seed, nonce = claim_seed(submission, current_user.username)
+            score_verifier.check_capacity()
+            row = await crud.create_verification(db, current_user.username, submission, seed, nonce)
+        except ValueError as e:
+            results[i] = ScoreBatchResult(index=i, status="rejected", reason=str(e))
+            continue
+        except VerifierBusy:
+            results[i] = ScoreBatchResult(index=i, status="rejected", reason="Verification queue full, retry shortly")
+            continue
+        score_verifier.submit(row)
+        results[i] = ScoreBatchResult(index=i, status="pending", verification=ScoreVerification.model_validate(row))
+    return results
+
+@router.get("/score/{id}", response_model=ScoreVerification)
+async def get_score_verification(id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    row = await crud.get_verification(db, id) if is_id(id) else None
+    if row is None or row.username != current_user.username:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return row
@@ -1,50 +1,294 @@
 import asyncio
+import base64
 import json
-from typing import List
+from typing import List, Literal, Optional, Union
 
-from fastapi import APIRouter, HTTPException, Request, Depends
+import msgpack
+from fastapi import APIRouter, HTTPException, Query, Request, Depends, Response, WebSocket, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.websockets import WebSocketDisconnect
 
-from app.schemas import ActiveGame
+from app.schemas import ActiveGame, ActiveGameSummary, User, GameStart, DirectionInput, Direction
+from app.api.auth import get_current_user, decode_token
 from app.database import get_db, AsyncSessionLocal
+from app.ids import new_id
 import app.crud as crud
+from app.broadcast import hub, game_state, END_OF_STREAM, DELTA, BINARY
+import app.wire as wire
+from app.engine import game_engine, SnakeGame
+from app.persistence import write_behind
+from app.snapshot import game_snapshot
+import app.replay as replay
+from app.serialization import JSONBytesResponse, active_game, active_games
+from app.lobby import lobby_feed, LOBBY_MAX_GAMES
+from app.sse import event_stream
 
 router = APIRouter(prefix="/games", tags=["Spectate"])
 
-@router.get("/active", response_model=List[ActiveGame])
+# WebSocket transport
+HEARTBEAT_INTERVAL = 15.0  # server ping cadence
+HEARTBEAT_TIMEOUT = 45.0   # close if the client sent nothing for this long
+SEND_TIMEOUT = 5.0         # a single send stuck longer than this closes the socket
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+CLOSE_TIMEOUT = 4408
+
+MAX_SUMMARY_PAGE = 100
+REPLAY_YIELD_EVERY = 50  # frames simulated between yields to the event loop
+
+async def game_exists(id: str) -> bool:
+    # Only hits the DB if nobody is watching this game yet
+    if hub.latest(id) is not None or game_engine.get(id) is not None:
+        return True
+    async with AsyncSessionLocal() as db:
+        return await crud.get_game(db, id) is not None
+
+@router.get("/active", response_model=List[ActiveGame], response_class=JSONBytesResponse)
 async def get_active_games(db: AsyncSession = Depends(get_db)):
-    return await crud.list_active_games(db)
+    return JSONBytesResponse(active_games(await crud.list_active_games(db)))
+
+@router.get("/active/stream")
+async def stream_active_games(request: Request, ids: Optional[str] = None,
+                              limit: int = Query(50, ge=1, le=LOBBY_MAX_GAMES)):
+    # SSE lobby: every live game on one connection, as coarse summaries a few
+    # times a second (app/lobby.py). ids (comma-separated) narrows the feed
+    # to those games; otherwise it is the top `limit` by score.
+    wanted = None
+    if ids:
+        wanted = [i for i in ids.split(",") if i]
+        if len(wanted) > LOBBY_MAX_GAMES:
+            raise HTTPException(status_code=400, detail=f"At most {LOBBY_MAX_GAMES} ids")
+    viewer = lobby_feed.subscribe(wanted, limit)
+
+    return event_stream(request, viewer.get, lambda: lobby_feed.unsubscribe(viewer))
+
+@router.get("/active/summary", response_model=List[ActiveGameSummary])
+async def get_active_game_summaries(
+    response: Response,
+    sort: Literal["score", "viewers"] = "score",
+    limit: int = Query(20, ge=1, le=MAX_SUMMARY_PAGE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # Lobby view of playing games: no board, one page at a time. The next
+    # page's cursor comes back in X-Next-Cursor. Spectator counts are the
+    # streams open on this worker, so sort=viewers ranks in memory: it reads
+    # every playing game's summary, which is a few small columns each.
+    counts = hub.subscriber_counts()
+    if sort == "score":
+        # Keyset paging in SQL on (score DESC, id)
+        after = _decode_cursor(cursor, 2) if cursor else None
+        rows = await crud.list_game_summaries(db, limit, after)
+        key = lambda g: (g.score, g.id)
+    else:
+        rows = await crud.list_game_summaries(db)
+        key = lambda g: (g.spectators, g.score, g.id)
+    games = [ActiveGameSummary(id=r.id, username=r.username, score=r.score, gameMode=r.game_mode,
+                               length=r.length, spectators=counts.get(r.id, 0)) for r in rows]
+    if sort == "viewers":
+        games.sort(key=lambda g: (-g.spectators, -g.score, g.id))
+        if cursor:
+            spectators, score, id = _decode_cursor(cursor, 3)
+            games = [g for g in games if (-g.spectators, -g.score, g.id) > (-spectators, -score, id)]
+        games = games[:limit]
+    if len(games) == limit:
+        response.headers["X-Next-Cursor"] = base64.urlsafe_b64encode(json.dumps(key(games[-1])).encode()).decode()
+    return games
+
+def _decode_cursor(cursor: str, size: int) -> tuple:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(values)
+
+@router.post("", response_model=ActiveGame, status_code=status.HTTP_201_CREATED)
+async def start_game(start: GameStart, current_user: User = Depends(get_current_user)):
+    # The server owns the simulation from here on; the client only sends inputs.
+    # The row reaches active_games with the next write-behind flush; the
+    # snapshot file has the game right away.
+    game = game_engine.add(SnakeGame.new(new_id(), current_user.username, start.gameMode))
+    game_snapshot.track([game])
+    state = game.to_state()
+    write_behind.mark_dirty(state)
+    return state
 
-@router.get("/{id}", response_model=ActiveGame)
+@router.post("/{id}/direction", status_code=status.HTTP_204_NO_CONTENT)
+async def change_direction(id: str, move: DirectionInput, current_user: User = Depends(get_current_user)):
+    game = game_engine.get(id)
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if game.username != current_user.username:
+        raise HTTPException(status_code=403, detail="Not your game")
+    game.steer(move.direction)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/{id}", response_model=ActiveGame, response_class=JSONBytesResponse)
 async def get_game_state(id: str, db: AsyncSession = Depends(get_db)):
+    live = game_engine.get(id)
+    if live:
+        return JSONBytesResponse(active_game(live.to_state()))
     game = await crud.get_game(db, id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
-    return game
+    return JSONBytesResponse(active_game(game))
 
 @router.get("/{id}/subscribe")
-async def subscribe_game(id: str, request: Request):
-    # Initial check (using a temporary session)
-    async with AsyncSessionLocal() as db:
-        game = await crud.get_game(db, id)
-        if not game:
-            raise HTTPException(status_code=404, detail="Game not found")
-    
-    async def event_generator():
+async def subscribe_game(id: str, request: Request, encoding: Literal["full", "delta"] = "full"):
+    # encoding=full sends the whole ActiveGame every frame (the original
+    # protocol); encoding=delta sends a keyframe followed by O(1)-sized diffs,
+    # see app/delta.py. Reconnecting always starts with a keyframe.
+    if not await game_exists(id):
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    sub = hub.subscribe(id, encoding)
+
+    async def next_event() -> Optional[str]:
+        frame = await sub.get()
+        if frame is END_OF_STREAM:
+            return None
+        # SSE format: [id: seq\n]data: {json}\n\n
+        if encoding == DELTA:
+            return f"id: {frame.seq}\ndata: {sub.render(frame)}\n\n"
+        return f"data: {sub.render(frame)}\n\n"
+
+    return event_stream(request, next_event, sub.close)
+
+@router.get("/{id}/replay")
+async def get_replay(id: str, format: Literal["binary", "frames"] = "binary", db: AsyncSession = Depends(get_db)):
+    # format=binary returns the input log as stored (app/replay.py), for
+    # clients that run the simulation themselves; format=frames re-simulates
+    # it here and streams one ActiveGame per tick as NDJSON.
+    live = game_engine.get(id)
+    recorded = replay.record(live) if live is not None else None
+    pending = replay.replay_store.pending(id)
+    if recorded is not None:
+        data, username = replay.encode(recorded), live.username
+    elif pending is not None:
+        data, username = pending["data"], pending["username"]
+    else:
+        row = await crud.get_replay(db, id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Replay not found")
+        data, username = row.data, row.username
+
+    if format == "binary":
+        return Response(content=data, media_type="application/octet-stream")
+
+    async def frames():
+        for n, game in enumerate(replay.simulate(replay.decode(data), id, username)):
+            yield json.dumps(game_state(game.to_state())) + "\n"
+            if n % REPLAY_YIELD_EVERY == REPLAY_YIELD_EVERY - 1:
+                await asyncio.sleep(0)
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+@router.websocket("/{id}/ws")
+async def game_socket(websocket: WebSocket, id: str, format: Literal["binary", "json"] = "binary",
+                      token: Optional[str] = None):
+    # One socket per viewer. Downstream: keyframe, then deltas, as binary
+    # frames (app/wire.py) or the JSON messages of app/delta.py. Upstream:
+    # {"type": "direction", "direction": "UP"} from the game's owner (msgpack
+    # in binary mode, JSON otherwise) and {"type": "pong"} replies to pings.
+    # Browsers cannot set headers on a WebSocket, so the token is a query
+    # parameter; without one the socket is watch-only. A token that does not
+    # validate closes the socket, so a client never steers into the void.
+    await websocket.accept()
+    username = decode_token(token) if token else None
+    if token and username is None:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="Could not validate credentials")
+        return
+    if not await game_exists(id):
+        await websocket.close(code=CLOSE_NOT_FOUND)
+        return
+
+    binary = format == "binary"
+    # The subscription queue is this connection's send buffer: bounded, and a
+    # client that cannot keep up loses old frames and resyncs on a keyframe.
+    sub = hub.subscribe(id, BINARY if binary else DELTA)
+    loop = asyncio.get_running_loop()
+    last_seen = loop.time()
+    send_lock = asyncio.Lock()
+
+    def control(message: dict) -> Union[str, bytes]:
+        return wire.control(message) if binary else json.dumps(message)
+
+    async def send(data: Union[str, bytes]) -> None:
+        async with send_lock:
+            if binary:
+                await asyncio.wait_for(websocket.send_bytes(data), SEND_TIMEOUT)
+            else:
+                await asyncio.wait_for(websocket.send_text(data), SEND_TIMEOUT)
+
+    async def downstream():
+        while True:
+            frame = await sub.get()
+            if frame is END_OF_STREAM:
+                await send(control({"type": "end"}))
+                return
+            await send(sub.render(frame))
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            if loop.time() - last_seen > HEARTBEAT_TIMEOUT:
+                await websocket.close(code=CLOSE_TIMEOUT)
+                return
+            await send(control({"type": "ping"}))
+
+    async def upstream():
+        nonlocal last_seen
         while True:
-            if await request.is_disconnected():
-                break
-            
-            # Fetch latest state with a new session each time
-            async with AsyncSessionLocal() as db:
-                current_game = await crud.get_game(db, id)
-            
-            if not current_game:
-                break
-            
-            # SSE format: data: {json}\n\n
-            yield f"data: {json.dumps(current_game.model_dump(mode='json'))}\n\n"
-            await asyncio.sleep(1) # Send update every 1 second
-            
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            last_seen = loop.time()
+            try:
+                if message.get("bytes") is not None:
+                    data = msgpack.unpackb(message["bytes"])
+                else:
+                    data = json.loads(message.get("text") or "")
+                kind = data.get("type")
+            except (ValueError, AttributeError, msgpack.UnpackException):
+                await send(control({"type": "error", "detail": "Malformed message"}))
+                continue
+            if kind == "direction":
+                await send_direction(data.get("direction"))
+            elif kind != "pong":
+                await send(control({"type": "error", "detail": f"Unknown message type: {kind}"}))
+
+    async def send_direction(direction) -> None:
+        game = game_engine.get(id)
+        if game is None:
+            detail = "Game is not running"
+        elif username is None or game.username != username:
+            detail = "Not your game"
+        elif not isinstance(direction, str) or direction not in Direction._value2member_map_:
+            detail = "Invalid direction"
+        else:
+            game.steer(direction)
+            return
+        await send(control({"type": "error", "detail": detail}))
+
+    tasks = [asyncio.create_task(t()) for t in (downstream, heartbeat, upstream)]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sub.close()
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    if any(isinstance(r, asyncio.TimeoutError) for r in results):
+        # A send stalled: the client is not reading. Drop it rather than buffer.
+        await _close(websocket, CLOSE_TIMEOUT)
+    elif not any(isinstance(r, WebSocketDisconnect) for r in results):
+        await _close(websocket, 1000)
+
+async def _close(websocket: WebSocket, code: int) -> None:
+    try:
+        await websocket.close(code=code)
+    except RuntimeError:
+        pass  # already closed
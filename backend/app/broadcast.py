@@ -0,0 +1,249 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from app.database import AsyncSessionLocal
+from app.serialization import active_game, isoformat
+from app.engine import game_engine, SnakeGame
+from app.delta import Frame, FrameEncoder
+from app.pubsub import PubSub
+import app.wire as wire
+import app.crud as crud
+
+# In-process fan-out of live game state to spectators.
+# Every game with at least one spectator gets exactly one producer task that
+# loads the state and publishes it; subscribers only ever read from their own
+# bounded queue. DB reads therefore scale with watched games, not viewers.
+# Each published state is encoded at most once per format (see app/delta.py)
+# no matter how many subscribers receive it.
+
+POLL_INTERVAL = 1.0  # seconds between producer reads (matches the old SSE cadence)
+QUEUE_SIZE = 8       # frames buffered per subscriber before we start dropping
+
+# Pushed to subscribers when the game disappears so streams can end cleanly.
+END_OF_STREAM = None
+
+FULL = "full"    # every frame is the whole ActiveGame (the original protocol)
+DELTA = "delta"  # keyframe, then deltas; see app/delta.py
+BINARY = "binary"  # DELTA in the packed binary format of app/wire.py
+ENCODINGS = (FULL, DELTA, BINARY)
+
+StateLoader = Callable[[str], Awaitable[Optional[dict]]]
+
+
+async def load_game_state(game_id: str) -> Optional[dict]:
+    # Default producer source. Games stepped by this process are read from
+    # memory; anything else costs one short-lived session per read.
+    live = game_engine.get(game_id)
+    if live is not None:
+        return game_state(live.to_state())
+    async with AsyncSessionLocal() as db:
+        game = await crud.get_game(db, game_id)
+    if game is None:
+        return None
+    return game_state(game)
+
+
+def game_state(game) -> dict:
+    # Exactly the shape of GET /games/{id}, as a json.dumps-able dict.
+    # Accepts ORM rows or SnakeGame.to_state() dicts.
+    state = active_game(game)
+    state["startedAt"] = isoformat(state["startedAt"])
+    return state
+
+
+class Subscription:
+    """A single spectator's view of a channel: a bounded queue of frames."""
+
+    def __init__(self, hub: "GameHub", game_id: str, maxsize: int, encoding: str = FULL):
+        self.hub = hub
+        self.game_id = game_id
+        self.encoding = encoding
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+        self.last_seq: Optional[int] = None
+
+    def offer(self, frame: Optional[Frame]) -> None:
+        # Never block the producer: a slow client loses its oldest frame so the
+        # newest state always gets through.
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(frame)
+
+    async def get(self) -> Optional[Frame]:
+        return await self.queue.get()
+
+    def render(self, frame: Frame) -> Union[str, bytes]:
+        if self.encoding == FULL:
+            return frame.full
+        # A delta only applies on top of the frame right before it. After a
+        # drop (or on the first frame) the client gets a keyframe instead.
+        contiguous = self.last_seq is not None and frame.seq == self.last_seq + 1
+        self.last_seq = frame.seq
+        if self.encoding == BINARY:
+            if contiguous and frame.changes is not None:
+                return wire.delta(frame)
+            return wire.keyframe(frame)
+        if contiguous and frame.delta is not None:
+            return frame.delta
+        return frame.keyframe
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self)
+
+
+class _Channel:
+    def __init__(self):
+        self.subscribers: Set[Subscription] = set()
+        self.encoder = FrameEncoder()
+        self.last_frame: Optional[Frame] = None
+        self.producer: Optional[asyncio.Task] = None
+        self.last_remote: Optional[float] = None  # monotonic time of the last pub/sub update
+
+
+class GameHub:
+    """Broadcast hub keyed by game id."""
+
+    def __init__(
+        self,
+        loader: StateLoader = load_game_state,
+        poll_interval: float = POLL_INTERVAL,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.pubsub: Optional[PubSub] = None
+        self._channels: Dict[str, _Channel] = {}
+
+    def attach(self, pubsub: PubSub) -> None:
+        """Take updates for games stepped by other workers from pub/sub."""
+        self.pubsub = pubsub
+        pubsub.handlers.append(self.receive)
+        if hasattr(pubsub, "on_oversized"):
+            pubsub.on_oversized = self.refresh
+
+    def subscribe(self, game_id: str, encoding: str = FULL) -> Subscription:
+        channel = self._channels.get(game_id)
+        if channel is None:
+            channel = self._channels[game_id] = _Channel()
+            if self.pubsub is not None:
+                self.pubsub.watch(game_id)
+        sub = Subscription(self, game_id, self.queue_size, encoding)
+        channel.subscribers.add(sub)
+        # Late joiners get the current state straight away instead of waiting
+        # for the next change.
+        if channel.last_frame is not None:
+            sub.offer(channel.last_frame)
+        if channel.producer is None:
+            channel.producer = asyncio.create_task(self._produce(game_id, channel))
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        channel = self._channels.get(sub.game_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(sub)
+        if not channel.subscribers:
+            if channel.producer is not None:
+                channel.producer.cancel()
+            del self._channels[sub.game_id]
+            if self.pubsub is not None:
+                self.pubsub.unwatch(sub.game_id)
+
+    def publish(self, game_id: str, state: Optional[dict]) -> None:
+        channel = self._channels.get(game_id)
+        if channel is None:
+            return
+        if state is END_OF_STREAM:
+            frame = END_OF_STREAM
+        else:
+            if channel.last_frame is not None and state == channel.last_frame.state:
+                return
+            frame = channel.last_frame = channel.encoder.encode(state)
+        for sub in list(channel.subscribers):
+            sub.offer(frame)
+
+    def receive(self, game_id: str, state: dict) -> None:
+        # A state pushed by the worker that owns the game
+        channel = self._channels.get(game_id)
+        if channel is None:
+            return
+        channel.last_remote = time.monotonic()
+        self.publish(game_id, state)
+
+    def refresh(self, game_id: str) -> None:
+        # Pub/sub said the game changed but could not carry the state
+        channel = self._channels.get(game_id)
+        if channel is not None:
+            channel.last_remote = None
+            asyncio.create_task(self._load_once(game_id, channel))
+
+    async def _load_once(self, game_id: str, channel: _Channel) -> None:
+        state = await self.loader(game_id)
+        if state is not None and self._channels.get(game_id) is channel:
+            self.publish(game_id, state)
+
+    def latest(self, game_id: str) -> Optional[Frame]:
+        channel = self._channels.get(game_id)
+        return channel.last_frame if channel else None
+
+    def subscriber_count(self, game_id: str) -> int:
+        channel = self._channels.get(game_id)
+        return len(channel.subscribers) if channel else 0
+
+    def subscriber_counts(self) -> Dict[str, int]:
+        return {game_id: len(c.subscribers) for game_id, c in self._channels.items()}
+
+    async def _produce(self, game_id: str, channel: _Channel) -> None:
+        while True:
+            state = await self.loader(game_id)
+            if self._channels.get(game_id) is not channel:
+                return
+            if state is None:
+                self.publish(game_id, END_OF_STREAM)
+                channel.producer = None
+                return
+            # While the owning worker pushes updates, the DB copy is older
+            # than what spectators already have; polling is only the fallback
+            remote = channel.last_remote
+            if remote is None or time.monotonic() - remote > 2 * self.poll_interval:
+                self.publish(game_id, state)
+            await asyncio.sleep(self.poll_interval)
+
+    async def close(self) -> None:
+        tasks = [c.producer for c in self._channels.values() if c.producer is not None]
+        for channel in self._channels.values():
+            for sub in channel.subscribers:
+                sub.closed = True
+                sub.offer(END_OF_STREAM)
+        self._channels.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+hub = GameHub()
+
+
+def publish_games(games: List[SnakeGame]) -> None:
+    # GameEngine tick listener: push fresh state to anyone watching, here or
+    # on another worker, so engine games reach spectators on the tick instead
+    # of on the next poll.
+    pubsub = hub.pubsub
+    for game in games:
+        local = hub.subscriber_count(game.id)
+        remote = pubsub is not None and pubsub.watched_remotely(game.id)
+        if local or remote:
+            state = game_state(game.to_state())
+            if local:
+                hub.publish(game.id, state)
+            if remote:
+                pubsub.publish(game.id, state)
@@ -1,15 +1,26 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import desc
-import uuid
+from sqlalchemy import and_, desc, func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
 
 # Models
-from app.models import User, LeaderboardEntry, ActiveGame
+from app.models import User, LeaderboardEntry, ActiveGame, PersonalBest, LeaderboardRollup, GameReplay, ScoreVerification
+from app.database import dialect_insert, writer
+from app.ids import new_id
 # Schemas
-from app.schemas import User as UserSchema, LeaderboardEntry as LeaderboardEntrySchema, ActiveGame as ActiveGameSchema
+from app.schemas import User as UserSchema, LeaderboardEntry as LeaderboardEntrySchema, ActiveGame as ActiveGameSchema, ScoreSubmission, GameStatus
+from app.ranking import rankings, RankedEntry
+from app.leaderboard_cache import leaderboard_cache
+from app.leaderboard_stream import leaderboard_feed
+from app.user_cache import user_cache
+from app.serialization import ACTIVE_GAME_COLUMNS, LEADERBOARD_COLUMNS, LeaderboardRow
+from app.rollups import utc_naive
 # Other deps
+import hashlib
+import json
 from datetime import datetime
+from app.engine import DIRECTION_CODES
 
 # Logic currently in DB that needs to be here? 
 # The DB handled some logic like "check if exists". CRUD should probably just do DB ops.
@@ -42,8 +53,11 @@ async def create_user(db: AsyncSession, user: UserSchema, password_hash: str) ->
         created_at=user.createdAt
     )
     db.add(db_user)
-    await db.commit()
+    async with writer(db):
+        await db.commit()
     await db.refresh(db_user)
+    # Nothing negative is cached today, but a new user must never be shadowed
+    user_cache.invalidate(db_user.username)
     return db_user
 
 async def get_password_hash(db: AsyncSession, email: str) -> Optional[str]:
@@ -52,46 +66,297 @@ async def get_password_hash(db: AsyncSession, email: str) -> Optional[str]:
         return user.hashed_password
     return None
 
-async def add_score(db: AsyncSession, entry: LeaderboardEntrySchema):
+async def add_score(db: AsyncSession, entry: LeaderboardEntrySchema) -> int:
     # entry is Pydantic. Create ORM.
-    # Note: rank is calculated dynamically in SQL usually, or updated.
-    # MockDB stored rank. SQL way: query with order, or store it.
-    # Storing rank is complex if others change.
-    # Simple way: just insert score. Rank can be calculated on read.
-    # The existing API returns LeaderboardEntry which has rank.
-    # I'll just save it.
-    
-    db_entry = LeaderboardEntry(
+    # Rank is not stored; the in-memory rank index (app/ranking.py), the
+    # leaderboard response cache and the live top-K feed are updated here so
+    # every writer keeps them current, and the entry's global rank within its
+    # game mode is returned.
+    db_entry = _entry_row(entry)
+    db.add(db_entry)
+    async with writer(db):
+        await _update_personal_best(db, db_entry)
+        # Every column is set above, so no refresh round-trip is needed
+        await db.commit()
+    return _announce(entry)
+
+def _entry_row(entry: LeaderboardEntrySchema) -> LeaderboardEntry:
+    return LeaderboardEntry(
         id=entry.id,
         username=entry.username,
         score=entry.score,
         game_mode=entry.gameMode.value, # Store string
         date=entry.date
     )
-    db.add(db_entry)
-    await db.commit()
-    await db.refresh(db_entry)
-    # Rank is not stored in DB_Entry (comment says so in models.py).
-    # We should calculate rank? Or maybe I should update rank update.
-    # For now, let's just save.
+
+def _announce(entry: LeaderboardEntrySchema) -> int:
+    # After the commit: rank index, response cache and top-K feed
+    ranked = RankedEntry(entry.id, entry.username, entry.score, entry.gameMode.value, entry.date)
+    leaderboard_cache.invalidate_for(ranked)
+    rank = rankings.add(ranked)
+    leaderboard_feed.added(ranked)
+    return rank
     
-async def get_leaderboard(db: AsyncSession, limit: int = 10, game_mode: str = None) -> List[LeaderboardEntry]:
-    query = select(LeaderboardEntry).order_by(desc(LeaderboardEntry.score))
+async def add_scores(db: AsyncSession, entries: List[LeaderboardEntrySchema]) -> List[int]:
+    # add_score for a batch, in one transaction: a single multi-row INSERT
+    # (COPY on Postgres) and one personal-best upsert. The ranks returned are
+    # the ones adding the entries one by one, in order, would have returned.
+    if not entries:
+        return []
+    rows = [dict(id=e.id, username=e.username, score=e.score, game_mode=e.gameMode.value, date=utc_naive(e.date))
+            for e in entries]
+    async with writer(db):
+        await _update_personal_bests(db, rows)
+        if db.get_bind().dialect.name == "postgresql":
+            await _copy_rows(db, LeaderboardEntry.__table__, rows)
+        else:
+            await db.execute(insert(LeaderboardEntry).values(rows))
+        await db.commit()
+    ranks = []
+    for e in entries:
+        ranked = RankedEntry(e.id, e.username, e.score, e.gameMode.value, e.date)
+        leaderboard_cache.invalidate_for(ranked)
+        ranks.append(rankings.add(ranked))
+        leaderboard_feed.added(ranked)
+    return ranks
+
+async def _copy_rows(db: AsyncSession, table, rows: List[dict]):
+    # COPY ... FROM STDIN through asyncpg. The session's transaction is already
+    # open on this connection (the personal-best upsert ran first), so the
+    # copy commits or rolls back with it.
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    columns = list(rows[0])
+    await raw.driver_connection.copy_records_to_table(
+        table.name, records=[tuple(row[c] for c in columns) for row in rows], columns=columns)
+
+async def _update_personal_bests(db: AsyncSession, rows: List[dict]):
+    # One row per (player, mode): an upsert may not touch the same row twice
+    best = {}
+    for row in rows:
+        key = (row["username"], row["game_mode"])
+        if key not in best or row["score"] > best[key]["score"]:
+            best[key] = row
+    upsert = dialect_insert(db.get_bind().dialect.name)
+    if upsert is None:
+        for row in best.values():
+            await _update_personal_best(db, LeaderboardEntry(**row))
+        return
+    stmt = upsert(PersonalBest).values([
+        dict(username=r["username"], game_mode=r["game_mode"], score=r["score"], date=r["date"], entry_id=r["id"])
+        for r in best.values()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[PersonalBest.username, PersonalBest.game_mode],
+        set_={k: stmt.excluded[k] for k in ("score", "date", "entry_id")},
+        where=stmt.excluded.score > PersonalBest.score,
+    ))
+
+async def _update_personal_best(db: AsyncSession, entry: LeaderboardEntry):
+    # Same transaction as the score insert; only ever moves a best upwards
+    values = dict(username=entry.username, game_mode=entry.game_mode, score=entry.score,
+                  date=entry.date, entry_id=entry.id)
+    insert = dialect_insert(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(PersonalBest).values(**values)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[PersonalBest.username, PersonalBest.game_mode],
+            set_={k: stmt.excluded[k] for k in ("score", "date", "entry_id")},
+            where=stmt.excluded.score > PersonalBest.score,
+        ))
+        return
+    best = await db.get(PersonalBest, (entry.username, entry.game_mode))
+    if best is None:
+        db.add(PersonalBest(**values))
+    elif entry.score > best.score:
+        best.score, best.date, best.entry_id = entry.score, entry.date, entry.id
+
+def proof_hash(seed: int, inputs: list) -> str:
+    return hashlib.sha256(json.dumps([seed, inputs], separators=(",", ":")).encode()).hexdigest()
+
+async def create_verification(db: AsyncSession, username: str, submission: ScoreSubmission,
+                              seed: int, nonce: str) -> ScoreVerification:
+    # seed and nonce come from the checked nonce token, not the client's body
+    inputs = [[tick, DIRECTION_CODES[direction]] for tick, direction in submission.inputLog]
+    row = ScoreVerification(
+        id=new_id(),
+        username=username,
+        game_mode=submission.gameMode.value,
+        score=submission.score,
+        seed=seed,
+        inputs=inputs,
+        status="pending",
+        created_at=datetime.utcnow(),
+        nonce=nonce,
+        proof_hash=proof_hash(seed, inputs),
+    )
+    db.add(row)
+    try:
+        async with writer(db):
+            await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise ValueError("This game was already submitted")
+    return row
+
+async def get_verification(db: AsyncSession, verification_id: str) -> Optional[ScoreVerification]:
+    return await db.get(ScoreVerification, verification_id, populate_existing=True)
+
+async def list_pending_verifications(db: AsyncSession, limit: Optional[int] = None,
+                                     before: Optional[datetime] = None) -> List[ScoreVerification]:
+    query = select(ScoreVerification).where(ScoreVerification.status == "pending")
+    if before is not None:
+        query = query.where(ScoreVerification.created_at < before)
+    result = await db.execute(query.order_by(ScoreVerification.created_at).limit(limit))
+    return result.scalars().all()
+
+async def finish_verification(db: AsyncSession, verification_id: str, ticks: int, reason: Optional[str] = None,
+                              entry: Optional[LeaderboardEntrySchema] = None) -> bool:
+    # Verified (entry given) or rejected (reason given). The status change and
+    # the leaderboard insert commit together, so a verified score can be
+    # neither lost nor counted twice. The status only moves off pending once:
+    # several workers may verify the same row, and the one whose UPDATE
+    # matches wins.
+    claim = (update(ScoreVerification)
+             .where(ScoreVerification.id == verification_id, ScoreVerification.status == "pending")
+             .values(status="verified" if entry is not None else "rejected", ticks=ticks, reason=reason,
+                     verified_at=datetime.utcnow(), entry_id=entry.id if entry is not None else None))
+    async with writer(db):
+        if (await db.execute(claim)).rowcount != 1:
+            await db.rollback()
+            return False
+        if entry is not None:
+            db_entry = _entry_row(entry)
+            db.add(db_entry)
+            await _update_personal_best(db, db_entry)
+        await db.commit()
+    if entry is not None:
+        _announce(entry)
+    return True
+
+def _leaderboard_query(game_mode: Optional[str] = None, since: Optional[datetime] = None):
+    # Plain columns, not entities: rows go straight to JSON (app/serialization.py)
+    query = select(*LEADERBOARD_COLUMNS)
     if game_mode:
         query = query.where(LeaderboardEntry.game_mode == game_mode)
+    if since:
+        query = query.where(LeaderboardEntry.date >= since)
+    return query
+
+LEADERBOARD_KEY = (LeaderboardEntry.score, LeaderboardEntry.date, LeaderboardEntry.id)
+
+def _after(key: Tuple[int, datetime, str], columns=LEADERBOARD_KEY):
+    # Keyset condition: rows that sort after (score, date, id) in leaderboard order
+    score, date, id = key
+    score_col, date_col, id_col = columns
+    return or_(
+        score_col < score,
+        and_(score_col == score, date_col > date),
+        and_(score_col == score, date_col == date, id_col > id),
+    )
+
+def _before(key: Tuple[int, datetime, str], columns=LEADERBOARD_KEY):
+    score, date, id = key
+    score_col, date_col, id_col = columns
+    return or_(
+        score_col > score,
+        and_(score_col == score, date_col < date),
+        and_(score_col == score, date_col == date, id_col < id),
+    )
+
+LEADERBOARD_ORDER = (desc(LeaderboardEntry.score), LeaderboardEntry.date, LeaderboardEntry.id)
+LEADERBOARD_ORDER_REVERSED = (LeaderboardEntry.score, desc(LeaderboardEntry.date), desc(LeaderboardEntry.id))
+
+async def get_leaderboard(
+    db: AsyncSession,
+    limit: int = 10,
+    game_mode: str = None,
+    after: Optional[Tuple[int, datetime, str]] = None,
+    start_rank: int = 0,
+    since: Optional[datetime] = None,
+) -> List[LeaderboardRow]:
+    # Keyset pagination: `after` is the (score, date, id) of the previous
+    # page's last row and start_rank its rank, so ranks stay global across
+    # pages without counting.
+    # Same order as the rank index: score, then earliest, then id
+    query = _leaderboard_query(game_mode, since).order_by(*LEADERBOARD_ORDER)
+    if after:
+        query = query.where(_after(after))
     query = query.limit(limit)
     
     result = await db.execute(query)
-    entries = result.scalars().all()
-    
-    # Calculate ranks
-    # Ideally should be done in DB or just enumerated here.
-    # Since we paginate/limit, checking absolute rank requires counting better items.
-    # For this simple app, I will just enumerate 1..N for the returned list.
-    for i, entry in enumerate(entries):
-        entry.rank = i + 1
-        
-    return entries
+    return [LeaderboardRow(*row, start_rank + i + 1) for i, row in enumerate(result)]
+
+async def get_best_entry(db: AsyncSession, username: str, game_mode: str = None,
+                         since: Optional[datetime] = None) -> Optional[LeaderboardRow]:
+    # Rank left at 0 for the caller to fill in
+    query = _leaderboard_query(game_mode, since).where(LeaderboardEntry.username == username)
+    row = (await db.execute(query.order_by(*LEADERBOARD_ORDER).limit(1))).first()
+    return LeaderboardRow(*row, 0) if row is not None else None
+
+async def count_better(db: AsyncSession, entry: LeaderboardRow, game_mode: str = None,
+                       since: Optional[datetime] = None) -> int:
+    # Fallback for ranks the in-memory index can't answer
+    key = (entry.score, entry.date, entry.id)
+    query = _leaderboard_query(game_mode, since).where(_before(key))
+    return await db.scalar(select(func.count()).select_from(query.subquery()))
+
+async def get_leaderboard_around(
+    db: AsyncSession,
+    entry: LeaderboardRow,
+    rank: int,
+    radius: int,
+    game_mode: str = None,
+    since: Optional[datetime] = None,
+) -> List[LeaderboardRow]:
+    # `radius` rows on either side of `entry`, which sits at `rank`
+    key = (entry.score, entry.date, entry.id)
+    base = _leaderboard_query(game_mode, since)
+    above = await db.execute(base.where(_before(key)).order_by(*LEADERBOARD_ORDER_REVERSED).limit(radius))
+    below = await db.execute(base.where(_after(key)).order_by(*LEADERBOARD_ORDER).limit(radius))
+    above = list(reversed(above.all()))
+    rows = above + [entry[:-1]] + below.all()
+    return [LeaderboardRow(*row, rank - len(above) + i) for i, row in enumerate(rows)]
+
+BEST_KEY = (PersonalBest.score, PersonalBest.date, PersonalBest.entry_id)
+ROLLUP_KEY = (LeaderboardRollup.score, LeaderboardRollup.date, LeaderboardRollup.entry_id)
+
+async def _ranked_page(db: AsyncSession, query, columns, limit: int,
+                       after: Optional[Tuple[int, datetime, str]], start_rank: int) -> List[LeaderboardEntrySchema]:
+    # Shared by the personal-best and rollup tables, which both have
+    # (username, game_mode, score, date, entry_id)
+    score_col, date_col, id_col = columns
+    query = query.order_by(desc(score_col), date_col, id_col)
+    if after:
+        query = query.where(_after(after, columns))
+    result = await db.execute(query.limit(limit))
+    return [
+        LeaderboardEntrySchema(
+            id=row.entry_id, rank=start_rank + i + 1, username=row.username,
+            score=row.score, gameMode=row.game_mode, date=row.date,
+        )
+        for i, row in enumerate(result.scalars().all())
+    ]
+
+async def get_personal_bests(db: AsyncSession, limit: int = 10, game_mode: str = None,
+                             after: Optional[Tuple[int, datetime, str]] = None,
+                             start_rank: int = 0) -> List[LeaderboardEntrySchema]:
+    # All-time leaderboard with one row per player (and mode)
+    query = select(PersonalBest)
+    if game_mode:
+        query = query.where(PersonalBest.game_mode == game_mode)
+    return await _ranked_page(db, query, BEST_KEY, limit, after, start_rank)
+
+async def get_rollup(db: AsyncSession, period: str, period_start: datetime, limit: int = 10,
+                     game_mode: str = None, after: Optional[Tuple[int, datetime, str]] = None,
+                     start_rank: int = 0) -> List[LeaderboardEntrySchema]:
+    # Day/week leaderboard with one row per player (and mode)
+    query = select(LeaderboardRollup).where(
+        LeaderboardRollup.period == period, LeaderboardRollup.period_start == period_start
+    )
+    if game_mode:
+        query = query.where(LeaderboardRollup.game_mode == game_mode)
+    return await _ranked_page(db, query, ROLLUP_KEY, limit, after, start_rank)
 
 async def create_game(db: AsyncSession, game: ActiveGameSchema):
     # Convert Pydantic to ORM
@@ -107,19 +372,47 @@ async def create_game(db: AsyncSession, game: ActiveGameSchema):
         started_at=game.startedAt
     )
     db.add(db_game)
-    await db.commit()
-    await db.refresh(db_game)
+    async with writer(db):
+        await db.commit()
     return db_game
 
 async def get_game(db: AsyncSession, game_id: str) -> Optional[ActiveGame]:
     result = await db.execute(select(ActiveGame).where(ActiveGame.id == game_id))
     return result.scalars().first()
 
-async def list_active_games(db: AsyncSession) -> List[ActiveGame]:
-    result = await db.execute(select(ActiveGame))
+async def get_replay(db: AsyncSession, game_id: str) -> Optional[GameReplay]:
+    result = await db.execute(select(GameReplay).where(GameReplay.game_id == game_id))
+    return result.scalars().first()
+
+async def list_active_games(db: AsyncSession) -> list:
+    # ACTIVE_GAME_COLUMNS tuples, for serialization.active_games
+    return (await db.execute(select(*ACTIVE_GAME_COLUMNS))).all()
+
+async def list_game_summaries(db: AsyncSession, limit: Optional[int] = None,
+                              after: Optional[Tuple[int, str]] = None) -> list:
+    # Playing games by (score DESC, id ASC) without the snake/food JSON: the
+    # snake length is counted in the database
+    query = (
+        select(ActiveGame.id, ActiveGame.username, ActiveGame.score, ActiveGame.game_mode,
+               func.json_array_length(ActiveGame.snake).label("length"))
+        .where(ActiveGame.status == GameStatus.PLAYING.value)
+        .order_by(ActiveGame.score.desc(), ActiveGame.id)
+    )
+    if after is not None:
+        score, id = after
+        query = query.where(or_(ActiveGame.score < score, and_(ActiveGame.score == score, ActiveGame.id > id)))
+    if limit is not None:
+        query = query.limit(limit)
+    return (await db.execute(query)).all()
+
+async def list_games_by_status(db: AsyncSession, status: str) -> List[ActiveGame]:
+    result = await db.execute(select(ActiveGame).where(ActiveGame.status == status))
     return result.scalars().all()
 
-# Additional helper to update game state?
 async def update_game(db: AsyncSession, game_id: str, **kwargs):
-    # Implementation depends on needs.
-    pass
+    # kwargs are ActiveGame column names, e.g. the output of SnakeGame.to_state()
+    if not kwargs:
+        return
+    async with writer(db):
+        await db.execute(update(ActiveGame).where(ActiveGame.id == game_id).values(**kwargs))
+        await db.commit()
@@ -1,10 +1,19 @@
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
-# Default to SQLite for local development if not specified
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./snake_arena.db")
+from app.settings import (
+    DATABASE_URL as CONFIGURED_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_NULL_POOL, DB_STATEMENT_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE, SQLITE_WAL,
+)
+
+DATABASE_URL = CONFIGURED_URL
 
 # Handle Postgres URL fix for SQLAlchemy (postgres:// -> postgresql://)
 if DATABASE_URL.startswith("postgres://"):
@@ -13,19 +22,105 @@ elif DATABASE_URL.startswith("postgresql://"):
      if "asyncpg" not in DATABASE_URL:
          DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-# SQLite specific connect args
-connect_args = {}
-if "sqlite" in DATABASE_URL:
-    connect_args = {"check_same_thread": False}
-
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True, # Enable SQL echo for debugging
-    future=True,
-    connect_args=connect_args,
-    # For SQLite, we might want to disable pooling to avoid locking issues in some setups,
-    # but standard pool is usually fine.
-)
+IS_SQLITE = "sqlite" in DATABASE_URL
+IN_MEMORY = IS_SQLITE and ":memory:" in DATABASE_URL
+
+
+class PoolStats:
+    """Counters for sizing the pool: how often checkouts had to wait, and how long."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+
+    def record(self, waited: bool, elapsed: float) -> None:
+        self.checkouts += 1
+        if waited:
+            self.waits += 1
+            self.wait_seconds += elapsed
+            self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        # No idle connection and no overflow left: this checkout will queue
+        waited = self.checkedin() == 0 and -1 < self._max_overflow <= self._overflow
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_stats.timeouts += waited
+            raise
+        pool_stats.record(waited, time.perf_counter() - started)
+        return conn
+
+
+def engine_options() -> dict:
+    options = {"echo": DB_ECHO, "future": True}
+    if IS_SQLITE:
+        # SQLite specific connect args; the timeout is its busy timeout
+        options["connect_args"] = {"check_same_thread": False, "timeout": DB_STATEMENT_TIMEOUT or 5}
+    else:
+        connect_args = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+        if DB_STATEMENT_TIMEOUT:
+            connect_args["server_settings"] = {"statement_timeout": str(int(DB_STATEMENT_TIMEOUT * 1000))}
+        options["connect_args"] = connect_args
+
+    if DB_NULL_POOL:
+        options["poolclass"] = NullPool
+    elif not IN_MEMORY:
+        options.update(
+            poolclass=InstrumentedPool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return options
+
+
+engine = create_async_engine(DATABASE_URL, **engine_options())
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def on_connect(dbapi_connection, connection_record):
+    pool_stats.connects += 1
+    if IS_SQLITE and SQLITE_WAL and not IN_MEMORY:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    status = {
+        "pool": type(pool).__name__,
+        "checkouts": pool_stats.checkouts,
+        "waits": pool_stats.waits,
+        "waitMs": round(pool_stats.wait_seconds * 1000, 3),
+        "maxWaitMs": round(pool_stats.max_wait_seconds * 1000, 3),
+        "timeouts": pool_stats.timeouts,
+        "connects": pool_stats.connects,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checkedIn=pool.checkedin(),
+            checkedOut=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            maxOverflow=DB_MAX_OVERFLOW,
+        )
+    return status
+
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -37,6 +132,33 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+def dialect_insert(dialect_name: str):
+    # INSERT with ON CONFLICT support, or None if the dialect has no upsert
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+# SQLite allows one writer at a time and answers the rest with "database is
+# locked". Writers in this process queue on one lock instead; on Postgres the
+# lock is skipped. Locks are per event loop (tests run one loop each).
+_sqlite_writers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+@asynccontextmanager
+async def writer(db: AsyncSession):
+    if db.get_bind().dialect.name != "sqlite":
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    lock = _sqlite_writers.get(loop)
+    if lock is None:
+        lock = _sqlite_writers[loop] = asyncio.Lock()
+    async with lock:
+        yield
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
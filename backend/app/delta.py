@@ -0,0 +1,141 @@
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+# Delta protocol for spectator frames.
+#
+# A stream starts with a keyframe and then carries deltas:
+#
+#   {"type": "keyframe", "seq": 40, "game": {...full ActiveGame...}}
+#   {"type": "delta", "seq": 41, "head": [{"x": 4, "y": 7}], "tailRemoved": 1}
+#   {"type": "delta", "seq": 42, "head": [{"x": 5, "y": 7}], "score": 30, "food": {"x": 1, "y": 2}}
+#
+# To apply a delta: snake = head + snake[:len(snake) - tailRemoved], then copy
+# every other field present. `head` lists new cells newest first. seq grows by
+# one per frame; a client that sees a gap should reconnect (which always
+# starts with a keyframe). Keyframes are also sent every KEYFRAME_INTERVAL
+# frames so late or lossy clients converge without reconnecting.
+#
+# Deltas are computed by the producer once per frame and shared by every
+# subscriber, and their size does not depend on the snake's length.
+
+KEYFRAME_INTERVAL = 50
+
+# A tick moves the head by one cell; polled producers may skip a few ticks.
+# Anything further apart than this is sent as a keyframe instead.
+MAX_HEAD_SHIFT = 16
+
+
+def snake_delta(old: List[dict], new: List[dict]) -> Optional[dict]:
+    """Heads added and tail cells removed between two snakes, or None."""
+    if old == new:
+        return {}
+    if not old or not new:
+        return None
+    # The old head must reappear within the first few cells of the new snake.
+    # A short snake may have moved past it entirely (shift == len(new)), which
+    # is just a bounded full replacement.
+    shift = None
+    for k in range(min(MAX_HEAD_SHIFT, len(new)) + 1):
+        if k == len(new) or new[k] == old[0]:
+            shift = k
+            break
+    if shift is None:
+        return None
+    # Legal moves only ever add heads and drop tails, so matching both ends
+    # is enough to know the middle is unchanged.
+    kept = len(new) - shift
+    if kept > len(old) or (kept and new[-1] != old[kept - 1]):
+        return None
+    delta: Dict[str, Any] = {}
+    if shift:
+        delta["head"] = new[:shift]
+    if len(old) - kept:
+        delta["tailRemoved"] = len(old) - kept
+    return delta
+
+
+def apply_delta(state: dict, delta: dict) -> dict:
+    """Client-side reference: rebuild the next state from a delta."""
+    state = dict(state)
+    snake = state.get("snake", [])
+    removed = delta.get("tailRemoved", 0)
+    if removed:
+        snake = snake[: len(snake) - removed]
+    state["snake"] = list(delta.get("head", [])) + list(snake)
+    for key, value in delta.items():
+        if key not in ("type", "seq", "head", "tailRemoved"):
+            state[key] = value
+    return state
+
+
+class Frame:
+    """One published state, with its encodings built lazily and shared."""
+
+    __slots__ = ("seq", "state", "changes", "_full", "_keyframe", "_delta", "_encoded")
+
+    def __init__(self, seq: int, state: dict, changes: Optional[dict]):
+        self.seq = seq
+        self.state = state
+        self.changes = changes  # delta from the previous frame, None = keyframe only
+        self._full: Optional[str] = None
+        self._keyframe: Optional[str] = None
+        self._delta: Optional[str] = None
+        self._encoded: Optional[Dict[str, Any]] = None
+
+    @property
+    def delta(self) -> Optional[str]:
+        if self.changes is None:
+            return None
+        if self._delta is None:
+            self._delta = json.dumps({"type": "delta", "seq": self.seq, **self.changes})
+        return self._delta
+
+    def encoded(self, name: str, build: Callable[["Frame"], Any]) -> Any:
+        # Cache for encodings defined elsewhere (e.g. the binary wire format)
+        if self._encoded is None:
+            self._encoded = {}
+        value = self._encoded.get(name)
+        if value is None:
+            value = self._encoded[name] = build(self)
+        return value
+
+    @property
+    def full(self) -> str:
+        # Legacy payload: the plain ActiveGame JSON
+        if self._full is None:
+            self._full = json.dumps(self.state)
+        return self._full
+
+    @property
+    def keyframe(self) -> str:
+        if self._keyframe is None:
+            self._keyframe = json.dumps({"type": "keyframe", "seq": self.seq, "game": self.state})
+        return self._keyframe
+
+
+class FrameEncoder:
+    """Turns a game's successive states into sequenced frames."""
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.previous: Optional[dict] = None
+
+    def encode(self, state: dict) -> Frame:
+        self.seq += 1
+        delta = None
+        if self.previous is not None and self.seq % self.keyframe_interval:
+            delta = self._diff(self.previous, state)
+        self.previous = state
+        return Frame(self.seq, state, delta)
+
+    def _diff(self, old: dict, new: dict) -> Optional[dict]:
+        changes = snake_delta(old.get("snake", []), new.get("snake", []))
+        if changes is None:
+            return None
+        if old.keys() != new.keys():
+            return None
+        for key, value in new.items():
+            if key != "snake" and old[key] != value:
+                changes[key] = value
+        return changes
@@ -0,0 +1,317 @@
+import asyncio
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.schemas import Direction, GameMode, GameStatus
+from app.settings import GAME_STALE_AFTER
+
+# Server-authoritative snake simulation.
+# Rules mirror frontend/src/hooks/useSnakeGame.ts: 20x20 grid, +10 per food,
+# walls end the game in WALLS mode and wrap in PASS_THROUGH, and the head may
+# not enter any cell the body occupies before it moves (tail included).
+#
+# Cells are addressed by a single int, y * width + x. The body is a deque of
+# cells (head on the left) and occupancy is a bitset, so a step is O(1) no
+# matter how long the snake is.
+
+GRID_SIZE = 20
+TICK_INTERVAL = 0.15  # seconds, the frontend's INITIAL_SPEED
+POINTS_PER_FOOD = 10
+
+# Direction codes index into these tables
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+DIRECTIONS = (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT)
+DIRECTION_CODES = {d: i for i, d in enumerate(DIRECTIONS)}
+DX = (0, 0, -1, 1)
+DY = (-1, 1, 0, 0)
+OPPOSITE = (DOWN, UP, RIGHT, LEFT)
+
+NO_FOOD = -1  # board is full
+
+IDLE_SWEEP_INTERVAL = 5.0  # seconds between GameEngine's idle checks
+
+
+def next_random(state: int) -> int:
+    # 31-bit LCG. Cheap, and easy to reproduce with NumPy (engine_batch) and
+    # when replaying recorded games.
+    return (state * 1103515245 + 12345) & 0x7FFFFFFF
+
+
+def utc_now() -> datetime:
+    # Naive UTC, as DateTime columns store it
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def seed_for(game_id: str) -> int:
+    return zlib.crc32(game_id.encode("utf-8")) & 0x7FFFFFFF
+
+
+class SnakeGame:
+    __slots__ = (
+        "id", "username", "mode", "width", "height", "body", "occupied",
+        "direction", "pending", "food", "score", "status", "rng", "ticks",
+        "started_at", "seed", "inputs", "heartbeat_at",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        username: str,
+        mode: GameMode,
+        width: int = GRID_SIZE,
+        height: int = GRID_SIZE,
+        seed: Optional[int] = None,
+        started_at: Optional[datetime] = None,
+    ):
+        self.id = id
+        self.username = username
+        self.mode = GameMode(mode)
+        self.width = width
+        self.height = height
+        self.body: deque = deque()
+        self.occupied = bytearray((width * height + 7) >> 3)
+        self.direction = RIGHT
+        self.pending = RIGHT
+        self.food = NO_FOOD
+        self.score = 0
+        self.status = GameStatus.PLAYING
+        self.rng = (seed_for(id) if seed is None else seed) & 0x7FFFFFFF
+        self.ticks = 0
+        self.started_at = started_at or datetime.now(timezone.utc)
+        # Replay log (app/replay.py): the seed plus (tick, direction) for every
+        # turn. Only games started with new() have a complete log; None means
+        # the game was picked up mid-way and cannot be replayed.
+        self.seed = self.rng
+        self.inputs: Optional[List[tuple]] = None
+        # Last input from the player (naive UTC, like the column), or when
+        # the game ended. Ticks and flushes leave it alone, so a game nobody
+        # steers goes stale.
+        started = self.started_at
+        self.heartbeat_at = started.astimezone(timezone.utc).replace(tzinfo=None) if started.tzinfo else started
+
+    @classmethod
+    def new(cls, id: str, username: str, mode: GameMode, seed: Optional[int] = None,
+            width: int = GRID_SIZE, height: int = GRID_SIZE) -> "SnakeGame":
+        # Same opening position as gameLogic.createInitialSnake
+        game = cls(id, username, mode, width, height, seed)
+        game.inputs = []
+        cx, cy = width // 2, height // 2
+        for x in (cx, cx - 1, cx - 2):
+            game._push_tail(cy * width + x)
+        game._place_food()
+        return game
+
+    @classmethod
+    def from_row(cls, row, width: int = GRID_SIZE, height: int = GRID_SIZE) -> "SnakeGame":
+        # row is an ORM ActiveGame (or anything with the same attributes)
+        game = cls(row.id, row.username, row.game_mode, width, height,
+                   seed=seed_for(row.id) ^ (row.score or 0), started_at=row.started_at)
+        for p in row.snake:
+            game._push_tail(p["y"] * width + p["x"])
+        game.food = row.food["y"] * width + row.food["x"]
+        game.direction = game.pending = DIRECTION_CODES[Direction(row.direction)]
+        game.score = row.score or 0
+        game.status = GameStatus(row.status or GameStatus.PLAYING)
+        game.heartbeat_at = getattr(row, "heartbeat_at", None) or game.heartbeat_at
+        return game
+
+    # -- occupancy bitset -------------------------------------------------
+
+    def is_occupied(self, cell: int) -> bool:
+        return (self.occupied[cell >> 3] >> (cell & 7)) & 1 == 1
+
+    def _push_tail(self, cell: int) -> None:
+        self.body.append(cell)
+        self.occupied[cell >> 3] |= 1 << (cell & 7)
+
+    # -- simulation ---------------------------------------------------------
+
+    def set_direction(self, direction) -> bool:
+        code = direction if isinstance(direction, int) else DIRECTION_CODES[Direction(direction)]
+        if code == OPPOSITE[self.direction]:
+            return False
+        self.pending = code
+        return True
+
+    def steer(self, direction) -> bool:
+        """set_direction on the player's behalf: also stamps the heartbeat."""
+        self.heartbeat_at = utc_now()
+        return self.set_direction(direction)
+
+    def step(self) -> bool:
+        """Advance one tick. Returns False once the game is over."""
+        if self.status != GameStatus.PLAYING:
+            return False
+        self.ticks += 1
+        if self.pending != self.direction and self.inputs is not None:
+            self.inputs.append((self.ticks, self.pending))
+        d = self.direction = self.pending
+        w = self.width
+        head = self.body[0]
+        x = head % w + DX[d]
+        y = head // w + DY[d]
+
+        if self.mode is GameMode.WALLS:
+            if x < 0 or x >= w or y < 0 or y >= self.height:
+                self.status = GameStatus.GAME_OVER
+                return False
+        else:
+            x %= w
+            y %= self.height
+
+        cell = y * w + x
+        occ = self.occupied
+        if (occ[cell >> 3] >> (cell & 7)) & 1:
+            self.status = GameStatus.GAME_OVER
+            return False
+
+        self.body.appendleft(cell)
+        occ[cell >> 3] |= 1 << (cell & 7)
+        if cell == self.food:
+            self.score += POINTS_PER_FOOD
+            self._place_food()
+        else:
+            tail = self.body.pop()
+            occ[tail >> 3] &= ~(1 << (tail & 7))
+        return True
+
+    def _place_food(self) -> None:
+        # Food goes to the r-th free cell in row-major order, with r drawn from
+        # the game's own RNG, so placement is deterministic per seed.
+        cells = self.width * self.height
+        free = cells - len(self.body)
+        if free <= 0:
+            self.food = NO_FOOD
+            return
+        self.rng = next_random(self.rng)
+        remaining = self.rng % free
+        occ = self.occupied
+        for i, byte in enumerate(occ):
+            vacant = ~byte & 0xFF
+            if i == len(occ) - 1 and cells & 7:
+                vacant &= (1 << (cells & 7)) - 1
+            count = vacant.bit_count()
+            if remaining >= count:
+                remaining -= count
+                continue
+            for bit in range(8):
+                if vacant >> bit & 1:
+                    if remaining == 0:
+                        self.food = (i << 3) + bit
+                        return
+                    remaining -= 1
+
+    # -- serialization --------------------------------------------------------
+
+    def position(self, cell: int) -> dict:
+        return {"x": cell % self.width, "y": cell // self.width}
+
+    def to_state(self) -> dict:
+        """Column values for models.ActiveGame."""
+        return {
+            "id": self.id,
+            "username": self.username,
+            "score": self.score,
+            "game_mode": self.mode.value,
+            "snake": [self.position(c) for c in self.body],
+            "food": self.position(self.food) if self.food != NO_FOOD else {"x": -1, "y": -1},
+            "direction": DIRECTIONS[self.direction].value,
+            "started_at": self.started_at,
+            "status": self.status.value,
+            "heartbeat_at": self.heartbeat_at,
+        }
+
+
+TickListener = Callable[[List[SnakeGame]], None]
+
+
+class GameEngine:
+    """Owns every live game in this process and steps them on a fixed tick."""
+
+    def __init__(self, tick_interval: float = TICK_INTERVAL, idle_after: float = GAME_STALE_AFTER):
+        self.tick_interval = tick_interval
+        self.idle_after = idle_after
+        self.games: Dict[str, SnakeGame] = {}
+        self.listeners: List[TickListener] = []
+        self.last_tick_seconds = 0.0
+        self._next_sweep = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.ended_idle = 0
+
+    def add(self, game: SnakeGame) -> SnakeGame:
+        self.games[game.id] = game
+        return game
+
+    def add_many(self, games: Iterable[SnakeGame]) -> None:
+        for game in games:
+            self.games[game.id] = game
+
+    def get(self, game_id: str) -> Optional[SnakeGame]:
+        return self.games.get(game_id)
+
+    def remove(self, game_id: str) -> Optional[SnakeGame]:
+        return self.games.pop(game_id, None)
+
+    def tick(self) -> List[SnakeGame]:
+        """Step every playing game once; returns the games that changed."""
+        started = time.perf_counter()
+        changed = []
+        for game in self.games.values():
+            if game.status is GameStatus.PLAYING:
+                if not game.step():
+                    # The reaper's finished timer runs from the crash
+                    game.heartbeat_at = utc_now()
+                changed.append(game)
+        if started >= self._next_sweep:
+            self._next_sweep = started + IDLE_SWEEP_INTERVAL
+            changed += self.end_idle()
+        self.last_tick_seconds = time.perf_counter() - started
+        for listener in self.listeners:
+            listener(changed)
+        return changed
+
+    def end_idle(self) -> List[SnakeGame]:
+        # Games nobody has steered for idle_after seconds are over. A snake on
+        # a wrapping board can go on forever untouched; ended here, its final
+        # state is flushed like any game-over and release_finished_games drops
+        # it, after which app/reaper.py evicts the row. Its input log is
+        # dropped too: replaying it would leave the snake alive, so it is not
+        # a game app/replay.py can store.
+        cutoff = utc_now() - timedelta(seconds=self.idle_after)
+        ended = []
+        for game in self.games.values():
+            if game.status is GameStatus.PLAYING and game.heartbeat_at < cutoff:
+                game.status = GameStatus.GAME_OVER
+                game.inputs = None
+                ended.append(game)
+        self.ended_idle += len(ended)
+        return ended
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            self.tick()
+            next_at += self.tick_interval
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+game_engine = GameEngine()
@@ -0,0 +1,240 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.engine import (
+    SnakeGame, GRID_SIZE, POINTS_PER_FOOD, NO_FOOD, DIRECTION_CODES, OPPOSITE,
+)
+from app.schemas import Direction, GameMode, GameStatus
+
+# Vectorized counterpart of app.engine: every game on one board size lives in
+# a row of a set of NumPy arrays and a tick is a handful of array operations,
+# regardless of how many games there are.
+#
+# Results are bit-for-bit those of SnakeGame.step (see
+# tests_integration/test_engine_batch.py), including food placement, so games
+# can move between the two engines freely.
+#
+# The live server does not step games here. Its tick listeners (write-behind,
+# snapshot, broadcast) read every changed game as a SnakeGame on every tick,
+# so the per-game Python work a batch would save comes straight back in
+# building those views; stepping through BatchEngine measured break-even at
+# best. It is for bulk simulation, where nothing needs per-game objects
+# between ticks (benchmarks/bench_engine_batch.py).
+#
+# Per-game layout (row g):
+#   body[g]      ring buffer of cells, body[g, head_ptr[g]] is the head and
+#                the tail sits length[g] - 1 slots behind it
+#   occupied[g]  one bool per cell
+#   head, food, direction, pending, length, score, rng, ticks, alive, wrap
+
+DX = np.array([0, 0, -1, 1], dtype=np.int32)
+DY = np.array([-1, 1, 0, 0], dtype=np.int32)
+OPPOSITE_CODES = np.array(OPPOSITE, dtype=np.int8)
+
+_ARRAYS = (
+    "head", "head_ptr", "length", "food", "direction", "pending", "score",
+    "rng", "ticks", "alive", "wrap", "body", "occupied",
+)
+
+
+class BatchEngine:
+    """All games of one board size, stepped together."""
+
+    def __init__(self, width: int = GRID_SIZE, height: int = GRID_SIZE, capacity: int = 1024):
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.count = 0
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        # Scalar metadata that never changes while a game runs
+        self.meta: List[Tuple[str, object]] = []  # (username, started_at)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        cells = self.cells
+        fresh = {
+            "head": np.zeros(capacity, np.int32),
+            "head_ptr": np.zeros(capacity, np.int32),
+            "length": np.zeros(capacity, np.int32),
+            "food": np.zeros(capacity, np.int32),
+            "direction": np.zeros(capacity, np.int8),
+            "pending": np.zeros(capacity, np.int8),
+            "score": np.zeros(capacity, np.int64),
+            "rng": np.zeros(capacity, np.int64),
+            "ticks": np.zeros(capacity, np.int64),
+            "alive": np.zeros(capacity, bool),
+            "wrap": np.zeros(capacity, bool),
+            "body": np.zeros((capacity, cells), np.int16 if cells < 2 ** 15 else np.int32),
+            "occupied": np.zeros((capacity, cells), bool),
+        }
+        for name, array in fresh.items():
+            old = getattr(self, name, None)
+            if old is not None:
+                array[: self.count] = old[: self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return self.count
+
+    # -- loading / unloading ----------------------------------------------------
+
+    def add(self, game: SnakeGame) -> int:
+        if (game.width, game.height) != (self.width, self.height):
+            raise ValueError("Game board size does not match this batch")
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        g = self.count
+        self.count += 1
+        self.ids.append(game.id)
+        self.index[game.id] = g
+        self.meta.append((game.username, game.started_at))
+
+        n = len(game.body)
+        # Stored tail..head so the head lands on head_ptr = n - 1
+        self.body[g, :n] = list(reversed(game.body))
+        self.occupied[g] = False
+        self.occupied[g, list(game.body)] = True
+        self.head_ptr[g] = n - 1
+        self.head[g] = game.body[0]
+        self.length[g] = n
+        self.food[g] = game.food
+        self.direction[g] = game.direction
+        self.pending[g] = game.pending
+        self.score[g] = game.score
+        self.rng[g] = game.rng
+        self.ticks[g] = game.ticks
+        self.alive[g] = game.status is GameStatus.PLAYING
+        self.wrap[g] = game.mode is GameMode.PASS_THROUGH
+        return g
+
+    def add_many(self, games: Iterable[SnakeGame]) -> None:
+        for game in games:
+            self.add(game)
+
+    def remove(self, game_id: str) -> None:
+        # Swap-remove keeps rows dense
+        g = self.index.pop(game_id)
+        last = self.count - 1
+        if g != last:
+            for name in _ARRAYS:
+                array = getattr(self, name)
+                array[g] = array[last]
+            moved = self.ids[last]
+            self.ids[g] = moved
+            self.meta[g] = self.meta[last]
+            self.index[moved] = g
+        self.ids.pop()
+        self.meta.pop()
+        self.count = last
+
+    def game(self, game_id: str) -> SnakeGame:
+        """Materialize one row as a SnakeGame (for serialization or handover)."""
+        g = self.index[game_id]
+        username, started_at = self.meta[g]
+        mode = GameMode.PASS_THROUGH if self.wrap[g] else GameMode.WALLS
+        game = SnakeGame(game_id, username, mode, self.width, self.height,
+                         seed=int(self.rng[g]), started_at=started_at)
+        n = int(self.length[g])
+        slots = (int(self.head_ptr[g]) - np.arange(n)) % self.cells
+        game.body = deque(int(c) for c in self.body[g, slots])
+        game.occupied = bytearray(np.packbits(self.occupied[g], bitorder="little").tobytes())
+        game.food = int(self.food[g])
+        game.direction = int(self.direction[g])
+        game.pending = int(self.pending[g])
+        game.score = int(self.score[g])
+        game.ticks = int(self.ticks[g])
+        game.status = GameStatus.PLAYING if self.alive[g] else GameStatus.GAME_OVER
+        return game
+
+    # -- input ----------------------------------------------------------------------
+
+    def set_direction(self, game_id: str, direction) -> bool:
+        code = direction if isinstance(direction, int) else DIRECTION_CODES[Direction(direction)]
+        g = self.index[game_id]
+        if code == OPPOSITE[self.direction[g]]:
+            return False
+        self.pending[g] = code
+        return True
+
+    def set_directions(self, rows: np.ndarray, codes: np.ndarray) -> None:
+        """Vectorized set_direction for many rows at once."""
+        ok = codes != OPPOSITE_CODES[self.direction[rows]]
+        self.pending[rows[ok]] = codes[ok]
+
+    # -- simulation -----------------------------------------------------------------
+
+    def tick(self) -> np.ndarray:
+        """Step every live game once; returns the rows that were stepped."""
+        n = self.count
+        w, h, cells = self.width, self.height, self.cells
+        rows = np.flatnonzero(self.alive[:n])
+        if rows.size == 0:
+            return rows
+
+        d = self.pending[rows]
+        self.direction[rows] = d
+        self.ticks[rows] += 1
+        head = self.head[rows]
+        x = head % w + DX[d]
+        y = head // w + DY[d]
+
+        wrap = self.wrap[rows]
+        x = np.where(wrap, x % w, x)
+        y = np.where(wrap, y % h, y)
+        out = ~wrap & ((x < 0) | (x >= w) | (y < 0) | (y >= h))
+        cell = np.where(out, 0, y * w + x)
+        dead = out | self.occupied[rows, cell]
+        self.alive[rows[dead]] = False
+
+        live = ~dead
+        m = rows[live]
+        cell = cell[live]
+        ptr = (self.head_ptr[m] + 1) % cells
+        self.head_ptr[m] = ptr
+        self.body[m, ptr] = cell
+        self.occupied[m, cell] = True
+        self.head[m] = cell
+
+        ate = cell == self.food[m]
+        grow = m[ate]
+        move = m[~ate]
+        # Tail is `length` slots behind the new head
+        tail_slot = (self.head_ptr[move] - self.length[move]) % cells
+        self.occupied[move, self.body[move, tail_slot]] = False
+
+        if grow.size:
+            self.length[grow] += 1
+            self.score[grow] += POINTS_PER_FOOD
+            self._place_food(grow)
+        return rows
+
+    def _place_food(self, rows: np.ndarray) -> None:
+        # Same rule as SnakeGame._place_food: the r-th free cell in row-major
+        # order, r from the game's LCG. The RNG only advances if a cell is free.
+        free = self.cells - self.length[rows]
+        full = free <= 0
+        self.food[rows[full]] = NO_FOOD
+        rows = rows[~full]
+        if rows.size == 0:
+            return
+        rng = (self.rng[rows] * 1103515245 + 12345) & 0x7FFFFFFF
+        self.rng[rows] = rng
+        r = rng % free[~full]
+        seen = np.cumsum(~self.occupied[rows], axis=1)
+        self.food[rows] = np.argmax(seen > r[:, None], axis=1)
+
+
+def batches_by_board(games: Iterable[SnakeGame]) -> Dict[Tuple[int, int], BatchEngine]:
+    """Group games into one BatchEngine per board size."""
+    batches: Dict[Tuple[int, int], BatchEngine] = {}
+    for game in games:
+        key = (game.width, game.height)
+        batch: Optional[BatchEngine] = batches.get(key)
+        if batch is None:
+            batch = batches[key] = BatchEngine(game.width, game.height)
+        batch.add(game)
+    return batches
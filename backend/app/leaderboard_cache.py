@@ -0,0 +1,78 @@
+import hashlib
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.ranking import RankedEntry, sort_key
+
+# Response cache for the first page of GET /leaderboard, per game mode and
+# page size. Pages are stored as ready-to-send JSON bytes with their ETag.
+#
+# A new score only invalidates pages it would actually appear on: pages that
+# are not full yet, or whose last entry it beats. Everything else keeps
+# serving from memory. The TTL bounds staleness for scores written by other
+# worker processes, which this process never hears about.
+
+CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "5"))
+
+CacheKey = Tuple[Optional[str], int]  # (game_mode or None for all, limit)
+
+
+class CachedPage(NamedTuple):
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+    last_key: Optional[tuple]  # sort key of the last row, None if empty
+    full: bool
+    expires: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class LeaderboardCache:
+    def __init__(self, ttl: float = CACHE_TTL):
+        self.ttl = ttl
+        self._pages: Dict[CacheKey, CachedPage] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, game_mode: Optional[str], limit: int) -> Optional[CachedPage]:
+        page = self._pages.get((game_mode, limit))
+        if page is None or page.expires < time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return page
+
+    def put(self, game_mode: Optional[str], limit: int, body: bytes,
+            entries: List[RankedEntry], next_cursor: Optional[str] = None) -> CachedPage:
+        page = CachedPage(
+            body=body,
+            etag=make_etag(body),
+            next_cursor=next_cursor,
+            last_key=sort_key(entries[-1]) if entries else None,
+            full=len(entries) >= limit,
+            expires=time.monotonic() + self.ttl,
+        )
+        self._pages[(game_mode, limit)] = page
+        return page
+
+    def invalidate_for(self, entry: RankedEntry) -> None:
+        """Drop every cached page the new entry would show up on."""
+        key = sort_key(entry)
+        for cache_key, page in list(self._pages.items()):
+            mode = cache_key[0]
+            if mode is not None and mode != entry.game_mode:
+                continue
+            if not page.full or key < page.last_key:
+                del self._pages[cache_key]
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._pages.clear()
+
+
+leaderboard_cache = LeaderboardCache()
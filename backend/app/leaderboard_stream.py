@@ -0,0 +1,141 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from app.ranking import ALL_MODES, RankedEntry, Rankings, rankings
+from app.rollups import utc_naive
+from app.serialization import LeaderboardRow, dumps, leaderboard_entries
+from app.settings import env_int
+
+# Live top-K for GET /leaderboard/stream.
+# Listeners are grouped by topic: (game mode or ALL_MODES, K). crud calls
+# added() once per new score, after the rank index has taken it. For every
+# watched topic whose top K the score enters, the change is worked out once
+# from the rank index and the same rendered SSE message is queued for all of
+# that topic's listeners. Nothing is queried per listener, and a score that
+# misses every watched top K costs one rank lookup per topic.
+#
+# Events (the data is JSON; `seq` counts changes per topic):
+#
+#   snapshot  {"seq", "entries": [LeaderboardEntry, ...]}   on connect
+#   change    {"seq", "entered": LeaderboardEntry,
+#              "moved": [{"id", "rank"}, ...],    pushed one place down
+#              "dropped": [id, ...]}              pushed out of the top K
+#
+# A listener that falls STREAM_QUEUE messages behind loses them and gets a
+# fresh snapshot instead. Like the rank index, the feed is per worker: it
+# sees the scores submitted to this process.
+
+STREAM_MAX_TOP = env_int("LEADERBOARD_STREAM_MAX_TOP", 50)
+STREAM_QUEUE = env_int("LEADERBOARD_STREAM_QUEUE", 64)
+
+Topic = Tuple[Optional[str], int]
+
+
+def _row(entry: RankedEntry, rank: int) -> LeaderboardRow:
+    # Naive UTC like rows read back from the database, so dates match GET /leaderboard
+    return LeaderboardRow(entry.id, entry.username, entry.score, entry.game_mode, utc_naive(entry.date), rank)
+
+
+def _event(kind: str, seq: int, body: dict) -> str:
+    return f"id: {seq}\nevent: {kind}\ndata: {dumps(body).decode()}\n\n"
+
+
+class Listener:
+    def __init__(self, feed: "LeaderboardFeed", topic: Topic, maxsize: int):
+        self.feed = feed
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, message: Optional[str]) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: drop the backlog and start over from the current top K
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.feed.snapshot(self.topic) if message is not None else None)
+            self.feed.resyncs += 1
+
+    async def get(self) -> Optional[str]:
+        """Next SSE message; None once the feed is closing."""
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.feed.unsubscribe(self)
+
+
+class LeaderboardFeed:
+    def __init__(self, rankings: Rankings = rankings, queue_size: int = STREAM_QUEUE):
+        self.rankings = rankings
+        self.queue_size = queue_size
+        self._topics: Dict[Topic, List[Listener]] = {}
+        self._seq: Dict[Topic, int] = {}
+
+        # Counters
+        self.changes = 0
+        self.sent = 0
+        self.resyncs = 0
+
+    def subscribe(self, game_mode: Optional[str], k: int) -> Listener:
+        topic = (game_mode, k)
+        listener = Listener(self, topic, self.queue_size)
+        self._topics.setdefault(topic, []).append(listener)
+        listener.offer(self.snapshot(topic))
+        return listener
+
+    def unsubscribe(self, listener: Listener) -> None:
+        listeners = self._topics.get(listener.topic)
+        if listeners and listener in listeners:
+            listeners.remove(listener)
+            if not listeners:
+                del self._topics[listener.topic]
+
+    def snapshot(self, topic: Topic) -> str:
+        mode, k = topic
+        top = self.rankings.index(mode).top(k)
+        entries = leaderboard_entries(_row(e, rank) for rank, e in enumerate(top, 1))
+        return _event("snapshot", self._seq.get(topic, 0), {"seq": self._seq.get(topic, 0), "entries": entries})
+
+    def added(self, entry: RankedEntry) -> None:
+        for topic, listeners in list(self._topics.items()):
+            mode, k = topic
+            if mode is not ALL_MODES and mode != entry.game_mode:
+                continue
+            index = self.rankings.index(mode)
+            rank = index.rank(entry.id)
+            if rank is None or rank > k:
+                continue
+            # Whatever now sits at ranks rank+1 .. k+1 was pushed down by one
+            below = index.top(k + 1 - rank, rank)
+            seq = self._seq[topic] = self._seq.get(topic, 0) + 1
+            message = _event("change", seq, {
+                "seq": seq,
+                "entered": leaderboard_entries([_row(entry, rank)])[0],
+                "moved": [{"id": e.id, "rank": rank + i} for i, e in enumerate(below[:k - rank], 1)],
+                "dropped": [e.id for e in below[k - rank:]],
+            })
+            self.changes += 1
+            for listener in listeners:
+                listener.offer(message)
+            self.sent += len(listeners)
+
+    def listener_count(self) -> int:
+        return sum(len(listeners) for listeners in self._topics.values())
+
+    def close(self) -> None:
+        # Ends every open stream (shutdown)
+        for listeners in list(self._topics.values()):
+            for listener in list(listeners):
+                listener.offer(None)
+
+    def stats(self) -> dict:
+        return {
+            "listeners": self.listener_count(),
+            "topics": len(self._topics),
+            "changes": self.changes,
+            "sent": self.sent,
+            "resyncs": self.resyncs,
+        }
+
+
+leaderboard_feed = LeaderboardFeed()
@@ -0,0 +1,207 @@
+import asyncio
+import base64
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.engine import GRID_SIZE, SnakeGame, game_engine
+from app.models import ActiveGame
+from app.schemas import GameStatus
+from app.serialization import ACTIVE_GAME_COLUMNS
+from app.settings import PUBSUB_BACKEND, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+# Lobby feed for GET /games/active/stream: every live game on one connection.
+# A thumbnail does not need the full board at tick rate, so once per
+# LOBBY_INTERVAL the feed summarizes each game into
+#
+#   {"id", "username", "score", "gameMode", "status", "length",
+#    "head": [x, y], "food": [x, y], "grid": base64 bitmap}
+#
+# where grid is a coarse occupancy bitmap: one bit per LOBBY_CELL x LOBBY_CELL
+# block of the board (row-major, least significant bit first), set if any part
+# of the snake is in it. Each summary is encoded once per pass; a viewer's
+# message is then only a join of the encoded summaries it asked for, and
+# viewers asking for the same subset share the message. Passes are skipped
+# while nobody watches.
+#
+# Games stepped by this worker are read from the engine. With more than one
+# worker (any pub/sub backend but memory) the others' games come from
+# active_games, read once per LOBBY_REMOTE_INTERVAL for all viewers.
+
+LOBBY_INTERVAL = env_float("LOBBY_INTERVAL", 0.5)
+LOBBY_REMOTE_INTERVAL = env_float("LOBBY_REMOTE_INTERVAL", 1.0)
+LOBBY_CELL = env_int("LOBBY_CELL", 4)
+LOBBY_MAX_GAMES = 200  # most games one viewer may ask for
+
+Subset = Tuple[Optional[frozenset], int]
+
+
+class LobbyViewer:
+    def __init__(self, ids: Optional[frozenset], limit: int):
+        self.subset: Subset = (ids, limit)
+        # Every message is a whole lobby, so only the newest one matters
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    def offer(self, message: Optional[bytes]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self) -> Optional[bytes]:
+        """Next SSE message; None once the feed is closing."""
+        return await self.queue.get()
+
+
+class LobbyFeed:
+    def __init__(self, engine=game_engine, session_factory=AsyncSessionLocal, interval: float = LOBBY_INTERVAL,
+                 cell: int = LOBBY_CELL, include_remote: bool = PUBSUB_BACKEND != "memory",
+                 remote_interval: float = LOBBY_REMOTE_INTERVAL):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.interval = interval
+        self.cell = cell
+        self.include_remote = include_remote
+        self.remote_interval = remote_interval
+        self.cols = -(-GRID_SIZE // cell)
+        self.rows = -(-GRID_SIZE // cell)
+        self.viewers: List[LobbyViewer] = []
+        self._remote: List[dict] = []
+        self._remote_at = float("-inf")
+        self._task: Optional[asyncio.Task] = None
+        self.seq = 0
+
+        # Counters
+        self.passes = 0
+        self.encoded = 0
+        self.messages = 0
+        self.remote_reads = 0
+        self.errors = 0
+        self.last_pass_seconds = 0.0
+
+    def subscribe(self, ids: Optional[Iterable[str]] = None, limit: int = LOBBY_MAX_GAMES) -> LobbyViewer:
+        viewer = LobbyViewer(frozenset(ids) if ids is not None else None, limit)
+        self.viewers.append(viewer)
+        return viewer
+
+    def unsubscribe(self, viewer: LobbyViewer) -> None:
+        if viewer in self.viewers:
+            self.viewers.remove(viewer)
+
+    # -- summaries ------------------------------------------------------------
+
+    def _grid(self, cells: Iterable[Tuple[int, int]]) -> str:
+        bits = bytearray((self.cols * self.rows + 7) >> 3)
+        cell, cols = self.cell, self.cols
+        for x, y in cells:
+            i = (y // cell) * cols + x // cell
+            bits[i >> 3] |= 1 << (i & 7)
+        return base64.b64encode(bits).decode()
+
+    def summarize(self, game: SnakeGame) -> dict:
+        width = game.width
+        head = game.body[0]
+        return {
+            "id": game.id, "username": game.username, "score": game.score, "gameMode": game.mode.value,
+            "status": game.status.value, "length": len(game.body),
+            "head": [head % width, head // width],
+            "food": [game.food % width, game.food // width] if game.food >= 0 else [-1, -1],
+            "grid": self._grid((c % width, c // width) for c in game.body),
+        }
+
+    def summarize_row(self, row) -> dict:
+        # ACTIVE_GAME_COLUMNS row plus status; snake and food are JSON text
+        snake, food = orjson.loads(row.snake), orjson.loads(row.food)
+        return {
+            "id": row.id, "username": row.username, "score": row.score, "gameMode": row.game_mode,
+            "status": row.status, "length": len(snake),
+            "head": [snake[0]["x"], snake[0]["y"]] if snake else [-1, -1],
+            "food": [food["x"], food["y"]],
+            "grid": self._grid((p["x"], p["y"]) for p in snake),
+        }
+
+    async def _read_remote(self) -> None:
+        local = self.engine.games
+        async with self.session_factory() as db:
+            result = await db.execute(select(*ACTIVE_GAME_COLUMNS, ActiveGame.status)
+                                      .where(ActiveGame.status == GameStatus.PLAYING.value))
+            self._remote = [self.summarize_row(row) for row in result.all() if row.id not in local]
+        self._remote_at = time.monotonic()
+        self.remote_reads += 1
+
+    # -- one pass ---------------------------------------------------------------
+
+    def _render(self, seq: int, parts: List[bytes]) -> bytes:
+        head = f'event: lobby\ndata: {{"seq":{seq},"cell":{self.cell},"cols":{self.cols},"rows":{self.rows},"games":['
+        return head.encode() + b",".join(parts) + b"]}\n\n"
+
+    async def publish(self) -> None:
+        """Summarize every game once and send each viewer its subset."""
+        if self.include_remote and time.monotonic() - self._remote_at >= self.remote_interval:
+            await self._read_remote()
+        started = time.perf_counter()
+        summaries = [self.summarize(g) for g in self.engine.games.values() if g.body]
+        local = {s["id"] for s in summaries}
+        summaries += [s for s in self._remote if s["id"] not in local]
+        summaries.sort(key=lambda s: (-s["score"], s["id"]))
+        encoded = [(s["id"], orjson.dumps(s)) for s in summaries]
+        self.encoded += len(encoded)
+
+        self.seq += 1
+        messages: Dict[Subset, bytes] = {}
+        for viewer in list(self.viewers):
+            message = messages.get(viewer.subset)
+            if message is None:
+                ids, limit = viewer.subset
+                parts = [part for id, part in encoded if ids is None or id in ids][:limit]
+                message = messages[viewer.subset] = self._render(self.seq, parts)
+            viewer.offer(message)
+        self.messages += len(messages)
+        self.passes += 1
+        self.last_pass_seconds = time.perf_counter() - started
+
+    async def run(self) -> None:
+        while True:
+            if self.viewers:
+                try:
+                    await self.publish()
+                except Exception:
+                    self.errors += 1
+                    logger.exception("Lobby pass failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        # Ends every open stream
+        for viewer in self.viewers:
+            viewer.offer(None)
+        self.viewers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "viewers": len(self.viewers),
+            "passes": self.passes,
+            "summariesEncoded": self.encoded,
+            "messagesRendered": self.messages,
+            "remoteReads": self.remote_reads,
+            "errors": self.errors,
+            "lastPassMs": round(self.last_pass_seconds * 1000, 3),
+        }
+
+
+lobby_feed = LobbyFeed()
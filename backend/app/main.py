@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api import auth, leaderboard, spectate
+from app.metrics import MetricsMiddleware, registry
 
 app = FastAPI(
     title="Snake Arena Online API",
@@ -22,7 +24,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+# Outermost, so it times everything else too
+app.add_middleware(MetricsMiddleware)
 
 # Include Routers
 app.include_router(auth.router, prefix="/api")
@@ -33,9 +38,120 @@ app.include_router(spectate.router, prefix="/api")
 async def root():
     return {"message": "Welcome to Snake Arena Online API"}
 
-from app.database import engine, Base
+from typing import List
+
+from app.database import engine, Base, AsyncSessionLocal, pool_status
+from app.broadcast import hub, publish_games
+from app.engine import game_engine, SnakeGame
+from app.persistence import write_behind
+from app.ranking import rankings
+from app.leaderboard_stream import leaderboard_feed
+from app.lobby import lobby_feed
+from app.rollups import rollup_job
+from app.user_cache import user_cache
+from app.hashing import password_hasher
+from app.metrics import instrument_engine, observe_tick, observe_flush, observe_reap
+from app.pubsub import pubsub
+from app.replay import replay_store
+from app.snapshot import game_snapshot
+from app.verification import score_verifier
+from app.reaper import game_reaper
+from app.schemas import GameStatus
+import app.crud as crud
+
+def release_finished_games(rows: List[dict]):
+    # Once a final state is in the DB the engine no longer needs the game
+    for row in rows:
+        if row["status"] == GameStatus.GAME_OVER.value:
+            game_engine.remove(row["id"])
+            game_snapshot.discard(row["id"])
 
 @app.on_event("startup")
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+    # Resume games that were still running when the process stopped, and
+    # build the leaderboard rank index
+    async with AsyncSessionLocal() as db:
+        rows = await crud.list_games_by_status(db, GameStatus.PLAYING.value)
+        await rankings.load(db)
+    game_engine.add_many(SnakeGame.from_row(row) for row in rows)
+    # The snapshot is newer than active_games (flushed lazily), so its games
+    # win; queue them so the table catches up on the next flush
+    for game in game_snapshot.open():
+        game_engine.add(game)
+        write_behind.mark_dirty(game.to_state(), urgent=game.status == GameStatus.GAME_OVER)
+    game_engine.listeners += [publish_games, write_behind.track, game_snapshot.track, replay_store.track,
+                              observe_tick(game_engine)]
+    write_behind.on_flush += [release_finished_games, game_snapshot.sync, observe_flush(write_behind)]
+    game_reaper.on_reap.append(observe_reap(game_reaper))
+    await pubsub.start()
+    hub.attach(pubsub)
+    write_behind.start()
+    replay_store.start()
+    game_engine.start()
+    rollup_job.start()
+    game_reaper.start()
+    lobby_feed.start()
+    score_verifier.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await rollup_job.stop()
+    await game_reaper.stop()
+    await score_verifier.stop()
+    await game_engine.stop()
+    await write_behind.stop()
+    game_snapshot.close()
+    await replay_store.stop()
+    leaderboard_feed.close()
+    await lobby_feed.stop()
+    await hub.close()
+    await pubsub.stop()
+    password_hasher.shutdown()
+
+@app.get("/stats/persistence")
+async def persistence_stats():
+    return {**write_behind.stats(), "replays": replay_store.stats(), "reaper": {**game_reaper.stats(), "endedIdle": game_engine.ended_idle},
+            "snapshot": game_snapshot.stats()}
+
+
+# Scrape-time gauges
+instrument_engine(engine)
+registry.collect("spectator_subscriptions", "Open spectator streams, by game.",
+                 lambda: (((("game_id", g),), n) for g, n in hub.subscriber_counts().items()))
+registry.collect("leaderboard_stream_listeners", "Open GET /leaderboard/stream connections.",
+                 lambda: [((), leaderboard_feed.listener_count())])
+registry.collect("lobby_stream_viewers", "Open GET /games/active/stream connections.",
+                 lambda: [((), len(lobby_feed.viewers))])
+registry.collect("games_live", "Games held by the tick engine.",
+                 lambda: [((), len(game_engine.games))])
+registry.collect("write_behind_backlog", "Games changed since the last flush.",
+                 lambda: [((), write_behind.backlog)])
+registry.collect("db_pool_checked_out", "Connections currently checked out of the pool.",
+                 lambda: [((), pool_status().get("checkedOut", 0))])
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/pubsub")
+async def pubsub_stats():
+    return pubsub.stats()
+
+@app.get("/stats/verification")
+async def verification_stats():
+    return score_verifier.stats()
+
+@app.get("/stats/stream")
+async def stream_stats():
+    return {"leaderboard": leaderboard_feed.stats(), "lobby": lobby_feed.stats()}
+
+@app.get("/stats/db")
+async def db_stats():
+    return pool_status()
+
+@app.get("/stats/auth")
+async def auth_stats():
+    return {**user_cache.stats(), "hashing": password_hasher.stats()}
@@ -0,0 +1,241 @@
+from contextvars import ContextVar
+from time import perf_counter
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Prometheus-style metrics, rendered in the text exposition format by
+# GET /metrics. Kept dependency-free and cheap: recording a request is a few
+# dict lookups, one bisect and some integer adds, with no locks (everything
+# runs on the event loop thread).
+#
+# HTTP metrics are labelled by route template ("/api/games/{id}"), never by
+# raw path, so label sets stay bounded. Request latency is measured to the
+# response headers, so long-lived SSE streams report their time to first
+# byte rather than their lifetime.
+#
+# SQL statements are also counted per route: the middleware hands each
+# request a counter through a context variable and the engine hooks bump it,
+# so N+1 queries show up as a statements-per-request ratio. Statements from
+# background jobs (write-behind, reaper) have no request and are not counted.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, out = 0, []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+
+class Family:
+    """One metric name with a set of labelled series."""
+
+    def __init__(self, name: str, kind: str, help: str):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.series: Dict[Labels, object] = {}
+
+    def histogram(self, labels: Labels = ()) -> Histogram:
+        h = self.series.get(labels)
+        if h is None:
+            h = self.series[labels] = Histogram()
+        return h
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def set(self, labels: Labels, value: float) -> None:
+        self.series[labels] = value
+
+
+def _labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.families: Dict[str, Family] = {}
+        # Gauges read at scrape time: callables yielding (labels, value)
+        self.collectors: List[Tuple[Family, Callable[[], Iterable[Tuple[Labels, float]]]]] = []
+
+    def family(self, name: str, kind: str, help: str) -> Family:
+        fam = self.families.get(name)
+        if fam is None:
+            fam = self.families[name] = Family(name, kind, help)
+        return fam
+
+    def collect(self, name: str, help: str, fn: Callable[[], Iterable[Tuple[Labels, float]]]) -> None:
+        self.collectors.append((Family(name, "gauge", help), fn))
+
+    def render(self) -> str:
+        lines = []
+        families = list(self.families.values())
+        for fam, fn in self.collectors:
+            fam.series = dict(fn())
+            families.append(fam)
+        for fam in families:
+            lines.append(f"# HELP {fam.name} {fam.help}")
+            lines.append(f"# TYPE {fam.name} {fam.kind}")
+            for labels, value in fam.series.items():
+                if isinstance(value, Histogram):
+                    for bound, n in zip(value.bounds + (float("inf"),), value.cumulative()):
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{fam.name}_bucket{_labels(labels, ('le', le))} {n}")
+                    lines.append(f"{fam.name}_sum{_labels(labels)} {_number(value.sum)}")
+                    lines.append(f"{fam.name}_count{_labels(labels)} {value.count}")
+                else:
+                    lines.append(f"{fam.name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for fam in self.families.values():
+            fam.series.clear()
+
+
+registry = Registry()
+
+http_requests = registry.family("http_requests_total", "counter", "HTTP requests by route and status.")
+http_latency = registry.family("http_request_duration_seconds", "histogram",
+                               "Time from request to response headers, by route.")
+http_in_flight = registry.family("http_requests_in_flight", "gauge", "Requests currently being handled, by method.")
+db_queries = registry.family("db_query_duration_seconds", "histogram", "SQL statement execution time, by statement kind.")
+http_db_statements = registry.family("http_db_statements_total", "counter",
+                                     "SQL statements run while handling requests, by route.")
+tick_latency = registry.family("game_tick_duration_seconds", "histogram", "Time to step every live game once.")
+flush_latency = registry.family("write_behind_flush_duration_seconds", "histogram",
+                                "Time to flush dirty games to the database.")
+games_evicted = registry.family("games_evicted_total", "counter", "Rows removed from active_games, by reason.")
+
+UNMATCHED = "unmatched"
+
+# Statements run so far by the request being handled, as a one-item list
+_request_statements: ContextVar[Optional[List[int]]] = ContextVar("request_statements", default=None)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; BaseHTTPMiddleware would cost a task per request."""
+
+    def __init__(self, app):
+        self.app = app
+        # Label tuples are built once per (method, route[, status]) and reused
+        self._keys: Dict[tuple, Labels] = {}
+
+    def _key(self, parts: tuple) -> Labels:
+        key = self._keys.get(parts)
+        if key is None:
+            names = ("method", "route", "status")[:len(parts)]
+            key = self._keys[parts] = tuple(zip(names, parts))
+        return key
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = perf_counter()
+        method = scope["method"]
+        status = 500
+        first_byte = 0.0
+        # The route is only known once routing ran, so in-flight is per method
+        in_flight = self._key((method,))
+        series = http_in_flight.series
+        series[in_flight] = series.get(in_flight, 0) + 1
+        statements = [0]
+        token = _request_statements.set(statements)
+
+        async def send_wrapper(message):
+            nonlocal status, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                first_byte = perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else UNMATCHED
+            series[in_flight] -= 1
+            _request_statements.reset(token)
+            http_requests.inc(self._key((method, path, status)))
+            http_db_statements.inc(self._key((method, path)), statements[0])
+            http_latency.histogram(self._key((method, path))).observe(
+                (first_byte or perf_counter()) - started)
+
+
+def instrument_engine(engine) -> None:
+    """Time every SQL statement run through an (async) engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["query_started"].pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement else "OTHER"
+        db_queries.histogram((("kind", kind),)).observe(elapsed)
+        statements = _request_statements.get()
+        if statements is not None:
+            statements[0] += 1
+
+    @event.listens_for(sync_engine, "handle_error")
+    def failed(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def observe_tick(engine) -> Callable:
+    """GameEngine tick listener recording how long the tick took."""
+    hist = tick_latency.histogram()
+
+    def listener(games) -> None:
+        hist.observe(engine.last_tick_seconds)
+    return listener
+
+
+def observe_flush(store) -> Callable:
+    """WriteBehindStore flush hook recording how long the flush took."""
+    hist = flush_latency.histogram()
+
+    def hook(rows) -> None:
+        hist.observe(store.last_flush_seconds)
+    return hook
+
+
+def observe_reap(reaper) -> Callable:
+    """GameReaper hook counting evictions by reason."""
+    def hook(counts) -> None:
+        for reason, n in counts.items():
+            games_evicted.inc((("reason", reason),), n)
+    return hook
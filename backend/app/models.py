@@ -1,20 +1,44 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SAEnum, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SAEnum, JSON, ForeignKey, Index, LargeBinary
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
-import uuid
 
 from app.database import Base
+from app.ids import from_bytes, new_id, to_bytes
 from app.schemas import GameMode, Direction, GameStatus
 
 # Helper definitions for Enums if needed, or use String
-# Helper for GUID
+# Helper for GUID: time-ordered, see app/ids.py
 def generate_uuid():
-    return str(uuid.uuid4())
+    return new_id()
+
+class BinaryId(TypeDecorator):
+    # An app/ids.py id stored in 16 bytes: Postgres' native uuid, a 16-byte
+    # BLOB elsewhere. Python code (and the API) always sees the usual text
+    # form; the conversion happens when values are bound and rows are read.
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return to_bytes(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return from_bytes(value)
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(BinaryId, primary_key=True, default=generate_uuid)
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
@@ -23,7 +47,7 @@ class User(Base):
 class LeaderboardEntry(Base):
     __tablename__ = "leaderboard"
 
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(BinaryId, primary_key=True, default=generate_uuid)
     username = Column(String, index=True, nullable=False) # In real app, ForeignKey to users.id
     score = Column(Integer, nullable=False)
     game_mode = Column(String, nullable=False) # Store Enum as string
@@ -31,7 +55,16 @@ class LeaderboardEntry(Base):
     
     # We don't store rank, it's calculated on query key
 
+    # Match the ORDER BY clauses in crud.py (see the 3f6a1c2d8b90 migration)
+    __table_args__ = (
+        Index("ix_leaderboard_mode_score", "game_mode", score.desc(), "date", "id"),
+        Index("ix_leaderboard_score", score.desc(), "date", "id"),
+        Index("ix_leaderboard_user_mode_score", "username", "game_mode", score.desc(), "date", "id"),
+    )
+
 class ActiveGame(Base):
+    # Game ids stay text: they travel through URLs, pub/sub channels and the
+    # snapshot file as they are. New ones are still time-ordered.
     __tablename__ = "active_games"
 
     id = Column(String, primary_key=True, default=generate_uuid)
@@ -42,4 +75,86 @@ class ActiveGame(Base):
     food = Column(JSON, nullable=False)  # dict or Position
     direction = Column(String, nullable=False)
     started_at = Column(DateTime, default=datetime.utcnow)
-    status = Column(String, default="playing") # idle, playing, paused, game-over
+    status = Column(String, default="playing", index=True) # idle, playing, paused, game-over
+    # Last input from the player, or the end of the game (SnakeGame.heartbeat_at,
+    # written by every flush). The engine ends games left alone for
+    # GAME_STALE_AFTER; a playing row older than that has lost its worker.
+    # app/reaper.py evicts both.
+    heartbeat_at = Column(DateTime, default=datetime.utcnow)
+
+class PersonalBest(Base):
+    # Best score per player and mode, kept current by crud.add_score
+    __tablename__ = "personal_bests"
+
+    username = Column(String, primary_key=True)
+    game_mode = Column(String, primary_key=True)
+    score = Column(Integer, nullable=False)
+    date = Column(DateTime, nullable=False)
+    entry_id = Column(BinaryId, nullable=False) # leaderboard.id of the best run
+
+    __table_args__ = (
+        Index("ix_personal_bests_mode_score", "game_mode", score.desc(), "date", "entry_id"),
+        Index("ix_personal_bests_score", score.desc(), "date", "entry_id"),
+    )
+
+class LeaderboardRollup(Base):
+    # Best score per player, mode and day/week, refreshed by app/rollups.py
+    __tablename__ = "leaderboard_rollups"
+
+    period = Column(String, primary_key=True) # day, week
+    period_start = Column(DateTime, primary_key=True)
+    game_mode = Column(String, primary_key=True)
+    username = Column(String, primary_key=True)
+    score = Column(Integer, nullable=False)
+    date = Column(DateTime, nullable=False)
+    entry_id = Column(BinaryId, nullable=False)
+
+    __table_args__ = (
+        Index("ix_rollups_mode_score", "period", "period_start", "game_mode", score.desc(), "date", "entry_id"),
+        Index("ix_rollups_score", "period", "period_start", score.desc(), "date", "entry_id"),
+    )
+
+class RollupState(Base):
+    # Watermarks for incremental background jobs
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=True)
+
+class GameReplay(Base):
+    # Input log of a finished game (app/replay.py), written once, never updated
+    __tablename__ = "game_replays"
+
+    game_id = Column(String, primary_key=True)
+    username = Column(String, index=True, nullable=False)
+    game_mode = Column(String, nullable=False)
+    score = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    data = Column(LargeBinary, nullable=False)
+
+class ScoreVerification(Base):
+    # A score submitted with its input log; it reaches the leaderboard only
+    # once a replay of the log reproduces it (app/verification.py)
+    __tablename__ = "score_verifications"
+
+    id = Column(BinaryId, primary_key=True, default=generate_uuid)
+    username = Column(String, index=True, nullable=False)
+    game_mode = Column(String, nullable=False)
+    score = Column(Integer, nullable=False)
+    seed = Column(Integer, nullable=False)
+    inputs = Column(JSON, nullable=False)  # [[tick, direction code], ...]
+    status = Column(String, default="pending", index=True, nullable=False)  # pending, verified, rejected
+    reason = Column(String, nullable=True)
+    ticks = Column(Integer, nullable=True)
+    entry_id = Column(BinaryId, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    verified_at = Column(DateTime, nullable=True)
+    # Replay protection: the server-issued seed nonce is spent once, and a
+    # player cannot submit the same seed and log again under a new nonce
+    nonce = Column(String, nullable=True)
+    proof_hash = Column(String, nullable=True)  # sha256 of seed and inputs
+
+    __table_args__ = (
+        Index("ux_score_verifications_nonce", "nonce", unique=True),
+        Index("ux_score_verifications_proof", "username", "proof_hash", unique=True),
+    )
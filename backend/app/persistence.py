@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import update
+
+from app.database import AsyncSessionLocal, dialect_insert, writer
+from app.models import ActiveGame
+from app.settings import env_float
+from app.snapshot import SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+# Write-behind persistence for live games.
+# The engine is the source of truth while a game runs; active_games is only
+# brought up to date every FLUSH_INTERVAL seconds with one bulk statement for
+# all games that changed since the last flush. A game-over (or shutdown)
+# forces an immediate flush so final states are never lost.
+#
+# With the snapshot file turned on (GAME_SNAPSHOT_PATH, app/snapshot.py) a
+# restart no longer depends on active_games being current, so the default
+# interval relaxes to 5 seconds.
+
+FLUSH_INTERVAL = env_float("GAME_FLUSH_INTERVAL", 5.0 if SNAPSHOT_PATH else 1.0)
+
+FlushHook = Callable[[List[dict]], None]
+
+
+def upsert_statement(dialect_name: str):
+    # Both SQLite and Postgres speak INSERT .. ON CONFLICT DO UPDATE; anything
+    # else gets a plain bulk UPDATE by primary key.
+    insert = dialect_insert(dialect_name)
+    if insert is None:
+        return update(ActiveGame)
+    stmt = insert(ActiveGame)
+    columns = [c.name for c in ActiveGame.__table__.columns if c.name != "id"]
+    return stmt.on_conflict_do_update(
+        index_elements=[ActiveGame.id],
+        set_={name: stmt.excluded[name] for name in columns},
+    )
+
+
+class WriteBehindStore:
+    def __init__(self, session_factory=AsyncSessionLocal, interval: float = FLUSH_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.on_flush: List[FlushHook] = []
+        self._dirty: Dict[str, dict] = {}
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_flush_size = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.errors = 0
+
+    @property
+    def backlog(self) -> int:
+        return len(self._dirty)
+
+    def mark_dirty(self, state: dict, urgent: bool = False) -> None:
+        # Only the newest state per game is kept, so a game that changed on
+        # every tick since the last flush still costs a single row.
+        self._dirty[state["id"]] = state
+        if urgent:
+            self._wake.set()
+
+    def track(self, games) -> None:
+        """GameEngine tick listener."""
+        urgent = False
+        for game in games:
+            state = game.to_state()
+            self._dirty[game.id] = state
+            urgent = urgent or state["status"] == "game-over"
+        if urgent:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._dirty:
+                return 0
+            batch, self._dirty = self._dirty, {}
+            rows = list(batch.values())
+            started = time.perf_counter()
+            try:
+                async with self.session_factory() as db, writer(db):
+                    dialect = db.get_bind().dialect.name
+                    await db.execute(upsert_statement(dialect), rows)
+                    await db.commit()
+            except Exception:
+                # Put the rows back unless a newer state arrived meanwhile
+                self.errors += 1
+                for row in rows:
+                    self._dirty.setdefault(row["id"], row)
+                logger.exception("Flushing %d games failed", len(rows))
+                raise
+            elapsed = time.perf_counter() - started
+
+            self.flushes += 1
+            self.rows_flushed += len(rows)
+            self.last_flush_size = len(rows)
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        for hook in self.on_flush:
+            hook(rows)
+        return len(rows)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Already logged and re-queued; try again next interval
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Hard flush on shutdown
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "rowsFlushed": self.rows_flushed,
+            "lastFlushSize": self.last_flush_size,
+            "lastFlushMs": round(self.last_flush_seconds * 1000, 3),
+            "maxFlushMs": round(self.max_flush_seconds * 1000, 3),
+            "backlog": self.backlog,
+            "errors": self.errors,
+        }
+
+
+write_behind = WriteBehindStore()
@@ -0,0 +1,353 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Set
+
+from app.settings import DATABASE_URL, PUBSUB_BACKEND, PUBSUB_PEER_HIGH_WATER, PUBSUB_SOCKET
+
+logger = logging.getLogger(__name__)
+
+# Cross-worker fan-out of live game state.
+# A game is stepped by exactly one worker (the one that started it). Any other
+# worker can have spectators for it; without pub/sub they would only see the
+# game through the DB, a write-behind flush plus a poll behind.
+#
+# Workers exchange two kinds of message on one shared channel:
+#
+#   {"o": origin, "t": "watch", "g": game_id}              someone here watches g
+#   {"o": origin, "t": "state", "g": game_id, "s": {...}}  new state of g
+#
+# Owners only publish states of games some other worker has asked for, and
+# watch announcements expire unless refreshed, so traffic follows what is
+# actually being watched rather than every game on every tick.
+#
+# Backends only move opaque messages:
+#   MemoryPubSub    in-process; instances sharing a broker see each other
+#   SocketPubSub    workers on one host via a Unix socket; the first worker
+#                   to start hosts the relay
+#   PostgresPubSub  LISTEN/NOTIFY on the application database
+
+WATCH_REFRESH = 5.0  # seconds between re-announcing watched games
+WATCH_TTL = 15.0     # a remote watch lapses after this long without a refresh
+CHANNEL = "snake_arena_games"
+
+StateHandler = Callable[[str, dict], None]
+
+
+class PubSub(abc.ABC):
+    def __init__(self):
+        self.origin = uuid.uuid4().hex[:12]
+        self.handlers: List[StateHandler] = []
+        self._watching: Set[str] = set()
+        self._remote_watch: Dict[str, float] = {}
+        self._refresher: Optional[asyncio.Task] = None
+
+        # Counters
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    # Transport, implemented by backends
+
+    async def _connect(self) -> None:
+        pass
+
+    async def _disconnect(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _send(self, message: dict) -> None:
+        ...
+
+    # Protocol
+
+    async def start(self) -> None:
+        await self._connect()
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+        await self._disconnect()
+
+    def watch(self, game_id: str) -> None:
+        self._watching.add(game_id)
+        self._emit({"t": "watch", "g": game_id})
+
+    def unwatch(self, game_id: str) -> None:
+        self._watching.discard(game_id)
+
+    def watched_remotely(self, game_id: str) -> bool:
+        expires = self._remote_watch.get(game_id)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._remote_watch[game_id]
+            return False
+        return True
+
+    def publish(self, game_id: str, state: dict) -> None:
+        self._emit({"t": "state", "g": game_id, "s": state})
+
+    def _emit(self, message: dict) -> None:
+        message["o"] = self.origin
+        try:
+            self._send(message)
+            self.sent += 1
+        except Exception:
+            logger.exception("Publishing %s for game %s failed", message["t"], message["g"])
+
+    def _dispatch(self, message: dict) -> None:
+        if message.get("o") == self.origin:
+            return
+        self.received += 1
+        kind, game_id = message.get("t"), message.get("g")
+        if kind == "watch":
+            self._remote_watch[game_id] = time.monotonic() + WATCH_TTL
+        elif kind == "state" and game_id in self._watching:
+            for handler in self.handlers:
+                handler(game_id, message["s"])
+
+    async def _refresh(self) -> None:
+        while True:
+            await asyncio.sleep(WATCH_REFRESH)
+            for game_id in list(self._watching):
+                self._emit({"t": "watch", "g": game_id})
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "watching": len(self._watching),
+            "watchedRemotely": sum(1 for g in list(self._remote_watch) if self.watched_remotely(g)),
+        }
+
+
+class MemoryBroker:
+    def __init__(self):
+        self.members: Set["MemoryPubSub"] = set()
+
+
+_default_broker = MemoryBroker()
+
+
+class MemoryPubSub(PubSub):
+    def __init__(self, broker: MemoryBroker = _default_broker):
+        super().__init__()
+        self.broker = broker
+
+    async def _connect(self) -> None:
+        self.broker.members.add(self)
+
+    async def _disconnect(self) -> None:
+        self.broker.members.discard(self)
+
+    def _send(self, message: dict) -> None:
+        for member in list(self.broker.members):
+            if member is not self:
+                # Deliver on the next loop turn, like a real transport would
+                asyncio.get_running_loop().call_soon(member._dispatch, message)
+
+
+class SocketPubSub(PubSub):
+    """Workers on one host, relayed through a Unix socket.
+
+    Every worker tries to connect to the socket; if nobody is listening it
+    becomes the relay itself. The relay forwards each line to every other
+    connection. If the relay's worker exits, the others reconnect and one of
+    them takes over.
+    """
+
+    RETRY_DELAY = 0.2
+
+    def __init__(self, path: str = PUBSUB_SOCKET, high_water: int = PUBSUB_PEER_HIGH_WATER):
+        super().__init__()
+        self.path = path
+        self.high_water = high_water
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def is_relay(self) -> bool:
+        return self._server is not None
+
+    async def _connect(self) -> None:
+        self._closing = False
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+                self._reader_task = asyncio.create_task(self._read(reader))
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass
+            try:
+                # Nobody listening: clear a stale socket file and relay ourselves
+                if os.path.exists(self.path):
+                    os.unlink(self.path)
+                self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+                return
+            except OSError:
+                # Another worker won the race; connect to it instead
+                await asyncio.sleep(self.RETRY_DELAY)
+
+    async def _disconnect(self) -> None:
+        self._closing = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._server is not None:
+            self._server.close()
+            for peer in list(self._peers):
+                peer.close()
+            self._peers.clear()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _send(self, message: dict) -> None:
+        line = (json.dumps(message, separators=(",", ":")) + "\n").encode()
+        if self._server is not None:
+            self._fan_out(line, None)
+        elif self._writer is not None:
+            self._write(self._writer, line)
+
+    def _write(self, peer: asyncio.StreamWriter, line: bytes) -> None:
+        # Nothing drains these writers. States supersede each other and
+        # watches are refreshed, so past the high-water mark a slow worker
+        # loses messages rather than growing the sender's memory.
+        if peer.transport.get_write_buffer_size() > self.high_water:
+            self.dropped += 1
+            return
+        peer.write(line)
+
+    def _fan_out(self, line: bytes, source: Optional[asyncio.StreamWriter]) -> None:
+        for peer in list(self._peers):
+            if peer is not source:
+                self._write(peer, line)
+
+    def _parse(self, line: bytes) -> Optional[dict]:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            logger.warning("Ignoring malformed pub/sub line %r", line[:80])
+            return None
+        return message
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._peers.add(writer)
+        try:
+            while line := await reader.readline():
+                message = self._parse(line)
+                if message is not None:
+                    self._fan_out(line, writer)
+                    self._dispatch(message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                message = self._parse(line)
+                if message is not None:
+                    self._dispatch(message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        if not self._closing:
+            # The relay went away; find or become the new one
+            logger.warning("Pub/sub relay at %s closed, reconnecting", self.path)
+            self._writer = None
+            await asyncio.sleep(self.RETRY_DELAY)
+            await self._connect()
+
+
+class PostgresPubSub(PubSub):
+    # NOTIFY payloads are capped at 8000 bytes. Longer states are sent without
+    # the state; receivers then read it through the hub's loader instead.
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, dsn: str = DATABASE_URL):
+        super().__init__()
+        # asyncpg wants a plain postgresql:// DSN
+        self.dsn = dsn.replace("postgresql+asyncpg://", "postgresql://").replace("postgres://", "postgresql://")
+        self._conn = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._sender: Optional[asyncio.Task] = None
+        self.oversized = 0
+        self.on_oversized: Optional[Callable[[str], None]] = None
+
+    async def _connect(self) -> None:
+        import asyncpg
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(CHANNEL, self._notified)
+        self._outbox = asyncio.Queue()
+        self._sender = asyncio.create_task(self._drain())
+
+    async def _disconnect(self) -> None:
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def _drain(self) -> None:
+        # One connection both listens and notifies, and asyncpg runs one
+        # statement at a time per connection, so sends go through a queue
+        while True:
+            payload = await self._outbox.get()
+            try:
+                await self._conn.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+            except Exception:
+                logger.exception("NOTIFY failed")
+
+    def _notified(self, connection, pid, channel, payload: str) -> None:
+        message = json.loads(payload)
+        if message.get("t") == "state" and message.get("s") is None:
+            # Oversized state: only the game id made it through
+            if message.get("o") != self.origin and message["g"] in self._watching and self.on_oversized:
+                self.on_oversized(message["g"])
+            return
+        self._dispatch(message)
+
+    def _send(self, message: dict) -> None:
+        payload = json.dumps(message, separators=(",", ":"))
+        if len(payload) > self.MAX_PAYLOAD:
+            self.oversized += 1
+            payload = json.dumps({**message, "s": None}, separators=(",", ":"))
+        self._outbox.put_nowait(payload)
+
+
+def create_pubsub(backend: str = PUBSUB_BACKEND) -> PubSub:
+    if backend == "postgres":
+        return PostgresPubSub()
+    if backend == "socket":
+        return SocketPubSub()
+    return MemoryPubSub()
+
+
+pubsub = create_pubsub()
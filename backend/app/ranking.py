@@ -0,0 +1,117 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import LeaderboardEntry
+
+# In-memory order-statistic index over the leaderboard.
+# One sorted array per game mode (plus one across all modes) holds the keys
+# (-score, date, id), i.e. leaderboard order. Rank lookups and top-K reads are
+# a bisect, and inserting is a bisect plus one list memmove, so submissions
+# get their true global rank without a COUNT(*) over the table.
+#
+# The index is per process: it is loaded at startup and then kept current by
+# crud.add_score in this worker.
+
+ALL_MODES = None
+
+Key = Tuple[int, float, str]
+
+
+class RankedEntry(NamedTuple):
+    id: str
+    username: str
+    score: int
+    game_mode: str
+    date: datetime
+
+
+def timestamp(date: datetime) -> float:
+    # SQLite hands back naive datetimes; everything we store is UTC
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp()
+
+
+def sort_key(entry: RankedEntry) -> Key:
+    return (-entry.score, timestamp(entry.date), entry.id)
+
+
+class RankIndex:
+    def __init__(self):
+        self._keys: List[Key] = []
+        self._entries: Dict[str, RankedEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, entry: RankedEntry) -> int:
+        """Insert an entry and return its 1-based rank."""
+        key = sort_key(entry)
+        insort(self._keys, key)
+        self._entries[entry.id] = entry
+        return bisect_left(self._keys, key) + 1
+
+    def rank(self, entry_id: str) -> Optional[int]:
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return None
+        return bisect_left(self._keys, sort_key(entry)) + 1
+
+    def rank_of_score(self, score: int) -> int:
+        """Rank a score would get: one more than the number of better scores."""
+        return bisect_left(self._keys, (-score,)) + 1
+
+    def top(self, k: int, offset: int = 0) -> List[RankedEntry]:
+        return [self._entries[key[2]] for key in self._keys[offset:offset + k]]
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._entries.clear()
+
+
+class Rankings:
+    """RankIndex per game mode, plus ALL_MODES."""
+
+    def __init__(self):
+        self._indexes: Dict[Optional[str], RankIndex] = {ALL_MODES: RankIndex()}
+
+    def index(self, game_mode: Optional[str] = ALL_MODES) -> RankIndex:
+        index = self._indexes.get(game_mode)
+        if index is None:
+            index = self._indexes[game_mode] = RankIndex()
+        return index
+
+    def add(self, entry: RankedEntry) -> int:
+        """Record a score; returns its rank within its own game mode."""
+        self.index(ALL_MODES).add(entry)
+        return self.index(entry.game_mode).add(entry)
+
+    def clear(self) -> None:
+        for index in self._indexes.values():
+            index.clear()
+
+    async def load(self, db: AsyncSession) -> int:
+        self.clear()
+        result = await db.execute(select(
+            LeaderboardEntry.id, LeaderboardEntry.username, LeaderboardEntry.score,
+            LeaderboardEntry.game_mode, LeaderboardEntry.date,
+        ))
+        # Sorting once is much cheaper than len(rows) insorts
+        by_mode: Dict[Optional[str], List[RankedEntry]] = {ALL_MODES: []}
+        for row in result.all():
+            entry = RankedEntry(*row)
+            by_mode[ALL_MODES].append(entry)
+            by_mode.setdefault(entry.game_mode, []).append(entry)
+        for mode, entries in by_mode.items():
+            index = self.index(mode)
+            entries.sort(key=sort_key)
+            index._keys = [sort_key(e) for e in entries]
+            index._entries = {e.id: e for e in entries}
+        return len(by_mode[ALL_MODES])
+
+
+rankings = Rankings()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, or_
+
+from app.database import AsyncSessionLocal, writer
+from app.models import ActiveGame
+from app.schemas import GameStatus
+from app.settings import GAME_STALE_AFTER, env_float
+
+logger = logging.getLogger(__name__)
+
+# Eviction of dead rows from active_games.
+# Write-behind only ever upserts, so without this the table keeps every game
+# ever played. Each run deletes:
+#
+#   finished  game-over rows older than REAP_FINISHED_AFTER, which leaves
+#             spectators and GET /games/{id} time to see the final state
+#   stale     playing rows whose heartbeat (the player's last input) is more
+#             than GAME_STALE_AFTER old. A live worker would have ended the
+#             game by then (GameEngine.end_idle), so theirs died mid-game.
+#
+# Idle games on a live worker leave as finished rows: the engine ends them
+# and flushes the game-over, which keeps the idle-time heartbeat.
+#
+# Replays (game_replays) and scores live in their own tables and are kept.
+
+REAP_INTERVAL = env_float("GAME_REAP_INTERVAL", 30)
+REAP_FINISHED_AFTER = env_float("GAME_REAP_FINISHED_AFTER", 60)
+
+ReapHook = Callable[[Dict[str, int]], None]
+
+
+class GameReaper:
+    def __init__(self, session_factory=AsyncSessionLocal, interval: float = REAP_INTERVAL,
+                 finished_after: float = REAP_FINISHED_AFTER, stale_after: float = GAME_STALE_AFTER):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.finished_after = finished_after
+        self.stale_after = stale_after
+        self.on_reap: List[ReapHook] = []
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.runs = 0
+        self.evicted: Dict[str, int] = {"finished": 0, "stale": 0}
+        self.last_run_seconds = 0.0
+        self.errors = 0
+
+    async def run_once(self) -> Dict[str, int]:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        finished = (ActiveGame.status == GameStatus.GAME_OVER.value) & (
+            ActiveGame.heartbeat_at < now - timedelta(seconds=self.finished_after))
+        stale = (ActiveGame.status != GameStatus.GAME_OVER.value) & or_(
+            ActiveGame.heartbeat_at < now - timedelta(seconds=self.stale_after),
+            ActiveGame.heartbeat_at.is_(None))
+        counts = {}
+        async with self.session_factory() as db, writer(db):
+            for reason, condition in (("finished", finished), ("stale", stale)):
+                result = await db.execute(delete(ActiveGame).where(condition))
+                counts[reason] = result.rowcount or 0
+            await db.commit()
+
+        self.runs += 1
+        for reason, n in counts.items():
+            self.evicted[reason] += n
+        self.last_run_seconds = time.perf_counter() - started
+        for hook in self.on_reap:
+            hook(counts)
+        return counts
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Evicting dead games failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "evictedFinished": self.evicted["finished"],
+            "evictedStale": self.evicted["stale"],
+            "lastRunMs": round(self.last_run_seconds * 1000, 3),
+            "errors": self.errors,
+        }
+
+
+game_reaper = GameReaper()
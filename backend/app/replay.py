@@ -0,0 +1,304 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.database import AsyncSessionLocal, dialect_insert, writer
+from app.engine import SnakeGame, GRID_SIZE, POINTS_PER_FOOD, NO_FOOD, RIGHT, DX, DY, OPPOSITE
+from app.models import GameReplay
+from app.persistence import FLUSH_INTERVAL
+from app.schemas import GameMode, GameStatus
+
+logger = logging.getLogger(__name__)
+
+# Game replays as input logs.
+# The engine is deterministic given the seed (food placement) and the turns,
+# so a whole game is: board size, mode, seed, tick count, and the ticks at
+# which the direction changed. Everything is a varint:
+#
+#   version width height mode seed started_at ticks score n_inputs
+#   then per input: (ticks since the previous input << 2) | direction code
+#
+# A typical game is a few dozen bytes, whatever its length. Logs are written
+# once when the game ends (game_replays.data) and never rewritten.
+
+FORMAT_VERSION = 1
+MODES = (GameMode.WALLS, GameMode.PASS_THROUGH)
+
+# A submitted game whose snake is still alive after this many ticks is
+# rejected rather than simulated forever (about 4 hours at 0.15 s a tick)
+MAX_TICKS = 100_000
+
+
+class ReplayMismatch(Exception):
+    pass
+
+
+class InvalidLog(ValueError):
+    pass
+
+
+class Replay(NamedTuple):
+    width: int
+    height: int
+    mode: GameMode
+    seed: int
+    started_at: int  # unix seconds
+    ticks: int
+    score: int
+    inputs: List[Tuple[int, int]]  # (tick, direction code)
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode(replay: Replay) -> bytes:
+    out = bytearray()
+    for value in (FORMAT_VERSION, replay.width, replay.height, MODES.index(replay.mode), replay.seed,
+                  replay.started_at, replay.ticks, replay.score, len(replay.inputs)):
+        write_varint(out, value)
+    previous = 0
+    for tick, code in replay.inputs:
+        write_varint(out, (tick - previous) << 2 | code)
+        previous = tick
+    return bytes(out)
+
+
+def decode(data: bytes) -> Replay:
+    values, pos = [], 0
+    for _ in range(9):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    version, width, height, mode, seed, started_at, ticks, score, count = values
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    inputs, tick = [], 0
+    for _ in range(count):
+        value, pos = read_varint(data, pos)
+        tick += value >> 2
+        inputs.append((tick, value & 3))
+    return Replay(width, height, MODES[mode], seed, started_at, ticks, score, inputs)
+
+
+def record(game: SnakeGame) -> Optional[Replay]:
+    """The replay of a game so far, or None if its log is incomplete."""
+    if game.inputs is None:
+        return None
+    return Replay(game.width, game.height, game.mode, game.seed, int(game.started_at.timestamp()),
+                  game.ticks, game.score, list(game.inputs))
+
+
+def simulate(replay: Replay, game_id: str, username: str) -> Iterator[SnakeGame]:
+    """Re-run a game, yielding it after the opening and after every tick."""
+    started = datetime.fromtimestamp(replay.started_at, timezone.utc)
+    game = SnakeGame.new(game_id, username, replay.mode, seed=replay.seed,
+                         width=replay.width, height=replay.height)
+    game.started_at = started
+    yield game
+    inputs = iter(replay.inputs)
+    turn = next(inputs, None)
+    for tick in range(1, replay.ticks + 1):
+        if turn is not None and turn[0] == tick:
+            game.pending = turn[1]
+            turn = next(inputs, None)
+        game.step()
+        yield game
+    if game.score != replay.score:
+        raise ReplayMismatch(f"Replay of {game_id} scored {game.score}, recorded {replay.score}")
+
+
+def play_out(mode: GameMode, seed: int, inputs: List[Tuple[int, int]],
+             width: int = GRID_SIZE, height: int = GRID_SIZE, max_ticks: int = MAX_TICKS) -> Tuple[int, int]:
+    """Run a game headless until the snake dies; returns (score, ticks).
+
+    Same rules and food placement as SnakeGame.step, without the game object,
+    the bitset or anything a spectator needs: locals only, one byte per cell.
+    Used to verify submitted scores (app/verification.py), where it has to
+    keep up with every finished game on the server.
+    """
+    occ = bytearray(width * height)
+    body = deque()
+    x, y = width // 2, height // 2
+    for cx in (x, x - 1, x - 2):
+        body.append(y * width + cx)
+        occ[y * width + cx] = 1
+    rng = seed & 0x7FFFFFFF
+    food, rng = _place_food(occ, rng, width, height, len(body))
+    walls = mode is GameMode.WALLS
+    direction, score, tick = RIGHT, 0, 0
+    dx, dy = DX[direction], DY[direction]
+
+    previous = 0
+    for turn_at, turn in inputs:
+        if turn_at <= previous or not 0 <= turn < 4:
+            raise InvalidLog(f"Bad turn {turn} at tick {turn_at}")
+        previous = turn_at
+    turns = iter(inputs)
+    turn_at, turn = next(turns, (0, RIGHT))  # tick 0 never comes: no more turns
+
+    while tick < max_ticks:
+        tick += 1
+        if tick == turn_at:
+            if turn == direction or turn == OPPOSITE[direction]:
+                raise InvalidLog(f"Impossible turn at tick {tick}")
+            direction = turn
+            dx, dy = DX[direction], DY[direction]
+            turn_at, turn = next(turns, (0, RIGHT))
+
+        x += dx
+        y += dy
+        if x < 0 or x >= width or y < 0 or y >= height:
+            if walls:
+                break
+            x %= width
+            y %= height
+        cell = y * width + x
+        if occ[cell]:
+            break
+        body.appendleft(cell)
+        occ[cell] = 1
+        if cell == food:
+            score += POINTS_PER_FOOD
+            food, rng = _place_food(occ, rng, width, height, len(body))
+        else:
+            occ[body.pop()] = 0
+    else:
+        raise InvalidLog(f"Snake still alive after {max_ticks} ticks")
+    if turn_at > 0:
+        raise InvalidLog(f"Turn at tick {turn_at} after the game ended at tick {tick}")
+    return score, tick
+
+
+def _place_food(occ: bytearray, rng: int, width: int, height: int, length: int) -> Tuple[int, int]:
+    # The r-th free cell in row-major order, as in SnakeGame._place_food;
+    # whole rows are skipped with bytearray.count
+    free = width * height - length
+    if free <= 0:
+        return NO_FOOD, rng
+    rng = (rng * 1103515245 + 12345) & 0x7FFFFFFF
+    remaining = rng % free
+    start = 0
+    for _ in range(height):
+        vacant = width - occ.count(1, start, start + width)
+        if remaining < vacant:
+            break
+        remaining -= vacant
+        start += width
+    cell = occ.index(0, start)
+    for _ in range(remaining):
+        cell = occ.index(0, cell + 1)
+    return cell, rng
+
+
+class ReplayStore:
+    """Collects finished games from the engine and appends their logs in batches."""
+
+    def __init__(self, session_factory=AsyncSessionLocal, interval: float = FLUSH_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._pending: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.written = 0
+        self.bytes_written = 0
+        self.errors = 0
+
+    def track(self, games) -> None:
+        """GameEngine tick listener."""
+        for game in games:
+            if game.status is GameStatus.GAME_OVER:
+                replay = record(game)
+                if replay is not None:
+                    self._pending[game.id] = {
+                        "game_id": game.id,
+                        "username": game.username,
+                        "game_mode": game.mode.value,
+                        "score": game.score,
+                        "created_at": datetime.utcnow(),
+                        "data": encode(replay),
+                    }
+
+    def pending(self, game_id: str) -> Optional[dict]:
+        # Finished games leave the engine once their final state is flushed,
+        # which can be before their log is; serve it from here meanwhile
+        return self._pending.get(game_id)
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        rows = list(batch.values())
+        try:
+            async with self.session_factory() as db, writer(db):
+                insert = dialect_insert(db.get_bind().dialect.name)
+                if insert is not None:
+                    # Append-only: a log that is already there is left alone,
+                    # and only the rows actually inserted count as written
+                    result = await db.execute(
+                        insert(GameReplay).on_conflict_do_nothing().returning(GameReplay.game_id), rows)
+                    inserted = set(result.scalars())
+                    written = [row for row in rows if row["game_id"] in inserted]
+                else:
+                    db.add_all(GameReplay(**row) for row in rows)
+                    written = rows
+                await db.commit()
+        except Exception:
+            self.errors += 1
+            for row in rows:
+                self._pending.setdefault(row["game_id"], row)
+            logger.exception("Writing %d replays failed", len(rows))
+            raise
+        self.written += len(written)
+        self.bytes_written += sum(len(row["data"]) for row in written)
+        return len(written)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "bytesWritten": self.bytes_written,
+            "avgBytes": round(self.bytes_written / self.written, 1) if self.written else 0,
+            "backlog": len(self._pending),
+            "errors": self.errors,
+        }
+
+
+replay_store = ReplayStore()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal, dialect_insert, writer
+from app.models import LeaderboardEntry, LeaderboardRollup, RollupState
+
+logger = logging.getLogger(__name__)
+
+# Day and week leaderboards, one row per player and mode, kept in
+# leaderboard_rollups so period queries never scan the raw score log.
+#
+# A background job reads only the scores newer than its watermark and merges
+# them into the rollups. It re-reads ROLLUP_OVERLAP of history each run so
+# rows committed slightly out of date order are not missed; merging is
+# "keep the better score", so seeing a row twice is harmless.
+
+PERIODS = ("day", "week")
+ROLLUP_INTERVAL = float(os.getenv("ROLLUP_INTERVAL", "60"))
+ROLLUP_OVERLAP = timedelta(minutes=5)
+WATERMARK = "leaderboard_rollups"
+
+RollupKey = Tuple[str, datetime, str, str]  # (period, period_start, game_mode, username)
+
+
+def utc_naive(date: datetime) -> datetime:
+    # Stored datetimes are naive UTC
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+def period_start(period: str, date: datetime) -> datetime:
+    date = utc_naive(date)
+    start = datetime(date.year, date.month, date.day)
+    if period == "week":
+        start -= timedelta(days=start.weekday())  # weeks start on Monday
+    return start
+
+
+def _better(a: LeaderboardEntry, b: LeaderboardEntry) -> bool:
+    return (-a.score, utc_naive(a.date), a.id) < (-b.score, utc_naive(b.date), b.id)
+
+
+async def refresh_rollups(db: AsyncSession) -> int:
+    """Merge scores newer than the watermark into the rollups; returns rows read."""
+    state = await db.get(RollupState, WATERMARK)
+    query = select(LeaderboardEntry).order_by(LeaderboardEntry.date)
+    if state is not None and state.watermark is not None:
+        query = query.where(LeaderboardEntry.date > state.watermark - ROLLUP_OVERLAP)
+    entries = (await db.execute(query)).scalars().all()
+    if not entries:
+        return 0
+
+    best: Dict[RollupKey, LeaderboardEntry] = {}
+    for entry in entries:
+        for period in PERIODS:
+            key = (period, period_start(period, entry.date), entry.game_mode, entry.username)
+            current = best.get(key)
+            if current is None or _better(entry, current):
+                best[key] = entry
+
+    rows = [
+        dict(period=k[0], period_start=k[1], game_mode=k[2], username=k[3],
+             score=e.score, date=e.date, entry_id=e.id)
+        for k, e in best.items()
+    ]
+    insert = dialect_insert(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(LeaderboardRollup)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[LeaderboardRollup.period, LeaderboardRollup.period_start,
+                            LeaderboardRollup.game_mode, LeaderboardRollup.username],
+            set_={k: stmt.excluded[k] for k in ("score", "date", "entry_id")},
+            where=stmt.excluded.score > LeaderboardRollup.score,
+        ), rows)
+    else:
+        for row in rows:
+            key = (row["period"], row["period_start"], row["game_mode"], row["username"])
+            current = await db.get(LeaderboardRollup, key)
+            if current is None:
+                db.add(LeaderboardRollup(**row))
+            elif row["score"] > current.score:
+                current.score, current.date, current.entry_id = row["score"], row["date"], row["entry_id"]
+
+    watermark = max(utc_naive(e.date) for e in entries)
+    if state is None:
+        db.add(RollupState(name=WATERMARK, watermark=watermark))
+    else:
+        state.watermark = max(utc_naive(state.watermark), watermark) if state.watermark else watermark
+    await db.commit()
+    return len(entries)
+
+
+class RollupJob:
+    def __init__(self, session_factory=AsyncSessionLocal, interval: float = ROLLUP_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.runs = 0
+        self.rows_read = 0
+        self.last_run_seconds = 0.0
+        self.errors = 0
+
+    async def run_once(self) -> int:
+        started = time.perf_counter()
+        async with self.session_factory() as db, writer(db):
+            read = await refresh_rollups(db)
+        self.runs += 1
+        self.rows_read += read
+        self.last_run_seconds = time.perf_counter() - started
+        return read
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Refreshing leaderboard rollups failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+rollup_job = RollupJob()
@@ -1,7 +1,9 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from typing import Any, List, Optional, Tuple
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, model_validator
+
+from app.settings import SCORE_BATCH_LIMIT
 
 class GameMode(str, Enum):
     WALLS = "walls"
@@ -62,6 +64,63 @@ class ActiveGame(BaseModel):
     direction: Direction
     startedAt: datetime = Field(validation_alias="started_at", serialization_alias="startedAt")
 
+class ActiveGameSummary(BaseModel):
+    # Lobby listing: everything but the board
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: str
+    username: str
+    score: int
+    gameMode: GameMode = Field(validation_alias="game_mode", serialization_alias="gameMode")
+    length: int
+    spectators: int = 0
+
 class ScoreSubmission(BaseModel):
     score: int
     gameMode: GameMode
+    # Optional proof of the score: the nonce from POST /leaderboard/seed
+    # (which fixes the game's seed) and every turn as [tick, direction]. With
+    # them the score is re-simulated before it is accepted
+    # (app/verification.py). seed, if sent, must be the nonce's.
+    nonce: Optional[str] = None
+    seed: Optional[int] = Field(None, ge=0, le=0x7FFFFFFF)
+    inputLog: Optional[List[Tuple[int, Direction]]] = Field(None, max_length=100_000)
+
+    @model_validator(mode="after")
+    def nonce_with_log(self):
+        if (self.nonce is None) != (self.inputLog is None) or (self.seed is not None and self.nonce is None):
+            raise ValueError("nonce and inputLog go together")
+        return self
+
+class ScoreSeed(BaseModel):
+    seed: int
+    nonce: str
+    expiresIn: int  # seconds
+
+class ScoreVerification(BaseModel):
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    id: str
+    status: str  # pending, verified, rejected
+    score: int
+    gameMode: GameMode = Field(validation_alias="game_mode", serialization_alias="gameMode")
+    entryId: Optional[str] = Field(None, validation_alias="entry_id", serialization_alias="entryId")
+    reason: Optional[str] = None
+
+class ScoreBatch(BaseModel):
+    # Items are validated one at a time by the endpoint, so a bad item is
+    # reported in its own result instead of failing the whole batch
+    scores: List[Any] = Field(min_length=1, max_length=SCORE_BATCH_LIMIT)
+
+class ScoreBatchResult(BaseModel):
+    index: int
+    status: str  # accepted, pending, rejected
+    entry: Optional[LeaderboardEntry] = None
+    verification: Optional[ScoreVerification] = None
+    reason: Optional[str] = None
+
+class GameStart(BaseModel):
+    gameMode: GameMode
+
+class DirectionInput(BaseModel):
+    direction: Direction
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Any, Iterable, List, NamedTuple
+
+import orjson
+from fastapi.responses import Response
+from sqlalchemy import Text, cast
+
+from app.models import ActiveGame, LeaderboardEntry
+
+# Rows straight to JSON bytes for the hot read endpoints.
+# The schema path (ORM entity -> model_validate(from_attributes) -> dump)
+# builds a Pydantic model per row and one per snake cell. Here the queries
+# select plain column tuples and the encoders below map them onto the API
+# field names, so orjson sees only dicts, lists, strings and numbers. The
+# listing query goes one step further and reads snake/food as the JSON text
+# the database already holds, which is embedded into the output unparsed.
+#
+# The output matches schemas.LeaderboardEntry / schemas.ActiveGame exactly
+# (including datetimes: naive stays naive, UTC ends in "Z"), which
+# tests_integration/test_serialization.py checks against both the schema
+# path and openapi.yaml.
+
+LEADERBOARD_COLUMNS = (LeaderboardEntry.id, LeaderboardEntry.username, LeaderboardEntry.score,
+                       LeaderboardEntry.game_mode, LeaderboardEntry.date)
+# snake and food as raw JSON text, see active_games()
+ACTIVE_GAME_COLUMNS = (ActiveGame.id, ActiveGame.username, ActiveGame.score, ActiveGame.game_mode,
+                       cast(ActiveGame.snake, Text).label("snake"), cast(ActiveGame.food, Text).label("food"),
+                       ActiveGame.direction, ActiveGame.started_at)
+
+
+class LeaderboardRow(NamedTuple):
+    # LEADERBOARD_COLUMNS plus the rank the query computed
+    id: str
+    username: str
+    score: int
+    game_mode: str
+    date: datetime
+    rank: int
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def isoformat(date: datetime) -> str:
+    # Same text as Pydantic's JSON mode, for dicts that go through json.dumps
+    text = date.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+class JSONBytesResponse(Response):
+    """JSON response for content that is already bytes (or orjson-encodable)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+def leaderboard_entries(rows: Iterable[LeaderboardRow]) -> List[dict]:
+    return [
+        {"id": r.id, "rank": r.rank, "username": r.username, "score": r.score,
+         "gameMode": r.game_mode, "date": r.date}
+        for r in rows
+    ]
+
+
+def active_game(row) -> dict:
+    """ORM ActiveGame or SnakeGame.to_state() dict."""
+    if isinstance(row, dict):
+        return {
+            "id": row["id"], "username": row["username"], "score": row["score"],
+            "gameMode": row["game_mode"], "snake": row["snake"], "food": row["food"],
+            "direction": row["direction"], "startedAt": row["started_at"],
+        }
+    return {
+        "id": row.id, "username": row.username, "score": row.score, "gameMode": row.game_mode,
+        "snake": row.snake, "food": row.food, "direction": row.direction, "startedAt": row.started_at,
+    }
+
+
+def active_games(rows) -> bytes:
+    """ACTIVE_GAME_COLUMNS rows; snake and food are spliced in as stored."""
+    return dumps([
+        {"id": r.id, "username": r.username, "score": r.score, "gameMode": r.game_mode,
+         "snake": orjson.Fragment(r.snake), "food": orjson.Fragment(r.food),
+         "direction": r.direction, "startedAt": r.started_at}
+        for r in rows
+    ])
@@ -0,0 +1,63 @@
+import os
+
+# Deployment settings, read once from the environment at import.
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+# Default to SQLite for local development if not specified
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./snake_arena.db")
+
+# Log every SQL statement. Logging is synchronous, so keep this off in production.
+DB_ECHO = env_bool("DB_ECHO", False)
+
+# Connection pool. Total connections per worker top out at
+# DB_POOL_SIZE + DB_MAX_OVERFLOW; a checkout waits up to DB_POOL_TIMEOUT
+# seconds for one to free up. DB_NULL_POOL opens a fresh connection per
+# checkout, for running behind an external pooler such as pgbouncer.
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+DB_NULL_POOL = env_bool("DB_NULL_POOL", False)
+
+# Longest a single statement may run, in seconds (0 = no limit). On SQLite
+# this is how long a writer waits on the database lock instead.
+DB_STATEMENT_TIMEOUT = env_float("DB_STATEMENT_TIMEOUT", 10)
+
+# asyncpg prepared statements cached per connection. Set to 0 behind
+# pgbouncer in transaction mode, which cannot keep prepared statements.
+DB_STATEMENT_CACHE_SIZE = env_int("DB_STATEMENT_CACHE_SIZE", 500)
+
+# SQLite only: WAL lets readers run alongside the (single) writer
+SQLITE_WAL = env_bool("SQLITE_WAL", True)
+
+# Cross-worker fan-out of live games (app/pubsub.py): memory (single
+# worker), socket (workers on one host) or postgres (LISTEN/NOTIFY)
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory")
+PUBSUB_SOCKET = os.getenv("PUBSUB_SOCKET", "/tmp/snake-arena-pubsub.sock")
+# Bytes a socket pub/sub peer may have unsent before messages to it are dropped
+PUBSUB_PEER_HIGH_WATER = env_int("PUBSUB_PEER_HIGH_WATER", 1 << 20)
+
+# Most scores one POST /leaderboard/scores:batch may carry. 100 rows x 5
+# columns stays under SQLite's default 999 bound parameters per statement.
+SCORE_BATCH_LIMIT = env_int("SCORE_BATCH_LIMIT", 100)
+
+# Seconds without input from the player after which the engine ends a game
+# (app/engine.py) and the reaper evicts a row still playing, whose worker
+# must be gone (app/reaper.py)
+GAME_STALE_AFTER = env_float("GAME_STALE_AFTER", 120)
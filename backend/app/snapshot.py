@@ -0,0 +1,354 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.engine import GRID_SIZE, SnakeGame
+from app.schemas import GameMode, GameStatus
+from app.settings import env_int
+
+logger = logging.getLogger(__name__)
+
+# Memory-mapped snapshot of this worker's live games, for warm restarts.
+# The engine writes every game that changed into the file on each tick, so
+# after a crash or deploy the games come back exactly where they were (same
+# RNG state, so food keeps appearing where it would have) without waiting on
+# active_games. That also lets write-behind flush lazily.
+#
+# Layout, little endian:
+#
+#   header   magic, version, board size, slot count, header crc32 (64 bytes)
+#   slots    two fixed-size copies of one game's record each
+#
+#   record   crc32 | generation | state mode direction pending | score ticks
+#            rng seed | food | started_at heartbeat_at | id | username |
+#            length | cells
+#
+# Cells are the body as uint16 board cells, head first. A write goes to the
+# copy the slot's previous write did not use, with the next generation, and
+# the crc covers the record up to its last cell. A write torn by a crash
+# therefore fails its crc, and loading falls back to the other copy: at
+# worst a game resumes one tick back. Only a power loss can drop writes the
+# OS has not yet flushed; sync() (on every write-behind flush) bounds that.
+#
+# One file per worker: a worker takes the first of path, path.1, path.2, ...
+# that no other process holds a lock on, and with it the games in it. It
+# also adopts every unlocked file numbered above its own (left behind when a
+# restart comes up with fewer workers): their games move into its file and
+# the orphan is deleted. Whoever gets a lock checks the file is still at its
+# path afterwards, since an adopter may have unlinked it in between.
+
+MAGIC = b"SNAKSNAP"
+VERSION = 2
+HEADER = struct.Struct("<8sHHHI")  # magic, version, width, height, slots; crc32 follows
+HEADER_SIZE = 64
+RECORD = struct.Struct("<IQBBBBIIIIidd64p64pH")
+FREE, PLAYING, GAME_OVER = 0, 1, 2
+STATES = {GameStatus.PLAYING: PLAYING, GameStatus.GAME_OVER: GAME_OVER}
+MODES = list(GameMode)
+MODE_CODES = {m: i for i, m in enumerate(MODES)}
+NAME_LIMIT = 63  # bytes, what a 64p field holds
+
+SNAPSHOT_PATH = os.getenv("GAME_SNAPSHOT_PATH", "")  # off unless set, e.g. ./live_games.snap
+SNAPSHOT_SLOTS = env_int("GAME_SNAPSHOT_SLOTS", 256)
+MAX_FILES = 64  # workers that can hold a snapshot file each
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class GameSnapshot:
+    def __init__(self, path: str = SNAPSHOT_PATH, width: int = GRID_SIZE, height: int = GRID_SIZE,
+                 slots: int = SNAPSHOT_SLOTS):
+        self.base_path = path
+        self.path: Optional[str] = None
+        self.width = width
+        self.height = height
+        self.record_size = RECORD.size + 2 * width * height
+        self.initial_slots = slots
+        self.slots = 0
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._slot_of: Dict[str, int] = {}
+        self._generation: Dict[int, int] = {}  # last generation written per slot
+        self._free: List[int] = []
+        self._buffer = bytearray(self.record_size)
+
+        # Counters
+        self.writes = 0
+        self.skipped = 0
+        self.torn = 0
+        self.loaded = 0
+        self.adopted = 0
+        self.load_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._mm is not None
+
+    # -- file ---------------------------------------------------------------
+
+    def open(self) -> List[SnakeGame]:
+        """Claim a snapshot file and return the games it holds."""
+        if not self.base_path:
+            return []
+        started = time.perf_counter()
+        n = 0
+        while n < MAX_FILES:
+            path = self._path(n)
+            f = open(path, "a+b")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                n += 1
+                continue
+            if not self._still_at(f, path):
+                # Adopted and unlinked by another worker between our open and
+                # flock: the lock is on a deleted file. Try the path again.
+                f.close()
+                continue
+            self.path, self._file = path, f
+            break
+        else:
+            logger.warning("Every snapshot file under %s is taken; running without one", self.base_path)
+            return []
+
+        try:
+            games = self._load()
+        except SnapshotError as e:
+            logger.warning("Discarding snapshot %s: %s", self.path, e)
+            self._reset()
+            games = []
+        seen = {g.id for g in games}
+        for other in range(n + 1, MAX_FILES):
+            orphans = [g for g in self._adopt(self._path(other)) if g.id not in seen]
+            seen.update(g.id for g in orphans)
+            self.track(orphans)
+            self.adopted += len(orphans)
+            games += orphans
+        self.loaded = len(games)
+        self.load_seconds = time.perf_counter() - started
+        return games
+
+    def _path(self, n: int) -> str:
+        return self.base_path if n == 0 else f"{self.base_path}.{n}"
+
+    @staticmethod
+    def _still_at(f, path: str) -> bool:
+        # Whether the file we hold is still the one at path
+        try:
+            return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _adopt(self, path: str) -> List[SnakeGame]:
+        # Games of a file no running worker holds; the file is removed after
+        orphan = GameSnapshot(path, self.width, self.height, self.initial_slots)
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            return []
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return []  # a live worker's
+            if not self._still_at(f, path):
+                return []  # another worker adopted it first
+            orphan.path, orphan._file = path, f
+            try:
+                games = orphan._load()
+            except SnapshotError as e:
+                logger.warning("Discarding snapshot %s: %s", path, e)
+                games = []
+            finally:
+                if orphan._mm is not None:
+                    orphan._mm.close()
+            self.torn += orphan.torn
+            os.unlink(path)
+        return games
+
+    def _map(self, slots: int) -> None:
+        size = HEADER_SIZE + slots * 2 * self.record_size
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self.slots = slots
+        header = HEADER.pack(MAGIC, VERSION, self.width, self.height, slots)
+        self._mm[:HEADER.size + 4] = header + struct.pack("<I", zlib.crc32(header))
+
+    def _reset(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._file.truncate(0)
+        self._map(self.initial_slots)
+        self._slot_of.clear()
+        self._generation.clear()
+        self._free = list(range(self.slots - 1, -1, -1))
+
+    def _load(self) -> List[SnakeGame]:
+        self._file.seek(0)
+        head = self._file.read(HEADER.size + 4)
+        if not head:
+            self._reset()
+            return []
+        if len(head) < HEADER.size + 4:
+            raise SnapshotError("short header")
+        magic, version, width, height, slots = HEADER.unpack_from(head)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError("not a version %d snapshot" % VERSION)
+        if struct.unpack_from("<I", head, HEADER.size)[0] != zlib.crc32(head[:HEADER.size]):
+            raise SnapshotError("header checksum mismatch")
+        if (width, height) != (self.width, self.height):
+            raise SnapshotError(f"board is {width}x{height}, not {self.width}x{self.height}")
+        if os.fstat(self._file.fileno()).st_size < HEADER_SIZE + slots * 2 * self.record_size:
+            raise SnapshotError("truncated")
+        self._map(slots)
+
+        games = []
+        self._free = []
+        for slot in range(slots - 1, -1, -1):
+            found = self._read_slot(slot)
+            if found is None:
+                self._free.append(slot)
+                continue
+            generation, game = found
+            self._generation[slot] = generation
+            if game is None:
+                self._free.append(slot)
+            else:
+                self._slot_of[game.id] = slot
+                games.append(game)
+        return games
+
+    def _read_slot(self, slot: int):
+        # (generation, game or None if freed) of the newest intact copy
+        best = None
+        base = HEADER_SIZE + slot * 2 * self.record_size
+        for copy in (0, 1):
+            offset = base + copy * self.record_size
+            fields = RECORD.unpack_from(self._mm, offset)
+            crc, generation, length = fields[0], fields[1], fields[-1]
+            if generation == 0:
+                continue
+            end = offset + RECORD.size + 2 * min(length, self.width * self.height)
+            if zlib.crc32(self._mm[offset + 4:end]) != crc:
+                self.torn += 1
+                continue
+            if best is None or generation > best[0]:
+                best = (generation, fields, offset)
+        if best is None:
+            return None
+        generation, fields, offset = best
+        return generation, (self._decode(fields, offset) if fields[2] != FREE else None)
+
+    def _decode(self, fields, offset: int) -> SnakeGame:
+        (_, _, state, mode, direction, pending, score, ticks, rng, seed, food,
+         started_at, heartbeat_at, game_id, username, length) = fields
+        game = SnakeGame(game_id.decode(), username.decode(), MODES[mode], self.width, self.height,
+                         started_at=datetime.fromtimestamp(started_at, timezone.utc))
+        cells = array("H")
+        cells.frombytes(self._mm[offset + RECORD.size:offset + RECORD.size + 2 * length])
+        for cell in cells:
+            game._push_tail(cell)
+        game.direction, game.pending = direction, pending
+        game.score, game.ticks, game.rng, game.seed, game.food = score, ticks, rng, seed, food
+        game.status = GameStatus.PLAYING if state == PLAYING else GameStatus.GAME_OVER
+        game.heartbeat_at = datetime.fromtimestamp(heartbeat_at, timezone.utc).replace(tzinfo=None)
+        return game
+
+    # -- writes -------------------------------------------------------------
+
+    def _grow(self) -> None:
+        old = self.slots
+        self._mm.flush()
+        self._mm.close()
+        self._map(old * 2)
+        self._free.extend(range(self.slots - 1, old - 1, -1))
+
+    @staticmethod
+    def _timestamp(when: datetime) -> float:
+        # Naive datetimes (heartbeats, games resumed from active_games) are UTC
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return when.timestamp()
+
+    def _write(self, slot: int, state: int, game: Optional[SnakeGame] = None) -> None:
+        generation = self._generation.get(slot, 0) + 1
+        self._generation[slot] = generation
+        buf = self._buffer
+        if game is None:
+            RECORD.pack_into(buf, 0, 0, generation, state, 0, 0, 0, 0, 0, 0, 0, 0, 0.0, 0.0, b"", b"", 0)
+            end = RECORD.size
+        else:
+            RECORD.pack_into(buf, 0, 0, generation, state, MODE_CODES[game.mode], game.direction, game.pending,
+                             game.score, game.ticks, game.rng, game.seed, game.food,
+                             self._timestamp(game.started_at), self._timestamp(game.heartbeat_at),
+                             game.id.encode(), game.username.encode(), len(game.body))
+            end = RECORD.size + 2 * len(game.body)
+            buf[RECORD.size:end] = array("H", game.body).tobytes()
+        struct.pack_into("<I", buf, 0, zlib.crc32(memoryview(buf)[4:end]))
+        offset = HEADER_SIZE + slot * 2 * self.record_size + (generation & 1) * self.record_size
+        self._mm[offset:offset + end] = memoryview(buf)[:end]
+        self.writes += 1
+
+    def track(self, games) -> None:
+        """GameEngine tick listener: write every game that changed."""
+        if self._mm is None:
+            return
+        for game in games:
+            slot = self._slot_of.get(game.id)
+            if slot is None:
+                if len(game.id.encode()) > NAME_LIMIT or len(game.username.encode()) > NAME_LIMIT:
+                    # Does not fit a record; this game resumes from active_games
+                    self.skipped += 1
+                    continue
+                if not self._free:
+                    self._grow()
+                slot = self._slot_of[game.id] = self._free.pop()
+            self._write(slot, STATES.get(game.status, GAME_OVER), game)
+
+    def discard(self, game_id: str) -> None:
+        """Free a game's slot once active_games has its final state."""
+        slot = self._slot_of.pop(game_id, None)
+        if slot is not None and self._mm is not None:
+            self._write(slot, FREE)
+            self._free.append(slot)
+
+    def sync(self, *args) -> None:
+        # msync, so the snapshot also survives the machine going down. Usable
+        # as a write-behind flush hook.
+        if self._mm is not None:
+            self._mm.flush()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()  # releases the lock
+            self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "games": len(self._slot_of),
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "tornCopies": self.torn,
+            "loaded": self.loaded,
+            "adopted": self.adopted,
+            "loadMs": round(self.load_seconds * 1000, 3),
+        }
+
+
+game_snapshot = GameSnapshot()
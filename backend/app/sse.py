@@ -0,0 +1,37 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+# Server-sent event streams.
+# Every SSE endpoint (lobby, game, leaderboard) reads from its own per-client
+# queue and runs the same loop around it: stop when the client goes away or
+# the queue hands back None, send a comment line after KEEPALIVE_INTERVAL of
+# silence so proxies don't close an idle stream, and release the queue
+# however the stream ends.
+
+KEEPALIVE_INTERVAL = 15.0  # seconds of silence before an SSE comment is sent
+
+
+def event_stream(request: Request, get: Callable[[], Awaitable[Optional[str]]], close: Callable[[], None],
+                 keepalive: float = KEEPALIVE_INTERVAL) -> StreamingResponse:
+    """text/event-stream of whatever get() returns, until it returns None."""
+
+    async def events():
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    message = await asyncio.wait_for(get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            close()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from app.schemas import User
+
+# In-process cache of authenticated users, keyed by username.
+# Every authenticated request used to decode the JWT and then load the user
+# row; with this cache a warm request only decodes the token.
+#
+# Entries expire after USER_CACHE_TTL seconds and the least recently used
+# entry is evicted beyond USER_CACHE_SIZE. Concurrent misses for the same
+# username share one DB load. Anything that changes or removes a user must
+# call invalidate(); a load that was already running when that happens is
+# returned to its callers but not cached, so stale rows never get back in.
+#
+# The cache is per process, so the TTL also bounds how long another worker's
+# change to a user can go unnoticed.
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+Loader = Callable[[], Awaitable[Optional[User]]]
+
+# What waiters get when the request doing the load was cancelled: one of
+# them loads instead
+_RETRY = object()
+
+
+class UserCache:
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._stale: Set[str] = set()  # invalidated while a load was running
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, username: str) -> Optional[User]:
+        cached = self._users.get(username)
+        if cached is None:
+            return None
+        user, expires = cached
+        if expires < time.monotonic():
+            del self._users[username]
+            return None
+        self._users.move_to_end(username)
+        return user
+
+    def put(self, username: str, user: User) -> None:
+        self._users[username] = (user, time.monotonic() + self.ttl)
+        self._users.move_to_end(username)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, username: str, loader: Loader) -> Optional[User]:
+        user = self.get(username)
+        if user is not None:
+            self.hits += 1
+            return user
+        self.misses += 1
+
+        # Someone is already loading this user; wait for their result
+        pending = self._loading.get(username)
+        while pending is not None:
+            user = await asyncio.shield(pending)
+            if user is not _RETRY:
+                return user
+            pending = self._loading.get(username)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[username] = future
+        try:
+            started = time.perf_counter()
+            user = await loader()
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - started
+        except asyncio.CancelledError:
+            # Only this caller went away (a client disconnect, say); the
+            # waiters were not cancelled and retry the load themselves
+            future.set_result(_RETRY)
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; mark it retrieved for the no-waiter case
+            future.exception()
+            raise
+        finally:
+            del self._loading[username]
+            stale = username in self._stale
+            self._stale.discard(username)
+
+        # Unknown users are not cached: they may sign up any moment
+        if user is not None and not stale:
+            self.put(username, user)
+        future.set_result(user)
+        return user
+
+    def invalidate(self, username: str) -> None:
+        self._users.pop(username, None)
+        if username in self._loading:
+            self._stale.add(username)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._stale.update(self._loading)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        avg_load = self.load_seconds / self.loads if self.loads else 0.0
+        return {
+            "size": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "avgLoadMs": round(avg_load * 1000, 3),
+            # Every hit skipped one user query
+            "savedMs": round(self.hits * avg_load * 1000, 3),
+        }
+
+
+user_cache = UserCache()
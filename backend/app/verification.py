@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
+
+from app.database import AsyncSessionLocal
+from app.ids import new_id
+from app.replay import InvalidLog, MAX_TICKS, play_out
+from app.schemas import GameMode, LeaderboardEntry
+from app.settings import env_bool, env_float, env_int
+import app.crud as crud
+
+logger = logging.getLogger(__name__)
+
+# Server-side score verification.
+# A score submitted with its input log and the nonce of a server-issued seed
+# is stored as pending and re-simulated with replay.play_out on a process
+# pool, off the request path and off the event loop (it is pure-Python CPU
+# work, so threads would only contend for the GIL). It reaches the
+# leaderboard only if the replay ends with exactly the claimed score.
+#
+# At most VERIFY_QUEUE_LIMIT verifications may be running or waiting at
+# once; past that submissions get a 503, as with password hashing. Every
+# VERIFY_SWEEP_INTERVAL seconds, and at startup, pending rows nobody is
+# working on (left by a restart, a full queue or a failed attempt) are queued
+# again as capacity allows. Rows younger than one interval are left to the
+# worker that accepted them; if two workers still verify the same row,
+# crud.finish_verification records only one outcome.
+
+VERIFY_WORKERS = env_int("VERIFY_WORKERS", min(4, os.cpu_count() or 1))
+VERIFY_QUEUE_LIMIT = env_int("VERIFY_QUEUE_LIMIT", VERIFY_WORKERS * 64)
+VERIFY_SWEEP_INTERVAL = env_float("VERIFY_SWEEP_INTERVAL", 30)
+
+# Refuse scores that come without an input log
+REQUIRE_VERIFIED_SCORES = env_bool("REQUIRE_VERIFIED_SCORES", False)
+# How long a seed from POST /leaderboard/seed may be played before submitting
+SEED_TTL = env_int("SCORE_SEED_TTL", 24 * 3600)
+
+
+class VerifierBusy(Exception):
+    pass
+
+
+def check(mode: str, seed: int, inputs: List[Tuple[int, int]], claimed: int,
+          max_ticks: int = MAX_TICKS) -> Tuple[int, Optional[str]]:
+    """Runs in a pool process: (ticks, reason), reason None if the score holds."""
+    try:
+        score, ticks = play_out(GameMode(mode), seed, inputs, max_ticks=max_ticks)
+    except InvalidLog as e:
+        return 0, str(e)
+    if score != claimed:
+        return ticks, f"Replay scored {score}, not {claimed}"
+    return ticks, None
+
+
+class ScoreVerifier:
+    def __init__(self, session_factory=AsyncSessionLocal, workers: int = VERIFY_WORKERS,
+                 queue_limit: int = VERIFY_QUEUE_LIMIT, sweep_interval: float = VERIFY_SWEEP_INTERVAL):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.sweep_interval = sweep_interval
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._queued: Set[str] = set()  # ids of rows in _tasks
+        self._sweeper: Optional[asyncio.Task] = None
+
+        # Counters
+        self.verified = 0
+        self.rejected = 0
+        self.refused = 0
+        self.errors = 0
+        self.ticks = 0
+        self.seconds = 0.0
+        self.requeued = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the parent has an event loop and DB threads
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def check_capacity(self) -> None:
+        if self.in_flight >= self.queue_limit:
+            self.refused += 1
+            raise VerifierBusy()
+
+    def submit(self, row) -> None:
+        """Queue a pending models.ScoreVerification row."""
+        self.check_capacity()
+        task = asyncio.create_task(self._verify(row.id, row.username, row.game_mode, row.seed,
+                                                row.inputs, row.score))
+        self._tasks.add(task)
+        self._queued.add(row.id)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._queued.discard(row.id))
+
+    async def _verify(self, verification_id: str, username: str, mode: str, seed: int,
+                      inputs: list, claimed: int) -> None:
+        started = time.perf_counter()
+        try:
+            ticks, reason = await asyncio.get_running_loop().run_in_executor(
+                self._pool(), check, mode, seed, inputs, claimed)
+        except Exception:
+            # Left pending; the next sweep retries it
+            self.errors += 1
+            logger.exception("Verifying score %s failed", verification_id)
+            return
+        self.seconds += time.perf_counter() - started
+        self.ticks += ticks
+
+        entry = None
+        if reason is None:
+            entry = LeaderboardEntry(id=new_id(), rank=0, username=username, score=claimed,
+                                     gameMode=GameMode(mode), date=datetime.now(timezone.utc))
+        try:
+            async with self.session_factory() as db:
+                await crud.finish_verification(db, verification_id, ticks, reason, entry)
+        except Exception:
+            self.errors += 1
+            logger.exception("Recording verification of %s failed", verification_id)
+            return
+        if reason is None:
+            self.verified += 1
+        else:
+            self.rejected += 1
+
+    async def sweep(self, min_age: Optional[float] = None) -> int:
+        """Queue pending rows nobody here is verifying, up to capacity."""
+        if self.in_flight >= self.queue_limit:
+            return 0
+        min_age = self.sweep_interval if min_age is None else min_age
+        async with self.session_factory() as db:
+            # The rows queued here are among the oldest queue_limit at most,
+            # so this many always includes every free slot's worth
+            rows = await crud.list_pending_verifications(
+                db, limit=self.queue_limit, before=datetime.utcnow() - timedelta(seconds=min_age))
+        queued = 0
+        for row in rows:
+            if row.id in self._queued:
+                continue
+            if self.in_flight >= self.queue_limit:
+                break
+            self.submit(row)
+            queued += 1
+        self.requeued += queued
+        return queued
+
+    async def run(self) -> None:
+        # Startup takes everything a previous run left, however fresh
+        min_age = 0.0
+        while True:
+            try:
+                await self.sweep(min_age)
+            except Exception:
+                self.errors += 1
+                logger.exception("Sweeping pending verifications failed")
+            min_age = None
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self.run())
+
+    async def drain(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        done = self.verified + self.rejected
+        return {
+            "workers": self.workers,
+            "queueLimit": self.queue_limit,
+            "inFlight": self.in_flight,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "refused": self.refused,
+            "errors": self.errors,
+            "requeued": self.requeued,
+            "ticksSimulated": self.ticks,
+            "avgVerifyMs": round(self.seconds / done * 1000, 3) if done else 0,
+        }
+
+
+score_verifier = ScoreVerifier()
@@ -0,0 +1,91 @@
+import struct
+from typing import List, Optional
+
+import msgpack
+
+from app.delta import Frame
+
+# Binary frames for the WebSocket transport.
+#
+#   +-----------+------------------+---------------------------------+
+#   | u16 BE: n | n bytes: msgpack | int16 LE x,y pairs (rest)       |
+#   +-----------+------------------+---------------------------------+
+#
+# The msgpack header carries the same fields as the JSON protocol in
+# app/delta.py except the coordinates, which follow as packed int16 pairs:
+#
+#   keyframe: {"type": "keyframe", "seq", "game": {ActiveGame minus snake/food}, "snake": n}
+#             coords = food, then the n snake cells head first
+#   delta:    {"type": "delta", "seq", ...changed fields..., "head": n, "food": true}
+#             coords = food (only if "food" is set), then the n new head cells
+#
+# Control frames (ping, error, end) are a header with no coordinates.
+# decode() turns any frame back into exactly the JSON message it replaces,
+# so a client can share one code path (apply_delta) for both transports.
+
+HEADER_SIZE = struct.Struct(">H")
+
+
+def _pack(header: dict, cells: List[dict] = ()) -> bytes:
+    head = msgpack.packb(header)
+    coords = [v for cell in cells for v in (cell["x"], cell["y"])]
+    return HEADER_SIZE.pack(len(head)) + head + struct.pack(f"<{len(coords)}h", *coords)
+
+
+def _cells(payload: bytes) -> List[dict]:
+    values = struct.unpack(f"<{len(payload) // 2}h", payload)
+    return [{"x": values[i], "y": values[i + 1]} for i in range(0, len(values), 2)]
+
+
+def control(header: dict) -> bytes:
+    return _pack(header)
+
+
+def _build_keyframe(frame: Frame) -> bytes:
+    game = {k: v for k, v in frame.state.items() if k not in ("snake", "food")}
+    snake = frame.state["snake"]
+    return _pack({"type": "keyframe", "seq": frame.seq, "game": game, "snake": len(snake)},
+                 [frame.state["food"]] + snake)
+
+
+def _build_delta(frame: Frame) -> bytes:
+    changes = dict(frame.changes)
+    head = changes.pop("head", [])
+    food = changes.pop("food", None)
+    header = {"type": "delta", "seq": frame.seq, **changes}
+    if head:
+        header["head"] = len(head)
+    if food is not None:
+        header["food"] = True
+    return _pack(header, ([food] if food is not None else []) + head)
+
+
+def keyframe(frame: Frame) -> bytes:
+    return frame.encoded("binary-keyframe", _build_keyframe)
+
+
+def delta(frame: Frame) -> Optional[bytes]:
+    if frame.changes is None:
+        return None
+    return frame.encoded("binary-delta", _build_delta)
+
+
+def decode(data: bytes) -> dict:
+    """Client-side reference: a binary frame as the equivalent JSON message."""
+    (size,) = HEADER_SIZE.unpack_from(data)
+    header = msgpack.unpackb(data[HEADER_SIZE.size:HEADER_SIZE.size + size])
+    cells = _cells(data[HEADER_SIZE.size + size:])
+    kind = header.get("type")
+    if kind == "keyframe":
+        game = dict(header["game"])
+        game["food"], game["snake"] = cells[0], cells[1:1 + header["snake"]]
+        return {"type": "keyframe", "seq": header["seq"], "game": game}
+    if kind == "delta":
+        message = dict(header)
+        if message.pop("food", False):
+            message["food"], cells = cells[0], cells[1:]
+        if "head" in message:
+            message["head"] = cells[:message["head"]]
+        return message
+    return header
+
@@ -0,0 +1,62 @@
+"""Microbenchmark for the scalar tick engine.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_engine --games 5000 --ticks 200
+
+Reports how many game-steps per second one core sustains. Games run in
+pass-through mode with random turns; finished games are restarted so the
+population stays constant.
+"""
+import argparse
+import random
+import time
+
+from app.engine import GameEngine, SnakeGame, TICK_INTERVAL
+from app.schemas import GameMode, GameStatus
+
+
+def build(n: int, seed: int) -> GameEngine:
+    engine = GameEngine()
+    rng = random.Random(seed)
+    for i in range(n):
+        engine.add(SnakeGame.new(f"g{i}", "bench", GameMode.PASS_THROUGH, seed=rng.getrandbits(31)))
+    return engine
+
+
+def run(n: int, ticks: int, seed: int = 0) -> float:
+    engine = build(n, seed)
+    rng = random.Random(seed + 1)
+    games = list(engine.games.values())
+    # Pre-draw inputs so the timed loop measures the engine, not random()
+    turns = [[rng.randrange(4) if rng.random() < 0.2 else None for _ in range(n)] for _ in range(ticks)]
+
+    stepped = 0
+    elapsed = 0.0
+    for t in range(ticks):
+        for game, turn in zip(games, turns[t]):
+            if turn is not None:
+                game.set_direction(turn)
+        started = time.perf_counter()
+        stepped += len(engine.tick())
+        elapsed += time.perf_counter() - started
+        for i, game in enumerate(games):
+            if game.status is GameStatus.GAME_OVER:
+                games[i] = engine.add(SnakeGame.new(game.id, "bench", GameMode.PASS_THROUGH, seed=t))
+    return stepped / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    rate = run(args.games, args.ticks)
+    budget = rate * TICK_INTERVAL
+    print(f"{args.games} games x {args.ticks} ticks: {rate:,.0f} games/sec")
+    print(f"fits ~{budget:,.0f} concurrent games in one {TICK_INTERVAL * 1000:.0f} ms tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Scalar vs. NumPy batch engine.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_engine_batch --sizes 1000 10000 100000 --ticks 20
+
+Both engines get the same games and the same inputs; the time spent applying
+inputs is excluded so the numbers compare tick cost only.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.engine import GameEngine, SnakeGame
+from app.engine_batch import BatchEngine
+from app.schemas import GameMode
+
+
+def make_games(n: int, seed: int):
+    rng = random.Random(seed)
+    return [SnakeGame.new(f"g{i}", "bench", GameMode.PASS_THROUGH, seed=rng.getrandbits(31)) for i in range(n)]
+
+
+def bench_scalar(n: int, turns) -> float:
+    engine = GameEngine()
+    engine.add_many(make_games(n, 0))
+    games = list(engine.games.values())
+    elapsed = 0.0
+    stepped = 0
+    for rows, codes in turns:
+        for row, code in zip(rows.tolist(), codes.tolist()):
+            games[row].set_direction(code)
+        started = time.perf_counter()
+        stepped += len(engine.tick())
+        elapsed += time.perf_counter() - started
+    return stepped / elapsed
+
+
+def bench_batch(n: int, turns) -> float:
+    batch = BatchEngine(capacity=n)
+    batch.add_many(make_games(n, 0))
+    elapsed = 0.0
+    stepped = 0
+    for rows, codes in turns:
+        batch.set_directions(rows, codes)
+        started = time.perf_counter()
+        stepped += len(batch.tick())
+        elapsed += time.perf_counter() - started
+    return stepped / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    print(f"{'games':>8} {'scalar games/s':>16} {'batch games/s':>16} {'speedup':>8}")
+    for n in args.sizes:
+        turns = []
+        for _ in range(args.ticks):
+            rows = np.flatnonzero(rng.random(n) < 0.2)
+            turns.append((rows, rng.integers(0, 4, rows.size).astype(np.int8)))
+        scalar = bench_scalar(n, turns)
+        batch = bench_batch(n, turns)
+        print(f"{n:>8} {scalar:>16,.0f} {batch:>16,.0f} {batch / scalar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
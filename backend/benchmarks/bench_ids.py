@@ -0,0 +1,136 @@
+"""Leaderboard primary keys: uuid4 text (before) vs 16-byte UUIDv7 (after).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_ids --rows 500000
+
+Builds the leaderboard table twice in throwaway SQLite files, with the same
+indexes: once with the old schema (id a random uuid4, 36 characters of text)
+and once with the current one (models.BinaryId holding a UUIDv7 taken at the
+row's date). Both get `--rows` generated scores spread over 30 days, inserted
+in date order in batches like a live server would. Then it reports:
+
+  insert      rows per second, and the file size afterwards
+  top page    GET /leaderboard's first page (score index, unchanged)
+  newest      the 100 most recent entries: ORDER BY date on the old table,
+              ORDER BY id on the new one
+  day scan    every entry of one day: a date filter on the old table, an id
+              range on the new one
+  lookups     `--lookups` random primary key reads
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, String, create_engine, desc, insert, select
+
+DAYS = 30
+
+
+def id_at(ms: int, rng: random.Random) -> str:
+    # app/ids.py's layout for a given millisecond (new_id() only does "now")
+    return str(uuid.UUID(int=ms << 80 | 0x7 << 76 | rng.getrandbits(12) << 64 | 0b10 << 62 | rng.getrandbits(62)))
+
+
+def generate(rows: int, seed: int = 1):
+    rng = random.Random(seed)
+    start = datetime(2026, 9, 18)
+    step = DAYS * 86400 / rows
+    for i in range(rows):
+        date = start + timedelta(seconds=i * step)
+        yield date, rng.randrange(10_000), rng.choice(("walls", "pass-through")), f"user{rng.randrange(5000)}"
+
+
+def timed(fn, repeat: int = 1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def run(label: str, table, make_id, rows: int, lookups: int, batch: int, directory: str) -> dict:
+    path = os.path.join(directory, f"{label}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    table.metadata.create_all(engine)
+    rng = random.Random(2)
+
+    ids = []
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        pending = []
+        for date, score, mode, username in generate(rows):
+            id = make_id(date, rng)
+            ids.append(id)
+            pending.append({"id": id, "username": username, "score": score, "game_mode": mode, "date": date})
+            if len(pending) == batch:
+                conn.execute(insert(table), pending)
+                pending = []
+        if pending:
+            conn.execute(insert(table), pending)
+    insert_seconds = time.perf_counter() - started
+
+    c = table.c
+    day_start = datetime(2026, 10, 1)
+    day_end = day_start + timedelta(days=1)
+    if label == "before":
+        newest = select(c.id, c.score).order_by(desc(c.date)).limit(100)
+        day = select(c.id, c.score).where(c.date >= day_start, c.date < day_end)
+    else:
+        newest = select(c.id, c.score).order_by(desc(c.id)).limit(100)
+        day = select(c.id, c.score).where(c.id >= str(uuid.UUID(int=int(day_start.timestamp() * 1000) << 80)),
+                                          c.id < str(uuid.UUID(int=int(day_end.timestamp() * 1000) << 80)))
+    top = select(c.id, c.username, c.score).order_by(desc(c.score), c.date, c.id).limit(10)
+    sample = random.Random(3).sample(ids, min(lookups, len(ids)))
+
+    with engine.connect() as conn:
+        top_seconds, _ = timed(lambda: conn.execute(top).all(), 50)
+        newest_seconds, _ = timed(lambda: conn.execute(newest).all(), 5)
+        day_seconds, day_rows = timed(lambda: conn.execute(day).all(), 3)
+        lookup_seconds, _ = timed(lambda: [conn.execute(select(c.score).where(c.id == id)).scalar() for id in sample])
+    engine.dispose()
+    return {
+        "insert": rows / insert_seconds,
+        "size": os.path.getsize(path),
+        "top": top_seconds,
+        "newest": newest_seconds,
+        "day": day_seconds,
+        "dayRows": len(day_rows),
+        "lookup": lookup_seconds / len(sample),
+    }
+
+
+def main(rows: int, lookups: int, batch: int) -> None:
+    from app.models import LeaderboardEntry
+
+    after_table = LeaderboardEntry.__table__.to_metadata(MetaData())
+    before_table = LeaderboardEntry.__table__.to_metadata(MetaData())
+    before_table.c.id.type = String()
+
+    with tempfile.TemporaryDirectory() as directory:
+        before = run("before", before_table, lambda date, rng: str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                     rows, lookups, batch, directory)
+        after = run("after", after_table, lambda date, rng: id_at(int(date.timestamp() * 1000), rng),
+                    rows, lookups, batch, directory)
+
+    assert before["dayRows"] == after["dayRows"]
+    print(f"{rows} leaderboard rows, batches of {batch}")
+    print(f"{'':12}{'uuid4 text':>14}{'uuid7 bytes':>14}")
+    print(f"{'insert':12}{before['insert']:>10.0f} r/s{after['insert']:>10.0f} r/s")
+    print(f"{'file size':12}{before['size'] / 2**20:>11.1f} MB{after['size'] / 2**20:>11.1f} MB")
+    for key, label in (("top", "top page"), ("newest", "newest 100"), ("day", "day scan")):
+        print(f"{label:12}{before[key] * 1000:>11.2f} ms{after[key] * 1000:>11.2f} ms")
+    print(f"{'lookup':12}{before['lookup'] * 1e6:>11.1f} us{after['lookup'] * 1e6:>11.1f} us")
+    print(f"(day scan returns {after['dayRows']} rows)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.rows, args.lookups, args.batch)
@@ -0,0 +1,332 @@
+"""API throughput and latency under mixed traffic.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_load --seconds 20 --concurrency 32 --spectators 50
+    python -m benchmarks.bench_load --database-url postgresql://localhost/snake_bench
+    python -m benchmarks.bench_load --compare benchmarks/results/load-1a2b3c4-sqlite.json
+
+Boots `--workers` uvicorn workers (bench_fanout.Cluster) on a throwaway
+SQLite file, or on `--database-url`. Point that at a scratch database: the
+run signs up users and submits scores. After setup (one account per virtual
+user, `--seed-scores` leaderboard rows, `--games` live pass-through games),
+traffic runs for `--seconds`:
+
+  users        `--concurrency` loops, each sending back-to-back requests
+               picked by the weights in `--mix`:
+                 read    GET /api/leaderboard, the default page or one mode
+                 submit  POST /api/leaderboard/score
+                 login   POST /api/auth/login
+  spectators   `--spectators` SSE streams on /api/games/{id}/subscribe,
+               spread over the live games and workers
+
+Per endpoint it reports requests, errors (status >= 400 or a transport
+failure), RPS, p50/p95/p99/max latency and SQL statements per request. The
+statement count comes from http_db_statements_total on each worker's
+/metrics, diffed around the measured phase. For spectators it reports
+frames/s, time to first frame and the p99 gap between frames.
+
+Results are written as JSON (`--out`, by default
+benchmarks/results/load-<commit>-<database>.json). `--compare OLD.json`
+prints the change against an earlier run and exits 1 if any endpoint's RPS
+dropped, or p95 rose, by more than `--threshold` percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from tests_integration.cluster import BACKEND, Cluster
+from benchmarks.bench_login_storm import percentile
+
+MODES = ("walls", "pass-through")
+READ_PARAMS = ({}, {"gameMode": "walls"}, {"gameMode": "pass-through"}, {"limit": 50})
+ENDPOINTS = {
+    "read": "GET /api/leaderboard",
+    "submit": "POST /api/leaderboard/score",
+    "login": "POST /api/auth/login",
+}
+STATEMENTS = re.compile(r'^http_db_statements_total\{method="([^"]+)",route="([^"]+)"\} (\S+)$', re.M)
+
+
+class VirtualUser:
+    def __init__(self, n: int, client: httpx.AsyncClient):
+        self.client = client
+        self.rng = random.Random(n)
+        self.credentials = {"email": f"load{n}@example.com", "password": "password123", "username": f"load{n}"}
+        self.auth: Dict[str, str] = {}
+
+    async def signup(self) -> None:
+        response = await self.client.post("/api/auth/signup", json=self.credentials)
+        if response.status_code == 400:
+            # Left over from an earlier run on the same database
+            response = await self.client.post("/api/auth/login", json=self.credentials)
+        response.raise_for_status()
+        self.auth = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    def submit(self):
+        score = {"score": self.rng.randrange(10_000), "gameMode": self.rng.choice(MODES)}
+        return self.client.post("/api/leaderboard/score", json=score, headers=self.auth)
+
+    def request(self, op: str):
+        if op == "read":
+            return self.client.get("/api/leaderboard", params=self.rng.choice(READ_PARAMS))
+        if op == "submit":
+            return self.submit()
+        return self.client.post("/api/auth/login", json=self.credentials)
+
+
+async def drive(user: VirtualUser, mix: Dict[str, int], deadline: float,
+                samples: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    ops, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        op = user.rng.choices(ops, weights)[0]
+        started = time.perf_counter()
+        try:
+            failed = (await user.request(op)).status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        samples[op].append((time.perf_counter() - started) * 1000)
+        errors[op] += failed
+
+
+async def spectate(client: httpx.AsyncClient, url: str, deadline: float, stream: dict) -> None:
+    started = time.perf_counter()
+    last = None
+    try:
+        async with client.stream("GET", url, timeout=None) as response:
+            async for line in response.aiter_lines():
+                now = time.perf_counter()
+                if line.startswith("data: "):
+                    if last is None:
+                        stream["firstFrameMs"] = (now - started) * 1000
+                    else:
+                        stream["gaps"].append((now - last) * 1000)
+                    last = now
+                    stream["frames"] += 1
+                if now > deadline:
+                    return
+        # The server ended the stream early (game over or worker shutting down)
+        stream["dropped"] = True
+    except httpx.HTTPError:
+        stream["dropped"] = True
+
+
+async def scrape_statements(urls: List[str]) -> Dict[str, float]:
+    counts: Dict[str, float] = defaultdict(float)
+    async with httpx.AsyncClient() as client:
+        for url in urls:
+            text = (await client.get(f"{url}/metrics")).text
+            for method, route, value in STATEMENTS.findall(text):
+                counts[f"{method} {route}"] += float(value)
+    return counts
+
+
+async def setup(urls: List[str], concurrency: int, seed_scores: int, games: int):
+    clients = [httpx.AsyncClient(base_url=url, timeout=30) for url in urls]
+    users = [VirtualUser(n, clients[n % len(clients)]) for n in range(concurrency)]
+    await asyncio.gather(*(user.signup() for user in users))
+    for n in range(seed_scores):
+        (await users[n % len(users)].submit()).raise_for_status()
+    game_ids = []
+    for n in range(games):
+        owner = users[n % len(users)]
+        response = await owner.client.post("/api/games", json={"gameMode": "pass-through"}, headers=owner.auth)
+        response.raise_for_status()
+        game_ids.append(response.json()["id"])
+    # Spectators on other workers find a game once write-behind flushed it
+    for client in clients:
+        for game_id in game_ids:
+            for _ in range(100):
+                if (await client.get(f"/api/games/{game_id}")).status_code == 200:
+                    break
+                await asyncio.sleep(0.05)
+    return clients, users, game_ids
+
+
+async def measure(urls: List[str], args, mix: Dict[str, int]) -> dict:
+    clients, users, game_ids = await setup(urls, args.concurrency, args.seed_scores, args.games)
+    before = await scrape_statements(urls)
+
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    streams = [{"frames": 0, "gaps": [], "firstFrameMs": None, "dropped": False} for _ in range(args.spectators)]
+    # Spectators get their own connections: a stream holds its connection open
+    watchers = [httpx.AsyncClient(base_url=url, limits=httpx.Limits(max_connections=None)) for url in urls]
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    tasks = [spectate(watchers[n % len(urls)], f"/api/games/{game_ids[n % len(game_ids)]}/subscribe",
+                      deadline, streams[n]) for n in range(args.spectators if game_ids else 0)]
+    tasks += [drive(user, mix, deadline, samples, errors) for user in users]
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    for client in clients + watchers:
+        await client.aclose()
+    # A stream's statements are counted when it closes on the server side
+    await asyncio.sleep(0.5)
+    after = await scrape_statements(urls)
+
+    endpoints = {}
+    for op, latencies in samples.items():
+        key = ENDPOINTS[op]
+        endpoints[key] = {
+            "requests": len(latencies),
+            "errors": errors[op],
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50Ms": round(percentile(latencies, 0.50), 3),
+            "p95Ms": round(percentile(latencies, 0.95), 3),
+            "p99Ms": round(percentile(latencies, 0.99), 3),
+            "maxMs": round(max(latencies), 3),
+            "dbStatementsPerRequest": round((after.get(key, 0) - before.get(key, 0)) / len(latencies), 2),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    result = {
+        "total": {"requests": total, "errors": sum(errors.values()), "rps": round(total / elapsed, 1)},
+        "endpoints": endpoints,
+    }
+    if streams and game_ids:
+        gaps = [g for s in streams for g in s["gaps"]]
+        first = [s["firstFrameMs"] for s in streams if s["firstFrameMs"] is not None]
+        frames = sum(s["frames"] for s in streams)
+        result["spectators"] = {
+            "streams": len(streams),
+            "frames": frames,
+            "framesPerSecond": round(frames / elapsed, 1),
+            "firstFrameP50Ms": round(percentile(first, 0.50), 3) if first else None,
+            "firstFrameP99Ms": round(percentile(first, 0.99), 3) if first else None,
+            "gapP99Ms": round(percentile(gaps, 0.99), 3) if gaps else None,
+            "dropped": sum(s["dropped"] for s in streams),
+        }
+    return result
+
+
+def git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=BACKEND, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(result: dict) -> None:
+    meta = result["meta"]
+    print(f"{meta['commit']}{'+dirty' if meta['dirty'] else ''} on {meta['database']}, {meta['workers']} worker(s), "
+          f"{meta['concurrency']} users, {meta['spectators']} spectators, {meta['seconds']}s")
+    print(f"{'endpoint':<30} {'reqs':>7} {'errs':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'sql/req':>8}")
+    for key, e in result["endpoints"].items():
+        print(f"{key:<30} {e['requests']:>7} {e['errors']:>5} {e['rps']:>8.1f} {e['p50Ms']:>6.1f}ms "
+              f"{e['p95Ms']:>6.1f}ms {e['p99Ms']:>6.1f}ms {e['maxMs']:>6.1f}ms {e['dbStatementsPerRequest']:>8.2f}")
+    total = result["total"]
+    print(f"{'total':<30} {total['requests']:>7} {total['errors']:>5} {total['rps']:>8.1f}")
+    spectators = result.get("spectators")
+    if spectators:
+        print(f"spectators: {spectators['streams']} streams, {spectators['framesPerSecond']} frames/s, "
+              f"first frame p50={spectators['firstFrameP50Ms']} ms p99={spectators['firstFrameP99Ms']} ms, "
+              f"gap p99={spectators['gapP99Ms']} ms, dropped {spectators['dropped']}")
+
+
+def change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(old: dict, new: dict, threshold: float) -> List[str]:
+    """Print the change per endpoint; return the regressions beyond threshold (%)."""
+    print(f"\nagainst {old['meta']['commit']} ({old['meta']['date']}):")
+    regressions = []
+    for key, e in new["endpoints"].items():
+        was = old["endpoints"].get(key)
+        if was is None:
+            continue
+        rps, p95 = change(was["rps"], e["rps"]), change(was["p95Ms"], e["p95Ms"])
+        print(f"{key:<30} rps {was['rps']:>8.1f} -> {e['rps']:>8.1f} ({rps:+6.1f}%)  "
+              f"p95 {was['p95Ms']:>7.1f} -> {e['p95Ms']:>7.1f} ms ({p95:+6.1f}%)  "
+              f"sql/req {was['dbStatementsPerRequest']:.2f} -> {e['dbStatementsPerRequest']:.2f}")
+        if rps < -threshold:
+            regressions.append(f"{key}: rps {rps:+.1f}%")
+        if p95 > threshold:
+            regressions.append(f"{key}: p95 {p95:+.1f}%")
+    return regressions
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        if op not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown operation {op!r}, expected one of {', '.join(ENDPOINTS)}")
+        mix[op] = int(weight)
+    return {op: w for op, w in mix.items() if w > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--spectators", type=int, default=50)
+    parser.add_argument("--games", type=int, default=5, help="live games for spectators to watch")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("read=80,submit=15,login=5"))
+    parser.add_argument("--seed-scores", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--database-url", help="e.g. postgresql://localhost/snake_bench (default: SQLite)")
+    parser.add_argument("--out", help="result file (default benchmarks/results/load-<commit>-<database>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold, percent")
+    args = parser.parse_args()
+
+    database = "postgresql" if args.database_url and args.database_url.startswith("postgres") else "sqlite"
+    with tempfile.TemporaryDirectory() as tmp:
+        cluster = Cluster(args.workers, tmp)
+        cluster.env.pop("GAME_FLUSH_INTERVAL", None)
+        if args.database_url:
+            cluster.env["DATABASE_URL"] = args.database_url
+        with cluster:
+            result = asyncio.run(measure([cluster.url(i) for i in range(args.workers)], args, args.mix))
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    result = {
+        "meta": {
+            "commit": commit,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": database,
+            "workers": args.workers,
+            "seconds": args.seconds,
+            "concurrency": args.concurrency,
+            "spectators": args.spectators,
+            "games": args.games,
+            "mix": args.mix,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        **result,
+    }
+    report(result)
+
+    out = args.out or os.path.join(BACKEND, "benchmarks", "results", f"load-{commit}-{database}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"saved {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        if regressions:
+            print("regressions: " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
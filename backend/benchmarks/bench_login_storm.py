@@ -0,0 +1,103 @@
+"""Leaderboard latency during a login storm.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_login_storm --logins 200 --concurrency 50
+    python -m benchmarks.bench_login_storm --inline   # old behaviour, for comparison
+
+Drives the app in process over ASGI against a throwaway SQLite file. GET
+/api/leaderboard is probed back to back, first on an idle server and then
+while `--logins` bcrypt logins are in flight, and the p50/p99 of both phases
+are reported. With hashing on the pool the two should be close; with
+--inline every login stalls the event loop and the storm p99 climbs to
+hundreds of milliseconds.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from typing import List
+
+
+def percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def probe(client, until: asyncio.Event, samples: List[float]) -> None:
+    while not until.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/leaderboard")
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+
+
+async def run(logins: int, concurrency: int, probes: int, inline: bool) -> None:
+    from httpx import AsyncClient
+    from app.main import app
+    from app.database import engine, Base
+    from app.hashing import password_hasher
+    import bcrypt
+
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    if inline:
+        async def run_inline(fn, *args):
+            return fn(*args)
+        password_hasher._run = run_inline
+
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        credentials = {"email": "storm@example.com", "password": "password123", "username": "storm"}
+        response = await client.post("/api/auth/signup", json=credentials)
+        assert response.status_code == 201, response.text
+
+        idle: List[float] = []
+        for _ in range(probes):
+            started = time.perf_counter()
+            await client.get("/api/leaderboard")
+            idle.append((time.perf_counter() - started) * 1000)
+
+        done = asyncio.Event()
+        storm: List[float] = []
+        prober = asyncio.create_task(probe(client, done, storm))
+        statuses: Counter = Counter()
+        gate = asyncio.Semaphore(concurrency)
+
+        async def login():
+            async with gate:
+                response = await client.post("/api/auth/login", json=credentials)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+
+    print(f"mode: {'inline' if inline else f'pool x{password_hasher.workers}'}, bcrypt cost {bcrypt.gensalt()[4:6].decode()}")
+    print(f"logins: {logins} in {elapsed:.2f}s, statuses {dict(statuses)}")
+    for name, samples in (("idle", idle), ("storm", storm)):
+        print(f"{name:>5}: n={len(samples):5d}  p50={statistics.median(samples):8.2f} ms"
+              f"  p99={percentile(samples, 0.99):8.2f} ms  max={max(samples):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tmp}/bench.db")
+        asyncio.run(run(args.logins, args.concurrency, args.probes, args.inline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Per-request overhead of the metrics middleware.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_metrics --requests 200000
+
+Calls a trivial ASGI app directly and through MetricsMiddleware, with the
+same fake scope and no-op send, and reports the difference per request.
+Routing, HTTP parsing and the network are left out on purpose, so the
+number is the middleware's own cost.
+"""
+import argparse
+import asyncio
+import time
+
+from app.metrics import MetricsMiddleware
+
+
+class FakeRoute:
+    path = "/api/leaderboard"
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = FakeRoute
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"[]"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def time_app(app, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        await app({"type": "http", "method": "GET", "path": "/api/leaderboard"}, receive, send)
+    return time.perf_counter() - started
+
+
+async def run(n: int, repeat: int) -> None:
+    wrapped = MetricsMiddleware(endpoint)
+    await time_app(wrapped, 1000)  # warm up label caches
+    bare = min([await time_app(endpoint, n) for _ in range(repeat)])
+    instrumented = min([await time_app(wrapped, n) for _ in range(repeat)])
+    per_request = (instrumented - bare) / n * 1e6
+    print(f"bare:         {bare / n * 1e6:7.3f} us/request")
+    print(f"instrumented: {instrumented / n * 1e6:7.3f} us/request")
+    print(f"overhead:     {per_request:7.3f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
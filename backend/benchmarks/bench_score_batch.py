@@ -0,0 +1,79 @@
+"""Score ingestion: one request per score vs POST /leaderboard/scores:batch.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_score_batch --scores 2000 --sizes 10 50 100
+
+Drives the app in process over ASGI against a throwaway SQLite file (or
+DATABASE_URL). One signed-up player uploads `--scores` scores, first with
+POST /api/leaderboard/score once per score, as an offline client replaying
+its backlog does today, then in batches of each `--sizes`. Reports rows per
+second and the SQL statements each path ran per row.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import List
+
+
+async def run(scores: int, sizes: List[int]) -> None:
+    from httpx import AsyncClient
+    from app.main import app
+    from app.database import engine, Base
+    from app.metrics import db_queries, instrument_engine
+
+    engine.echo = False
+    instrument_engine(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    def statements() -> int:
+        return sum(h.count for h in db_queries.series.values())
+
+    rng = random.Random(1)
+    batch = [{"score": rng.randrange(10_000), "gameMode": rng.choice(("walls", "pass-through"))}
+             for _ in range(scores)]
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        response = await client.post("/api/auth/signup", json={
+            "email": "batch@example.com", "password": "password123", "username": "batch"})
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        results = []
+        before, started = statements(), time.perf_counter()
+        for score in batch:
+            response = await client.post("/api/leaderboard/score", json=score, headers=headers)
+            assert response.status_code == 200, response.text
+        results.append(("single", time.perf_counter() - started, statements() - before))
+
+        for size in sizes:
+            before, started = statements(), time.perf_counter()
+            for i in range(0, scores, size):
+                response = await client.post("/api/leaderboard/scores:batch",
+                                             json={"scores": batch[i:i + size]}, headers=headers)
+                assert response.status_code == 200, response.text
+                assert all(r["status"] == "accepted" for r in response.json())
+            results.append((f"batch x{size}", time.perf_counter() - started, statements() - before))
+
+    print(f"{scores} scores on {engine.dialect.name}")
+    single = results[0][1]
+    for label, seconds, queries in results:
+        print(f"{label:<12} {scores / seconds:>9.0f} rows/s  {queries / scores:>6.2f} statements/row"
+              f"  {single / seconds:>6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scores", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tmp}/bench.db")
+        asyncio.run(run(args.scores, args.sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Response serialization: schema path vs rows straight to JSON bytes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization --games 200 --length 300 --entries 100
+
+Fills a throwaway SQLite file with `--games` active games whose snakes are
+`--length` cells long and `--entries` leaderboard rows, then times building
+the response body of GET /api/games/active and GET /api/leaderboard both
+ways:
+
+  schema   select(Entity) -> Schema.model_validate(from_attributes) -> dump_json
+  rows     select(columns) -> app.serialization encoders -> orjson
+
+once for the encode step alone (rows already in memory) and once including
+the query.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import ActiveGame, LeaderboardEntry
+from app.schemas import ActiveGame as ActiveGameSchema, LeaderboardEntry as LeaderboardEntrySchema
+from app.serialization import (ACTIVE_GAME_COLUMNS, LEADERBOARD_COLUMNS, LeaderboardRow, active_games,
+                               dumps, leaderboard_entries)
+
+GAMES = TypeAdapter(List[ActiveGameSchema])
+ENTRIES = TypeAdapter(List[LeaderboardEntrySchema])
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def atimed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def seed(db: AsyncSession, games: int, length: int, entries: int) -> None:
+    now = datetime.utcnow()
+    db.add_all(ActiveGame(id=f"g{i}", username=f"u{i}", score=i * 10, game_mode="pass-through",
+                          snake=[{"x": c % 20, "y": (c // 20) % 20} for c in range(length)],
+                          food={"x": 0, "y": 0}, direction="UP", started_at=now, status="playing")
+               for i in range(games))
+    db.add_all(LeaderboardEntry(id=f"e{i}", username=f"u{i % 50}", score=i, game_mode="walls",
+                                date=now - timedelta(seconds=i))
+               for i in range(entries))
+    await db.commit()
+
+
+async def run(games: int, length: int, entries: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        async with Session() as db:
+            await seed(db, games, length, entries)
+
+        async with Session() as db:
+            entities = (await db.scalars(select(ActiveGame))).all()
+            rows = (await db.execute(select(*ACTIVE_GAME_COLUMNS))).all()
+            board_entities = (await db.scalars(select(LeaderboardEntry).limit(entries))).all()
+            for i, e in enumerate(board_entities):
+                e.rank = i + 1
+            board_rows = [LeaderboardRow(*r, i + 1) for i, r in
+                          enumerate(await db.execute(select(*LEADERBOARD_COLUMNS).limit(entries)))]
+
+            def old_games():
+                return GAMES.dump_json([ActiveGameSchema.model_validate(e) for e in entities], by_alias=True)
+
+            def old_board():
+                return ENTRIES.dump_json([LeaderboardEntrySchema.model_validate(e) for e in board_entities],
+                                         by_alias=True)
+
+            results = [
+                ("active games, encode", timed(old_games, repeat), timed(lambda: active_games(rows), repeat)),
+                ("leaderboard, encode", timed(old_board, repeat),
+                 timed(lambda: dumps(leaderboard_entries(board_rows)), repeat)),
+            ]
+
+            async def old_games_query():
+                db.expunge_all()
+                found = (await db.scalars(select(ActiveGame))).all()
+                return GAMES.dump_json([ActiveGameSchema.model_validate(e) for e in found], by_alias=True)
+
+            async def new_games_query():
+                return active_games((await db.execute(select(*ACTIVE_GAME_COLUMNS))).all())
+
+            results.append(("active games, query+encode", await atimed(old_games_query, repeat),
+                            await atimed(new_games_query, repeat)))
+        await engine.dispose()
+
+    print(f"{games} games x {length} cells, {entries} leaderboard rows, mean of {repeat} runs")
+    print(f"{'':<28} {'schema':>10} {'rows':>10} {'speedup':>8}")
+    for label, old, new in results:
+        print(f"{label:<28} {old:>8.2f}ms {new:>8.2f}ms {old / new:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--length", type=int, default=300)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.games, args.length, args.entries, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
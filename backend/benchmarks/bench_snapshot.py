@@ -0,0 +1,93 @@
+"""Warm restart: the mmap game snapshot vs resuming from active_games.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_snapshot --games 2000 --ticks 100
+
+Steps `--games` live games for `--ticks` ticks, writing every tick's changed
+games into a snapshot file in a temporary directory, and reports the
+snapshot's cost per tick. Then it compares the two ways of getting the games
+back after a restart: opening the snapshot, and the startup path without one
+(SELECT the playing rows from a throwaway SQLite file, SnakeGame.from_row).
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def from_db(games, directory: str) -> float:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app.engine import SnakeGame
+    from app.persistence import upsert_statement
+    import app.crud as crud
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        await db.execute(upsert_statement("sqlite"), [g.to_state() for g in games])
+        await db.commit()
+
+    started = time.perf_counter()
+    async with session_factory() as db:
+        rows = await crud.list_games_by_status(db, "playing")
+    restored = [SnakeGame.from_row(row) for row in rows]
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    assert len(restored) == sum(g.status.value == "playing" for g in games)
+    return elapsed
+
+
+def main(games: int, ticks: int) -> None:
+    from app.engine import GameEngine, SnakeGame
+    from app.schemas import GameMode
+    from app.snapshot import GameSnapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "live.snap")
+        engine = GameEngine()
+        for i in range(games):
+            engine.add(SnakeGame.new(f"game-{i}", f"user-{i}", GameMode.PASS_THROUGH, seed=i))
+        snapshot = GameSnapshot(path)
+        snapshot.open()
+
+        samples = []
+        for _ in range(ticks):
+            changed = engine.tick()
+            started = time.perf_counter()
+            snapshot.track(changed)
+            samples.append(time.perf_counter() - started)
+        snapshot.close()
+        size = os.path.getsize(path)
+        live = list(engine.games.values())
+
+        restored = GameSnapshot(path)
+        loaded = restored.open()
+        restored.close()
+        assert len(loaded) == len(live)
+        db_seconds = asyncio.run(from_db(live, directory))
+
+    ms = [s * 1000 for s in samples]
+    print(f"{games} games, {ticks} ticks, snapshot file {size / 1024:.0f} KiB")
+    print(f"snapshot write per tick: mean {sum(ms) / len(ms):.3f} ms  p50 {percentile(ms, 50):.3f} ms  "
+          f"p99 {percentile(ms, 99):.3f} ms  ({snapshot.writes} records)")
+    print(f"restart from snapshot:   {restored.load_seconds * 1000:8.2f} ms  ({len(loaded)} games)")
+    print(f"restart from SQL:        {db_seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+    main(args.games, args.ticks)
@@ -0,0 +1,91 @@
+"""Score verification throughput.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_verify --games 2000 --workers 1 2 4
+
+Records `--games` random games with the tick engine, then verifies every
+input log three ways:
+
+  engine     replaying through SnakeGame.step, as the spectator path does
+  play_out   the headless simulator score verification uses (app/replay.py)
+  pool       app.verification.check on a process pool of each --workers size,
+             i.e. what the server does per submitted score, IPC included
+
+and reports simulated ticks per millisecond and verified games per second.
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from app.engine import SnakeGame, DIRECTIONS
+from app.replay import play_out
+from app.schemas import GameMode
+from app.verification import check
+
+
+def record(count: int):
+    games = []
+    for seed in range(count):
+        rng = random.Random(seed)
+        mode = (GameMode.WALLS, GameMode.PASS_THROUGH)[seed % 2]
+        game = SnakeGame.new(f"bench-{seed}", "bench", mode, seed=seed)
+        while game.step():
+            if rng.random() < 0.3:
+                game.set_direction(DIRECTIONS[rng.randrange(4)])
+        games.append((mode, seed, game.inputs, game.score, game.ticks))
+    return games
+
+
+def replay_engine(mode, seed, inputs) -> int:
+    game = SnakeGame.new("replay", "bench", mode, seed=seed)
+    game.inputs = None
+    turns = iter(inputs)
+    turn = next(turns, None)
+    while True:
+        if turn is not None and turn[0] == game.ticks + 1:
+            game.pending = turn[1]
+            turn = next(turns, None)
+        if not game.step():
+            return game.score
+
+
+def report(label: str, games: int, ticks: int, seconds: float) -> None:
+    print(f"{label:<12} {ticks / seconds / 1000:>9.0f} ticks/ms  {games / seconds:>10.0f} games/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    games = record(args.games)
+    ticks = sum(g[4] for g in games)
+    print(f"{len(games)} games, {ticks} ticks, {ticks / len(games):.0f} ticks/game on average")
+
+    started = time.perf_counter()
+    for mode, seed, inputs, score, _ in games:
+        assert replay_engine(mode, seed, inputs) == score
+    report("engine", len(games), ticks, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for mode, seed, inputs, score, _ in games:
+        assert play_out(mode, seed, inputs)[0] == score
+    report("play_out", len(games), ticks, time.perf_counter() - started)
+
+    jobs = [(mode.value, seed, inputs, score) for mode, seed, inputs, score, _ in games]
+    for workers in args.workers:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(check, *zip(*jobs[:workers])))  # start the workers
+            started = time.perf_counter()
+            results = list(pool.map(check, *zip(*jobs), chunksize=1))
+            elapsed = time.perf_counter() - started
+        assert all(reason is None for _, reason in results)
+        report(f"pool x{workers}", len(games), ticks, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+# Local multi-worker harness: N uvicorn processes on one SQLite file, wired
+# together with the socket pub/sub backend. Used by test_pubsub and by
+# benchmarks/bench_fanout.py and bench_load.py.
+
+MATCH_WINDOW = 1.0  # seconds
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Cluster:
+    """N local uvicorn workers sharing a DB file and a pub/sub socket."""
+
+    def __init__(self, workers: int, directory: str):
+        self.directory = directory
+        self.ports = [free_port() for _ in range(workers)]
+        self.processes: List[subprocess.Popen] = []
+        self.env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite+aiosqlite:///{directory}/cluster.db",
+            PUBSUB_BACKEND="socket",
+            PUBSUB_SOCKET=f"{directory}/pubsub.sock",
+            GAME_FLUSH_INTERVAL="0.2",
+        )
+
+    def url(self, worker: int) -> str:
+        return f"http://127.0.0.1:{self.ports[worker]}"
+
+    def start(self, timeout: float = 20) -> None:
+        # One at a time, so only the first worker creates the schema
+        for port in self.ports:
+            self.processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                cwd=BACKEND, env=self.env,
+            ))
+            self._wait_ready(port, timeout)
+
+    def _wait_ready(self, port: int, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError(f"worker on port {port} did not start")
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes.clear()
+
+    def __enter__(self) -> "Cluster":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+async def start_game(cluster: Cluster) -> str:
+    async with httpx.AsyncClient(base_url=cluster.url(0)) as client:
+        response = await client.post("/api/auth/signup", json={
+            "email": "fanout@example.com", "password": "password123", "username": "fanout"})
+        token = response.json()["token"]
+        response = await client.post("/api/games", json={"gameMode": "pass-through"},
+                                     headers={"Authorization": f"Bearer {token}"})
+        game_id = response.json()["id"]
+    # Other workers find the game once write-behind has flushed it
+    for worker in range(1, len(cluster.ports)):
+        async with httpx.AsyncClient(base_url=cluster.url(worker)) as client:
+            for _ in range(100):
+                if (await client.get(f"/api/games/{game_id}")).status_code == 200:
+                    break
+                await asyncio.sleep(0.05)
+    return game_id
+
+
+async def watch(url: str, seconds: float, arrivals: Dict[str, List[float]]) -> None:
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream("GET", url) as response:
+            deadline = time.perf_counter() + seconds
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    arrivals.setdefault(line[6:], []).append(time.perf_counter())
+                if time.perf_counter() > deadline:
+                    return
+
+
+async def measure(cluster: Cluster, seconds: float) -> dict:
+    """Fan-out latency of worker 0's frames to every other worker."""
+    game_id = await start_game(cluster)
+    arrivals: List[Dict[str, List[float]]] = [{} for _ in cluster.ports]
+    await asyncio.gather(*(
+        watch(f"{cluster.url(i)}/api/games/{game_id}/subscribe", seconds, arrivals[i])
+        for i in range(len(cluster.ports))
+    ))
+    # A snake wrapping around the board repeats its states every few seconds,
+    # so a frame is matched with the nearest arrival of the same state on the
+    # other worker, within MATCH_WINDOW. Frames with no match (e.g. sent before
+    # that worker subscribed) are counted as missed.
+    latencies, missed = [], 0
+    for remote in arrivals[1:]:
+        for frame, times in arrivals[0].items():
+            for at in times:
+                nearest = min((t - at for t in remote.get(frame, ())), key=abs, default=None)
+                if nearest is None or abs(nearest) > MATCH_WINDOW:
+                    missed += 1
+                else:
+                    latencies.append(nearest * 1000)
+    return {
+        "frames": sum(map(len, arrivals[0].values())),
+        "remoteFrames": [sum(map(len, a.values())) for a in arrivals[1:]],
+        "missed": missed,
+        "latencies": latencies,
+    }
@@ -1,3 +1,6 @@
+import random
+import uuid
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -6,6 +9,13 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from app.main import app
 from app.database import Base, get_db
+from app.ranking import rankings
+from app.leaderboard_cache import leaderboard_cache
+from app.user_cache import user_cache
+import app.api.leaderboard as leaderboard_api
+from app.engine import DIRECTIONS, SnakeGame
+from app.schemas import GameMode
+from app.verification import ScoreVerifier
 
 # Use in-memory SQLite for tests
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -24,6 +34,11 @@ TestingSessionLocal = sessionmaker(
     autoflush=False,
 )
 
+def entry_id(label: str) -> str:
+    # Leaderboard and user ids are stored as 16 bytes (app/ids.py), so tests
+    # name their rows through a stable label -> UUID mapping
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, label))
+
 @pytest.fixture(name="session")
 async def session_fixture():
     async with engine.begin() as conn:
@@ -31,6 +46,11 @@ async def session_fixture():
     
     async with TestingSessionLocal() as session:
         yield session
+
+    # The rank index and caches live in memory; drop them with the tables
+    rankings.clear()
+    leaderboard_cache.clear()
+    user_cache.clear()
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -48,3 +68,43 @@ async def client_fixture(session: AsyncSession):
         yield ac
         
     app.dependency_overrides.clear()
+
+@pytest.fixture
+def cluster(tmp_path):
+    # Two real uvicorn workers (tests_integration/cluster.py)
+    from tests_integration.cluster import Cluster
+    with Cluster(2, str(tmp_path)) as running:
+        yield running
+
+# Verified scores (test_verification, test_score_batch)
+
+def play(mode: GameMode, seed: int) -> SnakeGame:
+    rng = random.Random(seed)
+    game = SnakeGame.new("g", "u1", mode, seed=seed)
+    while game.step():
+        if rng.random() < 0.3:
+            game.set_direction(DIRECTIONS[rng.randrange(4)])
+    return game
+
+@pytest.fixture
+async def verifier(monkeypatch):
+    verifier = ScoreVerifier(session_factory=TestingSessionLocal, workers=1)
+    monkeypatch.setattr(leaderboard_api, "score_verifier", verifier)
+    yield verifier
+    await verifier.stop()
+
+async def signup(client) -> dict:
+    response = await client.post("/api/auth/signup",
+                                 json={"email": "v@e.com", "password": "p", "username": "v"})
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+async def issue(client, headers: dict, monkeypatch, seed: int) -> str:
+    # A nonce from POST /seed, for a game played with `seed`
+    monkeypatch.setattr(leaderboard_api, "new_seed", lambda: seed)
+    response = await client.post("/api/leaderboard/seed", headers=headers)
+    assert response.json()["seed"] == seed
+    return response.json()["nonce"]
+
+def submission(game: SnakeGame, nonce: str, score: int) -> dict:
+    return {"score": score, "gameMode": game.mode.value, "nonce": nonce,
+            "inputLog": [[tick, DIRECTIONS[code].value] for tick, code in game.inputs]}
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+
+from app.broadcast import GameHub, END_OF_STREAM
+
+
+def make_loader(frames):
+    calls = {"count": 0}
+
+    async def loader(game_id):
+        calls["count"] += 1
+        return frames.get(game_id)
+
+    return loader, calls
+
+
+@pytest.mark.asyncio
+async def test_hub_reads_once_per_game_not_per_subscriber():
+    loader, calls = make_loader({"g1": {"score": 0}})
+    hub = GameHub(loader=loader, poll_interval=0.01)
+
+    subs = [hub.subscribe("g1") for _ in range(50)]
+    frames = await asyncio.gather(*(s.get() for s in subs))
+    assert [s.render(f) for s, f in zip(subs, frames)] == ['{"score": 0}'] * 50
+    # Encoded once, shared by everyone
+    assert len({id(f) for f in frames}) == 1
+
+    await asyncio.sleep(0.05)
+    # 50 viewers, one producer: reads follow the poll interval only
+    assert calls["count"] < 20
+    assert hub.subscriber_count("g1") == 50
+
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_old_frames():
+    loader, _ = make_loader({"g1": {"score": 0}})
+    hub = GameHub(loader=loader, poll_interval=10, queue_size=2)
+
+    slow = hub.subscribe("g1")
+    fast = hub.subscribe("g1")
+    assert (await fast.get()).state == {"score": 0}
+    for i in range(1, 6):
+        hub.publish("g1", {"score": i})
+        assert (await fast.get()).state == {"score": i}
+
+    # Only the newest frames survive for the client that never read
+    assert slow.dropped == 4
+    assert [(await slow.get()).state["score"] for _ in range(2)] == [4, 5]
+
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_missing_game_ends_stream():
+    loader, _ = make_loader({})
+    hub = GameHub(loader=loader, poll_interval=0.01)
+
+    sub = hub.subscribe("gone")
+    assert await sub.get() is END_OF_STREAM
+    sub.close()
+    assert hub.subscriber_count("gone") == 0
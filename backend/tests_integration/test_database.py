@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import InstrumentedPool, pool_stats, writer
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_waiting_checkouts(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+                                 poolclass=InstrumentedPool, pool_size=1, max_overflow=0)
+    checkouts, waits = pool_stats.checkouts, pool_stats.waits
+
+    async def hold():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0.02)
+
+    await asyncio.gather(hold(), hold())
+    await engine.dispose()
+    assert pool_stats.checkouts - checkouts == 2
+    assert pool_stats.waits - waits == 1
+    assert pool_stats.max_wait_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_writers_take_turns(session):
+    active = 0
+    overlap = False
+
+    async def write():
+        nonlocal active, overlap
+        async with writer(session):
+            active += 1
+            overlap = overlap or active > 1
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(write() for _ in range(5)))
+    assert not overlap
+
+
+@pytest.mark.asyncio
+async def test_db_stats_endpoint(client):
+    response = await client.get("/stats/db")
+    assert response.status_code == 200
+    assert {"checkouts", "waits", "timeouts", "pool"} <= response.json().keys()
@@ -0,0 +1,67 @@
+import json
+import random
+
+import pytest
+
+from app.broadcast import GameHub, game_state
+from app.delta import FrameEncoder, apply_delta
+from app.engine import SnakeGame
+from app.schemas import GameMode
+
+
+def play(game, ticks, rng):
+    for _ in range(ticks):
+        if rng.random() < 0.3:
+            game.set_direction(rng.randrange(4))
+        game.step()
+        yield game_state(game.to_state())
+
+
+def test_deltas_rebuild_every_state_and_stay_small():
+    rng = random.Random(7)
+    game = SnakeGame.new("g1", "u1", GameMode.PASS_THROUGH, seed=3)
+    # Feed it along its row so a full frame gets large
+    for _ in range(15):
+        head = game.body[0]
+        game.food = head - head % 20 + (head + 1) % 20
+        game.step()
+    assert len(game.body) == 18
+    encoder = FrameEncoder(keyframe_interval=1000)
+
+    client = None
+    for state in play(game, 200, rng):
+        frame = encoder.encode(state)
+        if client is None:
+            client = json.loads(frame.keyframe)["game"]
+            continue
+        assert frame.delta is not None
+        client = apply_delta(client, json.loads(frame.delta))
+        assert client == state
+        assert len(frame.delta) < 200 < len(frame.full)
+
+
+def test_keyframe_every_interval():
+    encoder = FrameEncoder(keyframe_interval=5)
+    game = SnakeGame.new("g1", "u1", GameMode.PASS_THROUGH, seed=3)
+    frames = [encoder.encode(s) for s in play(game, 12, random.Random(1))]
+    assert [f.seq for f in frames if f.delta is None] == [1, 5, 10]
+
+
+@pytest.mark.asyncio
+async def test_delta_subscriber_gets_keyframe_after_gap():
+    async def loader(game_id):
+        return {"snake": [{"x": 0, "y": 0}], "score": 0}
+
+    hub = GameHub(loader=loader, poll_interval=3600, queue_size=2)
+    sub = hub.subscribe("g1", encoding="delta")
+    first = json.loads(sub.render(await sub.get()))
+    assert first["type"] == "keyframe"
+
+    for x in range(1, 6):
+        hub.publish("g1", {"snake": [{"x": x, "y": 0}], "score": x})
+    # Frames 2-4 were dropped, so frame 5 can't be a delta
+    messages = [json.loads(sub.render(await sub.get())) for _ in range(2)]
+    assert [(m["type"], m["seq"]) for m in messages] == [("keyframe", 5), ("delta", 6)]
+    assert messages[1]["head"] == [{"x": 5, "y": 0}] and messages[1]["tailRemoved"] == 1
+
+    await hub.close()
@@ -0,0 +1,106 @@
+import pytest
+
+from app.engine import SnakeGame, GameEngine, UP, DOWN, LEFT, POINTS_PER_FOOD
+from app.schemas import GameMode, GameStatus
+
+
+def cells(game):
+    return [(c % game.width, c // game.width) for c in game.body]
+
+
+def test_new_game_matches_frontend_opening():
+    game = SnakeGame.new("g", "u1", GameMode.WALLS, seed=1)
+    assert cells(game) == [(10, 10), (9, 10), (8, 10)]
+    assert game.food not in game.body
+    assert game.to_state()["direction"] == "RIGHT"
+
+
+def test_walls_mode_ends_at_edge():
+    game = SnakeGame.new("g", "u1", GameMode.WALLS, seed=1)
+    game.food = 0  # keep food out of the way
+    for _ in range(9):
+        assert game.step()
+    assert cells(game)[0] == (19, 10)
+    assert not game.step()
+    assert game.status is GameStatus.GAME_OVER
+    # The final state is the last legal position
+    assert cells(game)[0] == (19, 10)
+
+
+def test_pass_through_wraps():
+    game = SnakeGame.new("g", "u1", GameMode.PASS_THROUGH, seed=1)
+    game.food = 0
+    for _ in range(10):
+        assert game.step()
+    assert cells(game)[0] == (0, 10)
+
+
+def test_eating_grows_and_scores():
+    game = SnakeGame.new("g", "u1", GameMode.WALLS, seed=1)
+    game.food = 10 * game.width + 11
+    game.step()
+    assert game.score == POINTS_PER_FOOD
+    assert len(game.body) == 4
+    assert game.food not in game.body
+
+
+def test_reverse_is_ignored_and_self_collision_ends_game():
+    game = SnakeGame.new("g", "u1", GameMode.PASS_THROUGH, seed=1)
+    game.food = 0
+    assert not game.set_direction(LEFT)
+    # Grow to 5 cells, then turn into ourselves
+    for food in (11, 12):
+        game.food = 10 * game.width + food
+        game.step()
+    for d in (DOWN, LEFT, UP):
+        game.set_direction(d)
+        game.step()
+    assert game.status is GameStatus.GAME_OVER
+
+
+def test_food_placement_is_deterministic():
+    a = SnakeGame.new("g", "u1", GameMode.WALLS, seed=42)
+    b = SnakeGame.new("g", "u1", GameMode.WALLS, seed=42)
+    assert a.food == b.food
+    # The occupancy bitset and the body always agree
+    assert all(a.is_occupied(c) for c in a.body)
+    assert sum(bin(b).count("1") for b in a.occupied) == len(a.body)
+
+
+def test_engine_steps_only_playing_games():
+    engine = GameEngine()
+    live = engine.add(SnakeGame.new("a", "u1", GameMode.PASS_THROUGH, seed=1))
+    dead = engine.add(SnakeGame.new("b", "u2", GameMode.WALLS, seed=1))
+    dead.status = GameStatus.GAME_OVER
+    seen = []
+    engine.listeners.append(seen.extend)
+
+    assert engine.tick() == [live]
+    assert seen == [live]
+    assert live.ticks == 1 and dead.ticks == 0
+
+
+@pytest.mark.asyncio
+async def test_start_game_and_read_live_state(client):
+    from app.engine import game_engine
+
+    signup = await client.post(
+        "/api/auth/signup",
+        json={"email": "p@e.com", "password": "p", "username": "player"}
+    )
+    headers = {"Authorization": f"Bearer {signup.json()['token']}"}
+
+    response = await client.post("/api/games", json={"gameMode": "walls"}, headers=headers)
+    assert response.status_code == 201, response.text
+    game_id = response.json()["id"]
+    try:
+        response = await client.post(f"/api/games/{game_id}/direction", json={"direction": "UP"}, headers=headers)
+        assert response.status_code == 204
+        game_engine.tick()
+
+        response = await client.get(f"/api/games/{game_id}")
+        assert response.status_code == 200
+        assert response.json()["direction"] == "UP"
+        assert response.json()["snake"][0] == {"x": 10, "y": 9}
+    finally:
+        game_engine.remove(game_id)
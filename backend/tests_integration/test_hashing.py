@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+
+from app.hashing import HasherBusy, PasswordHasher, password_hasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_off_the_event_loop():
+    hasher = PasswordHasher(workers=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    hashed = await hasher.hash("password123")
+    assert await hasher.verify("password123", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    task.cancel()
+    hasher.shutdown()
+
+    # bcrypt takes far longer than a few 5 ms sleeps; the loop kept running
+    assert ticks > 5
+    assert hasher.stats()["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_saturated_hasher_rejects():
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+    first = asyncio.create_task(hasher.hash("a"))
+    await asyncio.sleep(0)
+    with pytest.raises(HasherBusy):
+        await hasher.hash("b")
+    await first
+    assert hasher.rejected == 1 and hasher.in_flight == 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_saturated(client, monkeypatch):
+    credentials = {"email": "busy@example.com", "password": "password123", "username": "busy"}
+    assert (await client.post("/api/auth/signup", json=credentials)).status_code == 201
+
+    monkeypatch.setattr(password_hasher, "queue_limit", 0)
+    response = await client.post("/api/auth/login", json=credentials)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
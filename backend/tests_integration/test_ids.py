@@ -0,0 +1,78 @@
+import base64
+import json
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from alembic import command
+from alembic.config import Config
+
+from app.ids import from_bytes, id_time, is_id, new_id, to_bytes
+from app.models import LeaderboardEntry, PersonalBest, User
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def test_ids_are_time_ordered_uuid7():
+    ids = [new_id() for _ in range(5000)]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert [to_bytes(i) for i in ids] == sorted(to_bytes(i) for i in ids)
+    parsed = uuid.UUID(ids[0])
+    assert parsed.version == 7 and parsed.variant == uuid.RFC_4122
+    assert from_bytes(to_bytes(ids[0])) == ids[0]
+    assert abs(id_time(ids[-1]) - id_time(ids[0])) < 5
+    assert is_id(ids[0]) and not is_id("e1") and not is_id(None)
+
+
+@pytest.mark.asyncio
+async def test_ids_are_stored_in_16_bytes(client, session):
+    signup = await client.post("/api/auth/signup", json={"email": "i@e.com", "password": "p", "username": "ids"})
+    headers = {"Authorization": f"Bearer {signup.json()['token']}"}
+    entry = (await client.post("/api/leaderboard/score", json={"score": 5, "gameMode": "walls"},
+                               headers=headers)).json()
+    assert uuid.UUID(entry["id"]).version == 7
+
+    for table in ("users", "leaderboard"):
+        stored = (await session.execute(text(f"SELECT typeof(id), length(id) FROM {table}"))).all()
+        assert stored == [("blob", 16)]
+    best = (await session.execute(text("SELECT typeof(entry_id) FROM personal_bests"))).scalar()
+    assert best == "blob"
+    assert (await client.get("/api/leaderboard")).json()[0]["id"] == entry["id"]
+
+    # Anything that is not an id is turned away before it reaches a query
+    cursor = base64.urlsafe_b64encode(json.dumps([5, "2026-10-18T00:00:00", "e1", 1]).encode()).decode()
+    assert (await client.get("/api/leaderboard", params={"cursor": cursor})).status_code == 400
+    assert (await client.get("/api/leaderboard/score/e1", headers=headers)).status_code == 404
+
+
+def test_migration_converts_existing_ids(tmp_path):
+    config = Config(str(BACKEND / "alembic.ini"))
+    config.attributes["database_url"] = f"sqlite+aiosqlite:///{tmp_path / 'ids.db'}"
+    command.upgrade(config, "4d9b2e7c1f38")
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'ids.db'}")
+    old = [str(uuid.uuid4()) for _ in range(3)]
+    with engine.begin() as conn:
+        for score, id in enumerate(old):
+            conn.execute(text("INSERT INTO leaderboard (id, username, score, game_mode, date) "
+                              "VALUES (:id, 'u1', :score, 'walls', '2026-10-18 12:00:00')"), {"id": id, "score": score})
+        conn.execute(text("INSERT INTO users (id, username, email, hashed_password) VALUES (:id, 'u1', 'e', 'h')"),
+                     {"id": old[0]})
+        conn.execute(text("INSERT INTO personal_bests (username, game_mode, score, date, entry_id) "
+                          "VALUES ('u1', 'walls', 2, '2026-10-18 12:00:00', :id)"), {"id": old[2]})
+
+    command.upgrade(config, "head")
+    with Session(engine) as db:
+        assert sorted(e.id for e in db.query(LeaderboardEntry)) == sorted(old)
+        assert db.get(User, old[0]).username == "u1"
+        assert db.query(PersonalBest).one().entry_id == old[2]
+        # Rebuilding the table kept the descending score index
+        sql = db.execute(text("SELECT sql FROM sqlite_master WHERE name = 'ix_leaderboard_score'")).scalar()
+        assert "score DESC" in sql
+
+    command.downgrade(config, "4d9b2e7c1f38")
+    with engine.connect() as conn:
+        assert sorted(conn.execute(text("SELECT id FROM leaderboard")).scalars()) == sorted(old)
@@ -0,0 +1,87 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app import crud
+from app.leaderboard_cache import leaderboard_cache
+from app.schemas import LeaderboardEntry, GameMode
+from tests_integration.conftest import entry_id
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+async def seed(session, scores, mode=GameMode.WALLS):
+    for i, score in enumerate(scores):
+        await crud.add_score(session, LeaderboardEntry(
+            id=entry_id(f"{mode.value}-{i:03d}"), username=f"u{i}", score=score, gameMode=mode,
+            date=T0 + timedelta(minutes=i),
+        ))
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_everything_with_global_ranks(client, session):
+    scores = [(i * 37) % 50 for i in range(25)]  # plenty of ties
+    await seed(session, scores)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"gameMode": "walls", "limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/leaderboard", params=params)
+        assert response.status_code == 200
+        seen += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert [e["rank"] for e in seen] == list(range(1, 26))
+    assert [e["score"] for e in seen] == sorted(scores, reverse=True)
+    assert len({e["id"] for e in seen}) == 25
+
+
+@pytest.mark.asyncio
+async def test_username_returns_neighbourhood(client, session):
+    await seed(session, [100 - i for i in range(20)])  # u0 best ... u19 worst
+
+    response = await client.get("/api/leaderboard", params={"gameMode": "walls", "username": "u10", "limit": 4})
+    data = response.json()
+    assert [e["username"] for e in data] == ["u8", "u9", "u10", "u11", "u12"]
+    assert [e["rank"] for e in data] == [9, 10, 11, 12, 13]
+
+    response = await client.get("/api/leaderboard", params={"username": "nobody"})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_etag_and_selective_invalidation(client, session):
+    await seed(session, [100 - i for i in range(20)])
+
+    first = await client.get("/api/leaderboard", params={"gameMode": "walls"})
+    etag = first.headers["ETag"]
+    again = await client.get("/api/leaderboard", params={"gameMode": "walls"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert leaderboard_cache.hits == 1
+
+    # A score below the cached top 10 (and in another mode) leaves the page alone
+    await crud.add_score(session, LeaderboardEntry(
+        id=entry_id("low"), username="x", score=1, gameMode=GameMode.WALLS, date=T0 + timedelta(days=1)))
+    await crud.add_score(session, LeaderboardEntry(
+        id=entry_id("other"), username="x", score=999, gameMode=GameMode.PASS_THROUGH, date=T0 + timedelta(days=1)))
+    assert leaderboard_cache.invalidations == 0
+    still = await client.get("/api/leaderboard", params={"gameMode": "walls"}, headers={"If-None-Match": etag})
+    assert still.status_code == 304
+
+    # One that enters the top 10 does invalidate it
+    await crud.add_score(session, LeaderboardEntry(
+        id=entry_id("high"), username="x", score=95, gameMode=GameMode.WALLS, date=T0 + timedelta(days=1)))
+    changed = await client.get("/api/leaderboard", params={"gameMode": "walls"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert entry_id("high") in [e["id"] for e in changed.json()]
+
+
+@pytest.mark.asyncio
+async def test_bad_cursor_is_rejected(client):
+    response = await client.get("/api/leaderboard", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
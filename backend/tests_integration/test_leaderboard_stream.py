@@ -0,0 +1,124 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.leaderboard import stream_leaderboard
+from app.leaderboard_stream import LeaderboardFeed, leaderboard_feed
+from app.ranking import ALL_MODES, RankedEntry, Rankings
+from app.schemas import GameMode
+
+BASE = datetime(2026, 10, 18, 12, 0, 0)
+
+
+def parse(message: str):
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+def entry(id: str, score: int, mode: str = "walls", minute: int = 0) -> RankedEntry:
+    return RankedEntry(id, "u1", score, mode, BASE + timedelta(minutes=minute))
+
+
+def add(feed: LeaderboardFeed, e: RankedEntry) -> None:
+    feed.rankings.add(e)
+    feed.added(e)
+
+
+def pending(listener) -> list:
+    out = []
+    while not listener.queue.empty():
+        out.append(parse(listener.queue.get_nowait()))
+    return out
+
+
+@pytest.mark.asyncio
+async def test_changes_to_the_top_k():
+    feed = LeaderboardFeed(Rankings())
+    for i, score in enumerate([50, 40, 30]):
+        add(feed, entry(f"e{i}", score, minute=i))
+    listener = feed.subscribe("walls", 3)
+    everyone = feed.subscribe(ALL_MODES, 3)
+
+    kind, body = pending(listener)[0]
+    assert kind == "snapshot" and body["seq"] == 0
+    assert [(e["id"], e["rank"]) for e in body["entries"]] == [("e0", 1), ("e1", 2), ("e2", 3)]
+    pending(everyone)
+
+    add(feed, entry("new", 45, minute=5))
+    [(kind, body)] = pending(listener)
+    assert kind == "change" and body["seq"] == 1
+    assert body["entered"]["id"] == "new" and body["entered"]["rank"] == 2
+    assert body["entered"]["date"] == "2026-10-18T12:05:00"
+    assert body["moved"] == [{"id": "e1", "rank": 3}]
+    assert body["dropped"] == ["e2"]
+
+    # Below the top 3: nothing to send
+    add(feed, entry("low", 1, minute=6))
+    assert pending(listener) == []
+    # Another mode only reaches the all-modes listener
+    add(feed, entry("pt", 99, "pass-through", minute=7))
+    assert pending(listener) == []
+    changes = [body for _, body in pending(everyone)]
+    assert [c["entered"]["id"] for c in changes] == ["new", "pt"]
+    assert changes[1]["moved"] == [{"id": "e0", "rank": 2}, {"id": "new", "rank": 3}]
+    assert changes[1]["dropped"] == ["e1"]
+
+    listener.close()
+    everyone.close()
+    assert feed.stats()["listeners"] == 0
+
+
+@pytest.mark.asyncio
+async def test_one_change_is_computed_for_all_listeners():
+    feed = LeaderboardFeed(Rankings())
+    listeners = [feed.subscribe("walls", 10) for _ in range(50)]
+    for listener in listeners:
+        pending(listener)
+    add(feed, entry("e0", 10))
+    messages = [listener.queue.get_nowait() for listener in listeners]
+    assert all(m is messages[0] for m in messages)
+    assert feed.changes == 1 and feed.sent == 50
+
+
+@pytest.mark.asyncio
+async def test_slow_listener_gets_a_fresh_snapshot():
+    feed = LeaderboardFeed(Rankings(), queue_size=2)
+    slow = feed.subscribe("walls", 5)
+    for i in range(4):
+        add(feed, entry(f"e{i}", 100 - i, minute=i))
+    events = pending(slow)
+    assert events[-1][0] == "snapshot"
+    assert [e["id"] for e in events[-1][1]["entries"]] == ["e0", "e1", "e2", "e3"]
+    assert feed.resyncs >= 1
+
+    feed.close()
+    assert await slow.get() is None
+
+
+class Connected:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_follows_submissions(client):
+    response = await stream_leaderboard(Connected(), gameMode=GameMode.WALLS, limit=5)
+    assert response.media_type == "text/event-stream"
+    events = response.body_iterator
+    try:
+        kind, body = parse(await events.__anext__())
+        assert kind == "snapshot" and body["entries"] == []
+
+        signup = await client.post("/api/auth/signup", json={"email": "s@e.com", "password": "p", "username": "s"})
+        headers = {"Authorization": f"Bearer {signup.json()['token']}"}
+        submitted = (await client.post("/api/leaderboard/score", json={"score": 70, "gameMode": "walls"},
+                                       headers=headers)).json()
+        kind, body = parse(await events.__anext__())
+        assert kind == "change" and body["entered"]["id"] == submitted["id"]
+        assert body["entered"]["rank"] == 1 and body["moved"] == [] and body["dropped"] == []
+        # The stream's entry reads the same as the REST leaderboard's
+        assert [body["entered"]] == (await client.get("/api/leaderboard")).json()
+    finally:
+        await events.aclose()
+    assert leaderboard_feed.listener_count() == 0
@@ -0,0 +1,108 @@
+import base64
+import json
+
+import pytest
+
+from app.api.spectate import stream_active_games
+from app.engine import GameEngine, SnakeGame, game_engine
+from app.lobby import LobbyFeed, lobby_feed
+from app.schemas import GameMode
+from tests_integration.conftest import TestingSessionLocal
+from tests_integration.test_leaderboard_stream import Connected
+from tests_integration.test_reaper import row
+
+
+def parse(message: bytes) -> dict:
+    event, data = message.decode().strip().split("\n")
+    assert event == "event: lobby"
+    return json.loads(data[len("data: "):])
+
+
+def bits(grid: str) -> set:
+    raw = base64.b64decode(grid)
+    return {i for i in range(len(raw) * 8) if raw[i >> 3] >> (i & 7) & 1}
+
+
+def engine_with(*scores: int) -> GameEngine:
+    engine = GameEngine()
+    for i, score in enumerate(scores):
+        game = engine.add(SnakeGame.new(f"g{i}", f"u{i}", GameMode.PASS_THROUGH, seed=i))
+        game.score = score
+    return engine
+
+
+def test_summary_is_a_coarse_thumbnail():
+    feed = LobbyFeed(engine=GameEngine(), include_remote=False)
+    game = SnakeGame.new("g1", "u1", GameMode.WALLS, seed=3)
+    summary = feed.summarize(game)
+    assert summary["head"] == [10, 10] and summary["length"] == 3
+    assert summary["food"] == [game.food % 20, game.food // 20]
+    # 20x20 board in 4x4 blocks: the opening snake (8..10, 10) sits in block (2, 2)
+    assert (feed.cols, feed.rows) == (5, 5)
+    assert bits(summary["grid"]) == {2 * 5 + 2}
+
+    for _ in range(3):
+        game.step()
+    assert bits(feed.summarize(game)["grid"]) == {2 * 5 + 2, 2 * 5 + 3}
+
+
+@pytest.mark.asyncio
+async def test_one_pass_serves_every_viewer():
+    feed = LobbyFeed(engine=engine_with(30, 10, 20), include_remote=False)
+    everyone = [feed.subscribe() for _ in range(20)]
+    top = feed.subscribe(limit=2)
+    picked = [feed.subscribe(ids=["g1", "g2", "nope"]) for _ in range(2)]
+    await feed.publish()
+
+    assert feed.encoded == 3 and feed.messages == 3
+    first = everyone[0].queue.get_nowait()
+    assert all(v.queue.get_nowait() is first for v in everyone[1:])
+    body = parse(first)
+    assert body["seq"] == 1 and body["cell"] == 4
+    assert [g["id"] for g in body["games"]] == ["g0", "g2", "g1"]
+    assert [g["id"] for g in parse(top.queue.get_nowait())["games"]] == ["g0", "g2"]
+    assert [g["id"] for g in parse(picked[0].queue.get_nowait())["games"]] == ["g2", "g1"]
+
+    # A viewer that has not read yet only keeps the newest lobby
+    await feed.publish()
+    await feed.publish()
+    assert parse(top.queue.get_nowait())["seq"] == 3 and top.queue.empty()
+    await feed.stop()
+
+
+@pytest.mark.asyncio
+async def test_games_of_other_workers_come_from_the_db(session):
+    session.add_all([row("remote", score=50, length=4), row("g0", score=0), row("done", status="game-over")])
+    await session.commit()
+    feed = LobbyFeed(engine=engine_with(5), session_factory=TestingSessionLocal, include_remote=True,
+                     remote_interval=60)
+    viewer = feed.subscribe()
+    await feed.publish()
+    games = parse(viewer.queue.get_nowait())["games"]
+    assert [(g["id"], g["score"]) for g in games] == [("remote", 50), ("g0", 5)]
+    assert games[0]["head"] == [0, 0] and games[0]["length"] == 4 and bits(games[0]["grid"]) == {0}
+
+    # Read once per remote_interval, not per pass
+    await feed.publish()
+    assert feed.remote_reads == 1
+    await feed.stop()
+
+
+@pytest.mark.asyncio
+async def test_lobby_stream_endpoint():
+    game = game_engine.add(SnakeGame.new("lobby-1", "u1", GameMode.WALLS, seed=1))
+    try:
+        response = await stream_active_games(Connected(), ids="lobby-1", limit=10)
+        assert response.media_type == "text/event-stream"
+        events = response.body_iterator
+        try:
+            await lobby_feed.publish()
+            body = parse(await events.__anext__())
+            assert [g["id"] for g in body["games"]] == ["lobby-1"]
+            assert body["games"][0]["username"] == "u1"
+        finally:
+            await events.aclose()
+        assert lobby_feed.viewers == []
+    finally:
+        game_engine.remove(game.id)
+        await lobby_feed.stop()
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.metrics import Histogram, db_queries, http_db_statements, instrument_engine, registry
+from tests_integration import conftest
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value)
+    assert h.cumulative() == [2, 3, 4]
+    assert h.count == 4 and h.sum == pytest.approx(3.65)
+
+
+@pytest.mark.asyncio
+async def test_requests_are_counted_by_route_template(client):
+    registry.clear()
+    await client.get("/api/leaderboard")
+    await client.get("/api/leaderboard")
+    await client.get("/api/games/missing")
+    await client.get("/no/such/path")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/leaderboard",status="200"} 2' in body
+    assert 'http_requests_total{method="GET",route="/api/games/{id}",status="404"} 1' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/leaderboard"} 2' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/leaderboard",le="+Inf"} 2' in body
+    # The scrape itself is still in flight while rendering
+    assert 'http_requests_in_flight{method="GET"} 1' in body
+    assert "# TYPE spectator_subscriptions gauge" in body
+    assert "games_live " in body
+
+
+@pytest.mark.asyncio
+async def test_db_statements_are_timed():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+    before = db_queries.histogram((("kind", "SELECT"),)).count
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        with pytest.raises(Exception):
+            await conn.execute(text("SELECT * FROM missing_table"))
+        await conn.execute(text("SELECT 2"))
+        assert conn.sync_connection.info["query_started"] == []
+    await engine.dispose()
+    assert db_queries.histogram((("kind", "SELECT"),)).count - before == 2
+
+
+@pytest.mark.asyncio
+async def test_db_statements_are_counted_by_route(client):
+    instrument_engine(conftest.engine)
+    registry.clear()
+    await client.get("/api/games/missing")
+    await client.get("/api/games/missing")
+    await client.get("/")
+
+    assert http_db_statements.series[(("method", "GET"), ("route", "/api/games/{id}"))] == 2
+    assert http_db_statements.series[(("method", "GET"), ("route", "/"))] == 0
+    body = (await client.get("/metrics")).text
+    assert 'http_db_statements_total{method="GET",route="/api/games/{id}"} 2' in body
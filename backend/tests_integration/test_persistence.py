@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import func, select
+
+from app.engine import SnakeGame
+from app.models import ActiveGame
+from app.persistence import WriteBehindStore
+from app.schemas import GameMode, GameStatus
+from tests_integration.conftest import TestingSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_flush_upserts_dirty_games_in_one_batch(session):
+    store = WriteBehindStore(session_factory=TestingSessionLocal)
+    games = [SnakeGame.new(f"g{i}", "u1", GameMode.PASS_THROUGH, seed=i) for i in range(3)]
+
+    # Many ticks between flushes still cost one row per game
+    for _ in range(5):
+        for game in games:
+            game.step()
+        store.track(games)
+    assert store.backlog == 3
+
+    assert await store.flush() == 3
+    stats = store.stats()
+    assert stats["flushes"] == 1 and stats["lastFlushSize"] == 3 and stats["backlog"] == 0
+
+    count = await session.scalar(select(func.count()).select_from(ActiveGame))
+    assert count == 3
+
+    # Second flush updates the existing rows in place
+    games[0].step()
+    store.track(games[:1])
+    assert await store.flush() == 1
+    row = await session.get(ActiveGame, "g0", populate_existing=True)
+    assert row.snake[0] == games[0].to_state()["snake"][0]
+
+
+@pytest.mark.asyncio
+async def test_game_over_requests_immediate_flush(session):
+    store = WriteBehindStore(session_factory=TestingSessionLocal, interval=3600)
+    flushed = []
+    store.on_flush.append(flushed.extend)
+
+    game = SnakeGame.new("g1", "u1", GameMode.WALLS, seed=1)
+    store.track([game])
+    assert not store._wake.is_set()
+
+    game.status = GameStatus.GAME_OVER
+    store.track([game])
+    assert store._wake.is_set()
+
+    await store.stop()  # hard flush even without a running loop
+    assert [row["status"] for row in flushed] == ["game-over"]
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import statistics
+
+import pytest
+
+from app.broadcast import GameHub
+from app.pubsub import MemoryBroker, MemoryPubSub, PubSub, SocketPubSub
+from tests_integration.cluster import measure
+
+
+async def attached_hub(pubsub, loader=None):
+    async def no_state(game_id):
+        return {"score": -1}
+    hub = GameHub(loader=loader or no_state, poll_interval=0.05)
+    await pubsub.start()
+    hub.attach(pubsub)
+    return hub
+
+
+@pytest.mark.asyncio
+async def test_watchers_get_states_from_the_owning_worker():
+    broker = MemoryBroker()
+    owner, viewer = MemoryPubSub(broker), MemoryPubSub(broker)
+    owner_hub = await attached_hub(owner)
+    viewer_hub = await attached_hub(viewer)
+
+    assert not owner.watched_remotely("g1")
+    sub = viewer_hub.subscribe("g1")
+    await asyncio.sleep(0)
+    # The owner only publishes once somebody elsewhere watches
+    assert owner.watched_remotely("g1")
+    assert (await sub.get()).state == {"score": -1}  # initial state from the DB
+
+    for score in range(1, 4):
+        owner.publish("g1", {"score": score})
+    await asyncio.sleep(0)
+    assert [(await sub.get()).state["score"] for _ in range(3)] == [1, 2, 3]
+
+    # Fresh pushes keep the (older) DB copy from being republished
+    await asyncio.sleep(0.08)
+    assert sub.queue.empty()
+
+    # States for games nobody here watches are ignored
+    owner.publish("g2", {"score": 9})
+    await asyncio.sleep(0)
+    assert viewer_hub.latest("g2") is None
+
+    sub.close()
+    for hub, pubsub in ((owner_hub, owner), (viewer_hub, viewer)):
+        await hub.close()
+        await pubsub.stop()
+
+
+@pytest.mark.asyncio
+async def test_socket_backend_relays_between_workers(tmp_path):
+    path = str(tmp_path / "pubsub.sock")
+    workers = [SocketPubSub(path) for _ in range(3)]
+    for w in workers:
+        await w.start()
+    assert [w.is_relay for w in workers] == [True, False, False]
+
+    received = {i: [] for i in range(3)}
+    for i, w in enumerate(workers):
+        w.handlers.append(lambda g, s, i=i: received[i].append(s))
+        w.watch("g1")
+    await asyncio.sleep(0.05)
+
+    # Client to client (through the relay) and relay to client
+    workers[1].publish("g1", {"score": 1})
+    workers[0].publish("g1", {"score": 2})
+    await asyncio.sleep(0.05)
+    scores = {i: sorted(s["score"] for s in states) for i, states in received.items()}
+    assert scores == {0: [1], 1: [2], 2: [1, 2]}
+    assert workers[1].watched_remotely("g1") and workers[0].watched_remotely("g1")
+
+    # When the relay goes away a survivor takes over
+    await workers[0].stop()
+    await asyncio.sleep(SocketPubSub.RETRY_DELAY * 3)
+    assert sum(w.is_relay for w in workers[1:]) == 1
+    workers[2].publish("g1", {"score": 3})
+    await asyncio.sleep(0.05)
+    assert received[1][-1] == {"score": 3}
+
+    for w in workers[1:]:
+        await w.stop()
+
+
+@pytest.mark.asyncio
+async def test_relay_survives_bad_lines_and_sheds_load(tmp_path):
+    path = str(tmp_path / "pubsub.sock")
+    relay = SocketPubSub(path)
+    await relay.start()
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write(b"not json\n[1]\n" + json.dumps({"o": "x", "t": "watch", "g": "g1"}).encode() + b"\n")
+    await writer.drain()
+    await asyncio.sleep(0.05)
+    # The peer is still connected and its good line got through
+    assert relay.watched_remotely("g1") and len(relay._peers) == 1
+
+    relay.publish("g1", {"score": 1})
+    assert json.loads(await asyncio.wait_for(reader.readline(), 1))["s"] == {"score": 1}
+    # A peer with more than high_water bytes unsent gets nothing more
+    relay.high_water = -1
+    relay.publish("g1", {"score": 2})
+    assert relay.stats()["dropped"] == 1
+
+    writer.close()
+    await relay.stop()
+
+
+def test_pubsub_backends_must_send():
+    with pytest.raises(TypeError):
+        PubSub()
+
+
+@pytest.mark.asyncio
+async def test_spectators_on_other_workers_follow_the_game(cluster):
+    result = await measure(cluster, seconds=2)
+    # One frame per tick, not one per DB poll, and close behind the owner
+    assert min(result["remoteFrames"]) >= 8
+    assert statistics.median(result["latencies"]) < 100
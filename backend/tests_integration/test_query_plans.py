@@ -0,0 +1,72 @@
+import re
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import sqlite
+
+from alembic import command
+from alembic.config import Config
+
+from app import crud
+from app.models import ActiveGame
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+async def query_plan(session, stmt) -> str:
+    sql = stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    rows = await session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+    return "\n".join(row[-1] for row in rows)
+
+
+def uses_index(plan: str, name: str) -> bool:
+    return re.search(rf"USING (COVERING )?INDEX {name}\b", plan) is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("game_mode,index", [
+    ("walls", "ix_leaderboard_mode_score"),
+    (None, "ix_leaderboard_score"),
+])
+async def test_leaderboard_page_uses_index_without_sorting(session, game_mode, index):
+    stmt = crud._leaderboard_query(game_mode).order_by(*crud.LEADERBOARD_ORDER).limit(10)
+    plan = await query_plan(session, stmt)
+    assert uses_index(plan, index), plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.asyncio
+async def test_best_entry_uses_index(session):
+    stmt = (
+        crud._leaderboard_query("walls")
+        .where(crud.LeaderboardEntry.username == "u1")
+        .order_by(*crud.LEADERBOARD_ORDER)
+        .limit(1)
+    )
+    plan = await query_plan(session, stmt)
+    assert uses_index(plan, "ix_leaderboard_user_mode_score"), plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.asyncio
+async def test_games_by_status_uses_index(session):
+    from sqlalchemy import select
+    plan = await query_plan(session, select(ActiveGame).where(ActiveGame.status == "playing"))
+    assert uses_index(plan, "ix_active_games_status"), plan
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'migrated.db'}"
+    config = Config(str(BACKEND / "alembic.ini"))
+    config.attributes["database_url"] = url
+    command.upgrade(config, "head")
+
+    inspector = inspect(create_engine(f"sqlite:///{tmp_path / 'migrated.db'}"))
+    assert {"users", "leaderboard", "active_games"} <= set(inspector.get_table_names())
+    indexes = {ix["name"] for ix in inspector.get_indexes("leaderboard")}
+    assert {"ix_leaderboard_mode_score", "ix_leaderboard_score", "ix_leaderboard_user_mode_score"} <= indexes
+    assert "ix_active_games_status" in {ix["name"] for ix in inspector.get_indexes("active_games")}
+
+    command.downgrade(config, "base")
+    assert "leaderboard" not in inspect(create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")).get_table_names()
@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app import crud
+from app.ranking import RankIndex, RankedEntry, Rankings, ALL_MODES
+from app.schemas import LeaderboardEntry, GameMode
+from tests_integration.conftest import entry_id
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def entry(id, score, mode="walls", minutes=0):
+    return RankedEntry(id, f"user-{id}", score, mode, T0 + timedelta(minutes=minutes))
+
+
+def test_rank_index_orders_by_score_then_date():
+    index = RankIndex()
+    assert index.add(entry("a", 50)) == 1
+    assert index.add(entry("b", 150)) == 1
+    assert index.add(entry("c", 50, minutes=5)) == 3  # ties: earlier score ranks higher
+    assert [e.id for e in index.top(10)] == ["b", "a", "c"]
+    assert [e.id for e in index.top(2, offset=1)] == ["a", "c"]
+    assert index.rank("a") == 2
+    assert index.rank_of_score(100) == 2
+    assert index.rank_of_score(50) == 2
+    assert index.rank_of_score(10) == 4
+
+
+def test_rankings_per_mode_and_overall():
+    rankings = Rankings()
+    assert rankings.add(entry("a", 10, "walls")) == 1
+    assert rankings.add(entry("b", 20, "pass-through")) == 1
+    assert rankings.index("walls").rank("a") == 1
+    assert rankings.index(ALL_MODES).rank("a") == 2
+
+
+@pytest.mark.asyncio
+async def test_load_matches_incremental_inserts(session):
+    for i, score in enumerate([30, 10, 20, 10]):
+        await crud.add_score(session, LeaderboardEntry(
+            id=entry_id(f"e{i}"), username="u", score=score, gameMode=GameMode.WALLS, date=T0 + timedelta(minutes=i)
+        ))
+    loaded = Rankings()
+    assert await loaded.load(session) == 4
+    assert [e.id for e in loaded.index("walls").top(10)] == [entry_id(f"e{i}") for i in (0, 2, 1, 3)]
+
+
+@pytest.mark.asyncio
+async def test_submit_score_returns_global_rank(client):
+    headers = {}
+    for name in ("u1", "u2"):
+        resp = await client.post(
+            "/api/auth/signup",
+            json={"email": f"{name}@e.com", "password": "p", "username": name}
+        )
+        headers[name] = {"Authorization": f"Bearer {resp.json()['token']}"}
+
+    ranks = []
+    for name, score in (("u1", 50), ("u2", 150), ("u1", 100)):
+        resp = await client.post("/api/leaderboard/score", json={"score": score, "gameMode": "walls"}, headers=headers[name])
+        assert resp.status_code == 200
+        ranks.append(resp.json()["rank"])
+    assert ranks == [1, 1, 2]
+
+    resp = await client.post("/api/leaderboard/score", json={"score": 500, "gameMode": "pass-through"}, headers=headers["u2"])
+    assert resp.json()["rank"] == 1
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.broadcast import hub
+from app.engine import GameEngine, SnakeGame
+from app.metrics import games_evicted, observe_reap
+from app.models import ActiveGame
+from app.persistence import WriteBehindStore
+from app.reaper import GameReaper
+from app.schemas import GameMode, GameStatus
+from tests_integration.conftest import TestingSessionLocal
+
+
+def row(id: str, score: int = 0, status: str = "playing", length: int = 3, age: float = 0) -> ActiveGame:
+    now = datetime.utcnow()
+    return ActiveGame(id=id, username="u1", score=score, game_mode="walls",
+                      snake=[{"x": x, "y": 0} for x in range(length)], food={"x": 5, "y": 5},
+                      direction="RIGHT", started_at=now, status=status,
+                      heartbeat_at=now - timedelta(seconds=age))
+
+
+async def stored_heartbeat(session, id: str):
+    return await session.scalar(select(ActiveGame.heartbeat_at).where(ActiveGame.id == id)
+                                .execution_options(populate_existing=True))
+
+
+@pytest.mark.asyncio
+async def test_only_player_input_moves_the_heartbeat(session):
+    store = WriteBehindStore(session_factory=TestingSessionLocal)
+    game = SnakeGame.new("g1", "u1", GameMode.WALLS, seed=1)
+    store.track([game])
+    await store.flush()
+    first = await stored_heartbeat(session, "g1")
+    assert first == game.heartbeat_at
+
+    # Ticks and flushes alone are no sign of a player
+    game.step()
+    store.track([game])
+    await store.flush()
+    assert await stored_heartbeat(session, "g1") == first
+
+    game.steer("DOWN")
+    store.track([game])
+    await store.flush()
+    assert await stored_heartbeat(session, "g1") > first
+
+
+@pytest.mark.asyncio
+async def test_idle_games_are_ended_and_evicted_while_the_worker_runs(session):
+    # A snake on a wrapping board outlives any timeout if nobody steers it
+    engine = GameEngine(idle_after=120)
+    store = WriteBehindStore(session_factory=TestingSessionLocal)
+    engine.listeners.append(store.track)
+    store.on_flush.append(lambda rows: [engine.remove(r["id"]) for r in rows if r["status"] == "game-over"])
+    idle = engine.add(SnakeGame.new("idle", "u1", GameMode.PASS_THROUGH, seed=1))
+    steered = engine.add(SnakeGame.new("steered", "u2", GameMode.PASS_THROUGH, seed=2))
+    idle.heartbeat_at = steered.heartbeat_at = datetime.utcnow() - timedelta(seconds=600)
+    steered.steer("UP")
+
+    engine.tick()
+    await store.flush()
+    assert idle.status is GameStatus.GAME_OVER and steered.status is GameStatus.PLAYING
+    assert engine.ended_idle == 1 and list(engine.games) == ["steered"]
+
+    reaper = GameReaper(session_factory=TestingSessionLocal, finished_after=60, stale_after=120)
+    assert await reaper.run_once() == {"finished": 1, "stale": 0}
+    assert (await session.scalars(select(ActiveGame.id))).all() == ["steered"]
+
+
+@pytest.mark.asyncio
+async def test_reaper_evicts_finished_and_stale_games(session):
+    session.add_all([
+        row("finished-old", status="game-over", age=120),
+        row("finished-new", status="game-over", age=5),
+        row("stale", age=600),
+        row("live", age=1),
+    ])
+    await session.commit()
+    reaper = GameReaper(session_factory=TestingSessionLocal, finished_after=60, stale_after=120)
+    games_evicted.series.clear()
+    reaper.on_reap.append(observe_reap(reaper))
+
+    assert await reaper.run_once() == {"finished": 1, "stale": 1}
+    left = (await session.scalars(select(ActiveGame.id).order_by(ActiveGame.id))).all()
+    assert left == ["finished-new", "live"]
+    assert reaper.stats()["evictedFinished"] == 1 and reaper.stats()["evictedStale"] == 1
+    assert games_evicted.series[(("reason", "stale"),)] == 1
+
+    assert await reaper.run_once() == {"finished": 0, "stale": 0}
+    assert reaper.stats()["runs"] == 2
+
+
+@pytest.mark.asyncio
+async def test_summaries_page_by_score(client, session):
+    session.add_all([row(f"g{i}", score=10 * (i % 3), length=3 + i) for i in range(5)] +
+                    [row("over", score=500, status="game-over")])
+    await session.commit()
+
+    response = await client.get("/api/games/active/summary", params={"limit": 3})
+    first = response.json()
+    assert [(g["id"], g["score"]) for g in first] == [("g2", 20), ("g1", 10), ("g4", 10)]
+    assert first[0] == {"id": "g2", "username": "u1", "score": 20, "gameMode": "walls",
+                        "length": 5, "spectators": 0}
+
+    response = await client.get("/api/games/active/summary",
+                                params={"limit": 3, "cursor": response.headers["x-next-cursor"]})
+    assert [g["id"] for g in response.json()] == ["g0", "g3"]
+    assert "x-next-cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_summaries_sort_by_viewers(client, session, monkeypatch):
+    session.add_all([row("a", score=30), row("b", score=20), row("c", score=10)])
+    await session.commit()
+    monkeypatch.setattr(hub, "subscriber_counts", lambda: {"c": 4, "b": 1})
+
+    response = await client.get("/api/games/active/summary", params={"sort": "viewers", "limit": 2})
+    assert [(g["id"], g["spectators"]) for g in response.json()] == [("c", 4), ("b", 1)]
+    response = await client.get("/api/games/active/summary",
+                                params={"sort": "viewers", "cursor": response.headers["x-next-cursor"]})
+    assert [g["id"] for g in response.json()] == ["a"]
+
+    response = await client.get("/api/games/active/summary", params={"cursor": "bm9wZQ=="})
+    assert response.status_code == 400
@@ -0,0 +1,130 @@
+import json
+import random
+
+import pytest
+
+import app.replay as replay
+from app.engine import GameEngine, SnakeGame, game_engine, DIRECTIONS, UP
+from app.models import GameReplay
+from app.replay import ReplayStore
+from app.schemas import GameMode, GameStatus
+from tests_integration.conftest import TestingSessionLocal
+
+
+def play(game_id: str, mode: GameMode, seed: int = 2) -> SnakeGame:
+    # Random turns until the snake runs into a wall or itself
+    rng = random.Random(seed)
+    game = SnakeGame.new(game_id, "u1", mode, seed=seed)
+    while game.step():
+        if rng.random() < 0.3:
+            game.set_direction(DIRECTIONS[rng.randrange(4)])
+    return game
+
+
+def test_varints_round_trip():
+    out = bytearray()
+    values = [0, 1, 127, 128, 300, 2 ** 31 - 1]
+    for value in values:
+        replay.write_varint(out, value)
+    pos, decoded = 0, []
+    for _ in values:
+        value, pos = replay.read_varint(bytes(out), pos)
+        decoded.append(value)
+    assert decoded == values and pos == len(out)
+
+
+@pytest.mark.parametrize("mode", [GameMode.WALLS, GameMode.PASS_THROUGH])
+def test_replay_reproduces_the_game(mode):
+    game = play("g1", mode)
+    assert game.status is GameStatus.GAME_OVER
+    data = replay.encode(replay.record(game))
+
+    decoded = replay.decode(data)
+    assert decoded.inputs == game.inputs
+    frames = [g.to_state() for g in replay.simulate(decoded, "g1", "u1")]
+    assert len(frames) == game.ticks + 1
+    final = frames[-1]
+    expected = game.to_state()
+    assert final["snake"] == expected["snake"] and final["food"] == expected["food"]
+    assert final["score"] == expected["score"] and final["status"] == "game-over"
+    # A few bytes per turn, however long the game ran
+    assert len(data) < 16 + 3 * len(game.inputs)
+
+
+def test_tampered_score_is_rejected():
+    game = play("g1", GameMode.PASS_THROUGH)
+    tampered = replay.record(game)._replace(score=game.score + 10)
+    with pytest.raises(replay.ReplayMismatch):
+        list(replay.simulate(tampered, "g1", "u1"))
+
+
+def test_resumed_games_have_no_replay():
+    # Games rebuilt from an active_games row start mid-way, with no input log
+    assert replay.record(SnakeGame("g1", "u1", GameMode.WALLS)) is None
+
+
+@pytest.mark.asyncio
+async def test_store_writes_finished_games_once(session):
+    store = ReplayStore(session_factory=TestingSessionLocal)
+    running = SnakeGame.new("running", "u1", GameMode.WALLS, seed=1)
+    finished = play("done", GameMode.WALLS)
+    store.track([running, finished])
+    store.track([finished])
+    assert store.pending("done") is not None and store.pending("running") is None
+
+    assert await store.flush() == 1
+    stored = store.stats()
+    # Already stored: a second write is a no-op and is not counted
+    store.track([finished])
+    assert await store.flush() == 0
+    row = await session.get(GameReplay, "done")
+    assert row.score == finished.score and replay.decode(row.data).ticks == finished.ticks
+    assert store.stats() == stored
+    assert stored["written"] == 1 and stored["bytesWritten"] == len(row.data) and stored["backlog"] == 0
+
+
+def test_idle_ended_games_have_no_replay():
+    # The engine ends games nobody steers; their snake never died, so the
+    # log would not replay to a finished game
+    engine = GameEngine(idle_after=0)
+    game = engine.add(SnakeGame.new("idle", "u1", GameMode.PASS_THROUGH, seed=1))
+    game.step()
+    assert engine.end_idle() == [game]
+    store = ReplayStore(session_factory=TestingSessionLocal)
+    store.track([game])
+    assert store.pending("idle") is None
+
+
+@pytest.mark.asyncio
+async def test_replay_endpoint(client, session):
+    game = play("replayed", GameMode.PASS_THROUGH)
+    data = replay.encode(replay.record(game))
+    session.add(GameReplay(game_id=game.id, username="u1", game_mode=game.mode.value,
+                           score=game.score, data=data))
+    await session.commit()
+
+    response = await client.get("/api/games/replayed/replay")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.content == data
+
+    response = await client.get("/api/games/replayed/replay", params={"format": "frames"})
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert len(frames) == game.ticks + 1
+    assert frames[-1]["snake"] == game.to_state()["snake"]
+    assert frames[-1]["score"] == game.score
+
+    assert (await client.get("/api/games/missing/replay")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_replay_of_a_live_game(client):
+    game = game_engine.add(SnakeGame.new("live", "u1", GameMode.PASS_THROUGH, seed=3))
+    try:
+        game.pending = UP
+        for _ in range(5):
+            game.step()
+        response = await client.get("/api/games/live/replay")
+        assert replay.decode(response.content).inputs == [(1, UP)]
+    finally:
+        game_engine.remove("live")
@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app import crud
+from app.models import PersonalBest
+from app.rollups import RollupJob, period_start
+from app.schemas import LeaderboardEntry, GameMode
+from tests_integration.conftest import TestingSessionLocal, entry_id
+
+
+async def submit(session, id, username, score, date, mode=GameMode.WALLS):
+    await crud.add_score(session, LeaderboardEntry(
+        id=entry_id(id), username=username, score=score, gameMode=mode, date=date))
+
+
+def test_period_start():
+    thursday = datetime(2026, 10, 15, 18, 30, tzinfo=timezone.utc)
+    assert period_start("day", thursday) == datetime(2026, 10, 15)
+    assert period_start("week", thursday) == datetime(2026, 10, 12)
+
+
+@pytest.mark.asyncio
+async def test_personal_best_only_moves_up(session):
+    now = datetime.now(timezone.utc)
+    await submit(session, "a", "u1", 50, now)
+    await submit(session, "b", "u1", 30, now)
+    await submit(session, "c", "u1", 80, now)
+    await submit(session, "d", "u1", 10, now, mode=GameMode.PASS_THROUGH)
+
+    walls = await session.get(PersonalBest, ("u1", "walls"), populate_existing=True)
+    assert (walls.score, walls.entry_id) == (80, entry_id("c"))
+    bests = await crud.get_personal_bests(session)
+    assert [(e.gameMode.value, e.score) for e in bests] == [("walls", 80), ("pass-through", 10)]
+
+
+@pytest.mark.asyncio
+async def test_rollups_refresh_incrementally(session):
+    now = datetime.now(timezone.utc)
+    await submit(session, "old", "u1", 500, now - timedelta(days=30))
+    await submit(session, "a", "u1", 40, now)
+    await submit(session, "b", "u2", 60, now)
+
+    job = RollupJob(session_factory=TestingSessionLocal)
+    assert await job.run_once() == 3
+    # Only rows near the watermark are read again
+    await submit(session, "c", "u1", 90, now + timedelta(seconds=1))
+    assert await job.run_once() <= 3
+
+    today = await crud.get_rollup(session, "day", period_start("day", now))
+    assert [(e.username, e.score, e.rank) for e in today] == [("u1", 90, 1), ("u2", 60, 2)]
+    week = await crud.get_rollup(session, "week", period_start("week", now), game_mode="walls")
+    assert [e.id for e in week] == [entry_id("c"), entry_id("b")]
+
+
+@pytest.mark.asyncio
+async def test_period_and_distinct_endpoints(client, session):
+    now = datetime.now(timezone.utc)
+    for i, score in enumerate([10, 70, 30]):
+        await submit(session, f"e{i}", "u1", score, now)
+    await submit(session, "x", "u2", 50, now)
+    await RollupJob(session_factory=TestingSessionLocal).run_once()
+
+    raw = await client.get("/api/leaderboard", params={"gameMode": "walls"})
+    assert len(raw.json()) == 4
+
+    for params in ({"distinct": "true"}, {"period": "day"}, {"period": "week"}):
+        response = await client.get("/api/leaderboard", params={"gameMode": "walls", **params})
+        assert response.status_code == 200, response.text
+        assert [(e["username"], e["score"]) for e in response.json()] == [("u1", 70), ("u2", 50)]
+
+    response = await client.get("/api/leaderboard", params={"period": "day", "username": "u1"})
+    assert response.status_code == 400
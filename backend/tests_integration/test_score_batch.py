@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import select
+
+import app.api.leaderboard as leaderboard_api
+from app.models import LeaderboardEntry, PersonalBest
+from app.schemas import GameMode
+from app.settings import SCORE_BATCH_LIMIT
+from tests_integration.conftest import issue, play, signup, submission
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_single_submits(client, session):
+    headers = await signup(client)
+    await client.post("/api/leaderboard/score", json={"score": 50, "gameMode": "walls"}, headers=headers)
+
+    scores = [{"score": 70, "gameMode": "walls"}, {"score": 30, "gameMode": "pass-through"},
+              {"score": 90, "gameMode": "walls"}, {"score": 60, "gameMode": "walls"}]
+    response = await client.post("/api/leaderboard/scores:batch", json={"scores": scores}, headers=headers)
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status"] for r in results] == ["accepted"] * 4
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    # Global rank within the game mode, as if submitted one by one in order
+    assert [r["entry"]["rank"] for r in results] == [1, 1, 1, 3]
+    assert all(r["entry"]["username"] == "v" for r in results)
+
+    board = (await client.get("/api/leaderboard")).json()
+    assert [e["score"] for e in board] == [90, 70, 60, 50, 30]
+    assert board[0]["id"] == results[2]["entry"]["id"]
+    bests = {(b.game_mode, b.score, b.entry_id) for b in await session.scalars(select(PersonalBest))}
+    assert bests == {("walls", 90, results[2]["entry"]["id"]), ("pass-through", 30, results[1]["entry"]["id"])}
+
+
+@pytest.mark.asyncio
+async def test_bad_items_are_rejected_alone(client, session):
+    headers = await signup(client)
+    scores = [{"score": 10, "gameMode": "walls"}, {"score": "lots", "gameMode": "walls"},
+              {"score": 5, "gameMode": "chess"}, "nope", {"score": 10, "gameMode": "walls", "inputLog": [[1, "UP"]]}]
+    results = (await client.post("/api/leaderboard/scores:batch", json={"scores": scores}, headers=headers)).json()
+    assert [r["status"] for r in results] == ["accepted", "rejected", "rejected", "rejected", "rejected"]
+    assert results[1]["reason"].startswith("score:")
+    assert results[2]["reason"].startswith("gameMode:")
+    assert "nonce and inputLog" in results[4]["reason"]
+    assert len((await session.scalars(select(LeaderboardEntry))).all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_limits(client):
+    headers = await signup(client)
+    too_many = [{"score": 1, "gameMode": "walls"}] * (SCORE_BATCH_LIMIT + 1)
+    assert (await client.post("/api/leaderboard/scores:batch", json={"scores": too_many},
+                              headers=headers)).status_code == 422
+    assert (await client.post("/api/leaderboard/scores:batch", json={"scores": []},
+                              headers=headers)).status_code == 422
+    assert (await client.post("/api/leaderboard/scores:batch", json={"scores": [{"score": 1, "gameMode": "walls"}]})
+            ).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_scores_with_logs_are_queued(client, verifier, monkeypatch):
+    headers = await signup(client)
+    game = play(GameMode.PASS_THROUGH, 4)
+    scores = [submission(game, await issue(client, headers, monkeypatch, 4), game.score), {"score": 5, "gameMode": "walls"}]
+    results = (await client.post("/api/leaderboard/scores:batch", json={"scores": scores}, headers=headers)).json()
+    assert [r["status"] for r in results] == ["pending", "accepted"]
+    await verifier.drain()
+    verified = (await client.get(f"/api/leaderboard/score/{results[0]['verification']['id']}", headers=headers)).json()
+    assert verified["status"] == "verified"
+
+    # Sent again, the spent nonce is refused like a resubmitted log
+    results = (await client.post("/api/leaderboard/scores:batch", json={"scores": scores[:1]}, headers=headers)).json()
+    assert results[0]["status"] == "rejected" and "already submitted" in results[0]["reason"]
+
+    monkeypatch.setattr(verifier, "queue_limit", 0)
+    monkeypatch.setattr(leaderboard_api, "REQUIRE_VERIFIED_SCORES", True)
+    results = (await client.post("/api/leaderboard/scores:batch", json={"scores": scores}, headers=headers)).json()
+    assert [r["status"] for r in results] == ["rejected", "rejected"]
+    assert "queue full" in results[0]["reason"] and "inputLog" in results[1]["reason"]
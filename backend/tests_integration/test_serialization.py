@@ -0,0 +1,119 @@
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+import orjson
+import pytest
+import yaml
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+import app.crud as crud
+from app.broadcast import game_state
+from app.engine import SnakeGame, game_engine
+from app.models import ActiveGame
+from app.schemas import ActiveGame as ActiveGameSchema, GameMode, LeaderboardEntry as LeaderboardEntrySchema
+from app.serialization import active_game, active_games, dumps
+from tests_integration.conftest import entry_id
+
+SPEC = yaml.safe_load((Path(__file__).resolve().parents[2] / "openapi.yaml").read_text())
+TYPES = {"object": dict, "array": list, "string": str, "integer": int, "number": (int, float), "boolean": bool}
+
+
+def check(instance, schema, path="$"):
+    """Just enough of OpenAPI 3.0 schema validation for this spec."""
+    if "$ref" in schema:
+        schema = SPEC["components"]["schemas"][schema["$ref"].rsplit("/", 1)[1]]
+    if instance is None:
+        assert schema.get("nullable"), f"{path} is null"
+        return
+    if "type" in schema:
+        kind = schema["type"]
+        ok = isinstance(instance, TYPES[kind]) and (kind == "boolean" or not isinstance(instance, bool))
+        assert ok, f"{path}: {instance!r} is not {kind}"
+    if "enum" in schema:
+        assert instance in schema["enum"], f"{path}: {instance!r} not in {schema['enum']}"
+    if schema.get("format") == "date-time":
+        datetime.fromisoformat(instance.replace("Z", "+00:00"))
+    for name in schema.get("required", []):
+        assert name in instance, f"{path}.{name} missing"
+    for name, sub in schema.get("properties", {}).items():
+        if name in instance:
+            check(instance[name], sub, f"{path}.{name}")
+    if "items" in schema:
+        for i, item in enumerate(instance):
+            check(item, schema["items"], f"{path}[{i}]")
+
+
+def response_schema(path: str, status: str = "200") -> dict:
+    return SPEC["paths"][path]["get"]["responses"][status]["content"]["application/json"]["schema"]
+
+
+def game_row(id: str, length: int, score: int = 0) -> ActiveGame:
+    return ActiveGame(id=id, username="u1", score=score, game_mode="pass-through",
+                      snake=[{"x": i % 20, "y": i // 20} for i in range(length)], food={"x": 1, "y": 19},
+                      direction="LEFT", started_at=datetime(2026, 10, 18, 12, 0, 0, 123456), status="playing")
+
+
+@pytest.fixture
+async def seeded(session):
+    session.add_all([game_row("a", 300, 40), game_row("b", 3)])
+    base = datetime(2026, 10, 18, tzinfo=timezone.utc)
+    for i, score in enumerate([30, 90, 30, 10]):
+        await crud.add_score(session, LeaderboardEntrySchema(
+            id=entry_id(f"e{i}"), username=f"u{i % 2}", score=score, gameMode=GameMode.WALLS,
+            date=base + timedelta(minutes=i, microseconds=i * 7)))
+    await session.commit()
+    return session
+
+
+@pytest.mark.asyncio
+async def test_hot_endpoints_match_openapi(client, seeded):
+    for url, path in [("/api/leaderboard", "/leaderboard"), ("/api/games/active", "/games/active"),
+                      ("/api/games/a", "/games/{id}"), ("/api/games/active/summary", "/games/active/summary")]:
+        response = await client.get(url)
+        assert response.status_code == 200 and response.headers["content-type"] == "application/json"
+        check(response.json(), response_schema(path), url)
+
+    board = (await client.get("/api/leaderboard")).json()
+    ids = [entry_id(f"e{i}") for i in range(4)]
+    assert [(e["id"], e["rank"]) for e in board] == [(ids[1], 1), (ids[0], 2), (ids[2], 3), (ids[3], 4)]
+    around = (await client.get("/api/leaderboard", params={"username": "u0", "limit": 2})).json()
+    assert [(e["id"], e["rank"]) for e in around] == [(ids[1], 1), (ids[0], 2), (ids[2], 3)]
+
+
+@pytest.mark.asyncio
+async def test_bytes_match_the_schema_path(client, seeded):
+    # The old path: ORM entities through the Pydantic schemas
+    entities = (await seeded.scalars(select(ActiveGame).order_by(ActiveGame.id))).all()
+    old = TypeAdapter(List[ActiveGameSchema]).dump_json(
+        [ActiveGameSchema.model_validate(e) for e in entities], by_alias=True)
+    rows = sorted(await crud.list_active_games(seeded), key=lambda r: r.id)
+    assert orjson.loads(active_games(rows)) == json.loads(old)
+    served = (await client.get("/api/games/active")).json()
+    assert sorted(served, key=lambda g: g["id"]) == json.loads(old)
+
+    entries = await crud.get_leaderboard(seeded, limit=10)
+    old = TypeAdapter(List[LeaderboardEntrySchema]).dump_json(
+        [LeaderboardEntrySchema.model_validate(e) for e in entries], by_alias=True)
+    assert (await client.get("/api/leaderboard")).content == old
+
+
+def test_game_state_matches_the_schema_path():
+    game = SnakeGame.new("g1", "u1", GameMode.WALLS, seed=5)
+    for state in (game.to_state(), game_row("r", 20)):
+        expected = ActiveGameSchema.model_validate(state).model_dump(mode="json", by_alias=True)
+        assert game_state(state) == expected
+        assert orjson.loads(dumps(active_game(state))) == expected
+
+
+@pytest.mark.asyncio
+async def test_live_game_state_endpoint(client):
+    game = game_engine.add(SnakeGame.new("live", "u1", GameMode.WALLS, seed=5))
+    try:
+        response = await client.get("/api/games/live")
+        check(response.json(), response_schema("/games/{id}"))
+        assert response.json() == game_state(game.to_state())
+    finally:
+        game_engine.remove("live")
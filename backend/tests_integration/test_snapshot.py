@@ -0,0 +1,221 @@
+import fcntl
+import os
+import random
+from datetime import datetime
+
+import pytest
+
+from app.engine import DIRECTIONS, SnakeGame
+from app.schemas import GameMode, GameStatus
+from app.snapshot import HEADER_SIZE, GameSnapshot
+
+
+def playing(n: int, ticks: int = 20):
+    games = []
+    for i in range(n):
+        game = SnakeGame.new(f"g{i}", f"u{i}", GameMode.PASS_THROUGH, seed=i)
+        for _ in range(ticks):
+            game.step()
+        games.append(game)
+    return games
+
+
+def same(a: SnakeGame, b: SnakeGame) -> bool:
+    return (a.to_state() == b.to_state() and (a.rng, a.seed, a.ticks, a.pending) == (b.rng, b.seed, b.ticks, b.pending)
+            and a.occupied == b.occupied)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "live.snap")
+
+
+def reopen(path: str, **kwargs):
+    snapshot = GameSnapshot(path, **kwargs)
+    return snapshot, snapshot.open()
+
+
+def test_round_trip(path):
+    snapshot, loaded = reopen(path)
+    assert loaded == []
+    games = playing(3)
+    snapshot.track(games)
+    snapshot.close()
+
+    snapshot, loaded = reopen(path)
+    assert sorted(g.id for g in loaded) == ["g0", "g1", "g2"]
+    by_id = {g.id: g for g in loaded}
+    for game in games:
+        assert same(by_id[game.id], game)
+        assert by_id[game.id].started_at == game.started_at
+    assert snapshot.stats()["loaded"] == 3
+    snapshot.close()
+
+
+def test_restored_game_plays_on_identically(path):
+    snapshot, _ = reopen(path)
+    [game] = playing(1, ticks=5)
+    snapshot.track([game])
+    snapshot.close()
+    _, [restored] = reopen(path)
+
+    rng = random.Random(7)
+    for _ in range(200):
+        direction = rng.choice(DIRECTIONS)
+        game.set_direction(direction)
+        restored.set_direction(direction)
+        game.step()
+        restored.step()
+        assert same(restored, game)
+        if game.status is GameStatus.GAME_OVER:
+            break
+
+
+def test_torn_write_falls_back_to_the_previous_copy(path):
+    snapshot, _ = reopen(path)
+    [game] = playing(1)
+    snapshot.track([game])
+    before = game.to_state()
+    game.step()
+    snapshot.track([game])
+    snapshot.close()
+
+    # Corrupt the copy written last (generation 2 lives in copy 0)
+    with open(path, "r+b") as f:
+        f.seek(HEADER_SIZE + 40)
+        f.write(b"\xff\xff")
+    snapshot, [restored] = reopen(path)
+    assert restored.to_state() == before
+    assert snapshot.torn == 1
+
+    # The next write goes over the torn copy, not the good one
+    restored.step()
+    snapshot.track([restored])
+    snapshot.close()
+    _, [again] = reopen(path)
+    assert same(again, restored)
+
+
+def test_discarded_slots_are_reused_and_the_file_grows(path):
+    snapshot, _ = reopen(path, slots=2)
+    games = playing(3, ticks=1)
+    snapshot.track(games)
+    assert snapshot.slots == 4
+    snapshot.discard("g1")
+    snapshot.track([SnakeGame.new("g3", "u3", GameMode.WALLS, seed=3)])
+    assert snapshot.stats()["games"] == 3
+    snapshot.close()
+
+    snapshot, loaded = reopen(path, slots=2)
+    assert sorted(g.id for g in loaded) == ["g0", "g2", "g3"]
+    assert snapshot.slots == 4
+    snapshot.close()
+
+
+def test_unusable_files_are_started_over(path):
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot" * 10)
+    snapshot, loaded = reopen(path)
+    assert loaded == [] and snapshot.enabled
+    snapshot.close()
+
+    snapshot, _ = reopen(path)
+    snapshot.track(playing(1))
+    snapshot.close()
+    _, loaded = reopen(path, width=30, height=30)
+    assert loaded == []
+
+
+def test_each_worker_gets_its_own_file(path):
+    first, _ = reopen(path)
+    second, _ = reopen(path)
+    assert (first.path, second.path) == (path, path + ".1")
+    first.track(playing(1))
+    second.close()
+    first.close()
+
+
+def test_a_lone_worker_adopts_files_of_workers_that_are_gone(path):
+    first, _ = reopen(path)
+    second, _ = reopen(path)
+    games = playing(4)
+    first.track(games[:2])
+    second.track(games[2:])
+    first.close()
+    second.close()
+
+    # One worker after the restart: its own file plus path.1
+    snapshot, loaded = reopen(path)
+    assert sorted(g.id for g in loaded) == ["g0", "g1", "g2", "g3"]
+    assert same(next(g for g in loaded if g.id == "g3"), games[3])
+    assert snapshot.adopted == 2 and not os.path.exists(path + ".1")
+    snapshot.close()
+    # The adopted games now live in the worker's own file
+    snapshot, loaded = reopen(path)
+    assert sorted(g.id for g in loaded) == ["g0", "g1", "g2", "g3"]
+    snapshot.close()
+
+
+def test_files_of_live_workers_are_left_alone(path):
+    first, _ = reopen(path)
+    second, _ = reopen(path)
+    second.track(playing(1))
+    first.close()
+    again, loaded = reopen(path)
+    assert loaded == [] and again.adopted == 0
+    again.close()
+    second.close()
+
+
+def test_a_file_adopted_while_being_claimed_is_not_used(path, monkeypatch):
+    zero, _ = reopen(path)
+    gone, _ = reopen(path)
+    gone.track(playing(2)[1:])
+    gone.close()
+
+    # A restarted worker has path.1 open but not yet locked when worker 0
+    # (also just starting) adopts and unlinks it
+    real_flock, adopting = fcntl.flock, [path + ".1"]
+    def flock(f, op):
+        if f.name in adopting:
+            zero.track(zero._adopt(adopting.pop()))
+        return real_flock(f, op)
+    monkeypatch.setattr(fcntl, "flock", flock)
+    restarted, loaded = reopen(path)
+    assert loaded == [] and restarted.path == path + ".1"
+    assert os.path.exists(path + ".1")
+    restarted.close()
+    zero.close()
+    _, loaded = reopen(path)
+    assert [g.id for g in loaded] == ["g1"]
+
+
+def test_adopting_a_missing_file_finds_nothing(path):
+    snapshot, _ = reopen(path)
+    assert snapshot._adopt(path + ".7") == []
+    snapshot.close()
+
+
+def test_games_that_do_not_fit_are_skipped(path):
+    snapshot, _ = reopen(path)
+    game = SnakeGame.new("g" * 80, "u1", GameMode.WALLS)
+    snapshot.track([game])
+    assert snapshot.skipped == 1 and snapshot.stats()["games"] == 0
+    snapshot.close()
+
+
+def test_naive_start_times_are_utc(path):
+    snapshot, _ = reopen(path)
+    game = SnakeGame("g1", "u1", GameMode.WALLS, started_at=datetime(2026, 10, 18, 12, 0))
+    game._push_tail(0)
+    snapshot.track([game])
+    snapshot.close()
+    _, [restored] = reopen(path)
+    assert restored.started_at.replace(tzinfo=None) == datetime(2026, 10, 18, 12, 0)
+
+
+def test_disabled_without_a_path():
+    snapshot = GameSnapshot("")
+    assert snapshot.open() == [] and not snapshot.enabled
+    snapshot.track(playing(1))
+    assert snapshot.writes == 0
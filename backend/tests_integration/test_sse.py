@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app.sse import event_stream
+
+
+class FakeRequest:
+    def __init__(self):
+        self.gone = False
+
+    async def is_disconnected(self) -> bool:
+        return self.gone
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_keepalives_until_the_end():
+    queue = asyncio.Queue()
+    closed = []
+    response = event_stream(FakeRequest(), queue.get, lambda: closed.append(True), keepalive=0.01)
+    assert response.media_type == "text/event-stream"
+
+    events = response.body_iterator
+    assert await events.__anext__() == ": keepalive\n\n"
+    queue.put_nowait("data: 1\n\n")
+    assert await events.__anext__() == "data: 1\n\n"
+    queue.put_nowait(None)
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert closed == [True]
+
+
+@pytest.mark.asyncio
+async def test_stream_stops_when_the_client_leaves():
+    request = FakeRequest()
+    queue = asyncio.Queue()
+    closed = []
+    events = event_stream(request, queue.get, lambda: closed.append(True), keepalive=0.01).body_iterator
+    queue.put_nowait("data: 1\n\n")
+    assert await events.__anext__() == "data: 1\n\n"
+    request.gone = True
+    queue.put_nowait("data: 2\n\n")
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert closed == [True] and queue.qsize() == 1
@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+
+from app.schemas import User
+from app.user_cache import UserCache, user_cache
+
+
+def make_user(username):
+    return User(id=username, username=username, email=f"{username}@example.com",
+                createdAt=datetime.now(timezone.utc))
+
+
+async def signup(client, username="cached"):
+    response = await client.post(
+        "/api/auth/signup",
+        json={"email": f"{username}@example.com", "password": "password123", "username": username},
+    )
+    assert response.status_code == 201, response.text
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_hit_the_cache(client):
+    headers = await signup(client)
+    user_cache.hits = user_cache.misses = 0
+
+    for _ in range(3):
+        response = await client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["username"] == "cached"
+
+    assert (user_cache.misses, user_cache.hits) == (1, 2)
+    stats = (await client.get("/stats/auth")).json()
+    assert stats["hitRate"] == pytest.approx(2 / 3, abs=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_logout_trusts_claims_only(client):
+    headers = await signup(client)
+    user_cache.hits = user_cache.misses = 0
+    response = await client.post("/api/auth/logout", headers=headers)
+    assert response.status_code == 200
+    assert user_cache.hits + user_cache.misses == 0
+
+    response = await client.post("/api/auth/logout", headers={"Authorization": "Bearer nope"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = UserCache()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return make_user("u1")
+
+    users = await asyncio.gather(*(cache.get_or_load("u1", load) for _ in range(20)))
+    assert calls == 1
+    assert all(u.username == "u1" for u in users)
+    assert cache.get("u1") is not None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_overwritten():
+    cache = UserCache()
+    started = asyncio.Event()
+
+    async def load():
+        started.set()
+        await asyncio.sleep(0.01)
+        return make_user("u1")
+
+    task = asyncio.create_task(cache.get_or_load("u1", load))
+    await started.wait()
+    cache.invalidate("u1")
+    assert (await task).username == "u1"
+    assert cache.get("u1") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_load_reaches_every_waiter():
+    cache = UserCache()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(*(cache.get_or_load("u1", load) for _ in range(3)),
+                                   return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_load_leaves_waiters_to_retry():
+    cache = UserCache()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return make_user("a")
+
+    first = asyncio.create_task(cache.get_or_load("a", load))
+    waiters = [asyncio.create_task(cache.get_or_load("a", load)) for _ in range(2)]
+    await asyncio.sleep(0)
+    first.cancel()
+    results = await asyncio.gather(first, *waiters, return_exceptions=True)
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert [u.username for u in results[1:]] == ["a", "a"]
+    # One of the waiters took over the load
+    assert calls == 2 and cache.get("a") is not None
+
+
+def test_lru_eviction_and_ttl():
+    cache = UserCache(max_size=2)
+    cache.put("a", make_user("a"))
+    cache.put("b", make_user("b"))
+    cache.get("a")
+    cache.put("c", make_user("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.evictions == 1
+
+    expired = UserCache(ttl=-1)
+    expired.put("a", make_user("a"))
+    assert expired.get("a") is None
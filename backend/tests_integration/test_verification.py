@@ -0,0 +1,152 @@
+import pytest
+
+import app.crud as crud
+from app.engine import UP, LEFT
+from app.replay import InvalidLog, play_out
+from app.schemas import GameMode
+from app.verification import check
+from tests_integration.conftest import TestingSessionLocal, issue, play, signup, submission
+
+
+@pytest.mark.parametrize("mode", [GameMode.WALLS, GameMode.PASS_THROUGH])
+def test_play_out_matches_the_engine(mode):
+    for seed in range(50):
+        game = play(mode, seed)
+        assert play_out(mode, seed, game.inputs) == (game.score, game.ticks)
+
+
+@pytest.mark.parametrize("inputs", [
+    [(1, LEFT)],                 # reverses into the body
+    [(3, UP), (3, LEFT)],        # ticks must increase
+    [(0, UP)],                   # before the first tick
+    [(2, UP), (500, LEFT)],      # after the snake hit the wall
+])
+def test_play_out_rejects_impossible_logs(inputs):
+    with pytest.raises(InvalidLog):
+        play_out(GameMode.WALLS, 1, inputs)
+
+
+def test_play_out_gives_up_on_endless_games():
+    # Heading straight on a wrapping board, the snake takes a long time to meet itself
+    with pytest.raises(InvalidLog, match="still alive"):
+        play_out(GameMode.PASS_THROUGH, 1, [], max_ticks=50)
+
+
+def test_check_compares_the_claimed_score():
+    game = play(GameMode.PASS_THROUGH, 4)
+    assert check("pass-through", 4, game.inputs, game.score) == (game.ticks, None)
+    ticks, reason = check("pass-through", 4, game.inputs, game.score + 10)
+    assert ticks == game.ticks and "not" in reason
+
+
+@pytest.mark.asyncio
+async def test_verified_scores_reach_the_leaderboard(client, verifier, monkeypatch):
+    headers = await signup(client)
+    game, other = play(GameMode.PASS_THROUGH, 4), play(GameMode.PASS_THROUGH, 5)
+    assert game.score > 0
+
+    honest = await client.post("/api/leaderboard/score", headers=headers,
+                               json=submission(game, await issue(client, headers, monkeypatch, 4), game.score))
+    cheat = await client.post("/api/leaderboard/score", headers=headers,
+                              json=submission(other, await issue(client, headers, monkeypatch, 5), other.score + 500))
+    assert honest.status_code == cheat.status_code == 202
+    assert honest.json()["status"] == "pending"
+    await verifier.drain()
+
+    honest = (await client.get(f"/api/leaderboard/score/{honest.json()['id']}", headers=headers)).json()
+    cheat = (await client.get(f"/api/leaderboard/score/{cheat.json()['id']}", headers=headers)).json()
+    assert honest["status"] == "verified" and honest["entryId"]
+    assert cheat["status"] == "rejected" and cheat["entryId"] is None and cheat["reason"]
+
+    board = (await client.get("/api/leaderboard")).json()
+    assert [(e["id"], e["score"]) for e in board] == [(honest["entryId"], game.score)]
+    assert verifier.stats()["verified"] == 1 and verifier.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_submission_needs_nonce_with_log(client, verifier):
+    headers = await signup(client)
+    for body in ({"score": 10, "gameMode": "walls", "inputLog": [[1, "UP"]]},
+                 {"score": 10, "gameMode": "walls", "seed": 4, "inputLog": [[1, "UP"]]}):
+        response = await client.post("/api/leaderboard/score", json=body, headers=headers)
+        assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_resubmitted_logs_are_refused(client, verifier, monkeypatch):
+    headers = await signup(client)
+    game = play(GameMode.PASS_THROUGH, 4)
+    nonce = await issue(client, headers, monkeypatch, 4)
+    first = await client.post("/api/leaderboard/score", json=submission(game, nonce, game.score), headers=headers)
+    assert first.status_code == 202
+
+    # The same nonce again, then the same seed and log under a fresh nonce
+    again = await client.post("/api/leaderboard/score", json=submission(game, nonce, game.score), headers=headers)
+    fresh = await issue(client, headers, monkeypatch, 4)
+    replayed = await client.post("/api/leaderboard/score", json=submission(game, fresh, game.score), headers=headers)
+    assert again.status_code == replayed.status_code == 409
+    await verifier.drain()
+    assert len((await client.get("/api/leaderboard")).json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_nonces_belong_to_their_player(client, verifier, monkeypatch):
+    headers = await signup(client)
+    game = play(GameMode.WALLS, 1)
+    nonce = await issue(client, headers, monkeypatch, 1)
+    response = await client.post("/api/auth/signup",
+                                 json={"email": "w@e.com", "password": "p", "username": "w"})
+    other = {"Authorization": f"Bearer {response.json()['token']}"}
+    stolen = await client.post("/api/leaderboard/score", json=submission(game, nonce, game.score), headers=other)
+    assert stolen.status_code == 400
+
+    # A seed that is not the nonce's, and a nonce that is not one
+    body = dict(submission(game, nonce, game.score), seed=2)
+    assert (await client.post("/api/leaderboard/score", json=body, headers=headers)).status_code == 400
+    body = submission(game, headers["Authorization"].split()[1], game.score)
+    assert (await client.post("/api/leaderboard/score", json=body, headers=headers)).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_full_verification_queue_returns_503(client, verifier, monkeypatch):
+    headers = await signup(client)
+    monkeypatch.setattr(verifier, "queue_limit", 0)
+    game = play(GameMode.WALLS, 1)
+    nonce = await issue(client, headers, monkeypatch, 1)
+    response = await client.post("/api/leaderboard/score", json=submission(game, nonce, game.score), headers=headers)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_sweeps_queue_rows_left_pending(client, verifier, monkeypatch):
+    headers = await signup(client)
+    # Accepted while nothing was verifying them (a full queue, a restart)
+    monkeypatch.setattr(verifier, "submit", lambda row: None)
+    ids = []
+    for seed in (1, 2, 3):
+        game = play(GameMode.PASS_THROUGH, seed)
+        nonce = await issue(client, headers, monkeypatch, seed)
+        response = await client.post("/api/leaderboard/score", json=submission(game, nonce, game.score),
+                                     headers=headers)
+        ids.append(response.json()["id"])
+    del verifier.submit
+
+    # One slot: each sweep takes the oldest row not already in flight
+    verifier.queue_limit = 1
+    assert await verifier.sweep(min_age=0) == 1
+    assert await verifier.sweep(min_age=0) == 0
+    await verifier.drain()
+    assert await verifier.sweep(min_age=0) == 1
+    await verifier.drain()
+    assert await verifier.sweep(min_age=0) == 1
+    await verifier.drain()
+    assert await verifier.sweep(min_age=0) == 0
+    for id in ids:
+        assert (await client.get(f"/api/leaderboard/score/{id}", headers=headers)).json()["status"] == "verified"
+    assert verifier.stats()["requeued"] == 3
+
+    # A second worker finishing the same row changes nothing
+    async with TestingSessionLocal() as db:
+        assert not await crud.finish_verification(db, ids[0], 1, "late")
+    assert len((await client.get("/api/leaderboard")).json()) == 3
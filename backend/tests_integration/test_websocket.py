@@ -0,0 +1,124 @@
+import json
+import time
+from datetime import timedelta
+
+import msgpack
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import app.api.spectate as spectate
+import app.wire as wire
+from app.api.auth import create_access_token
+from app.broadcast import hub, game_state
+from app.delta import apply_delta, FrameEncoder
+from app.engine import game_engine, SnakeGame, DOWN
+from app.main import app
+from app.schemas import ActiveGame, GameMode
+
+
+@pytest.fixture
+def live_game(monkeypatch):
+    monkeypatch.setattr(hub, "poll_interval", 0.01)
+    game = game_engine.add(SnakeGame.new("ws-game", "alice", GameMode.WALLS, seed=7))
+    yield game
+    game_engine.remove(game.id)
+
+
+def receive_state(ws, binary=True):
+    message = wire.decode(ws.receive_bytes()) if binary else json.loads(ws.receive_text())
+    while message["type"] == "ping":
+        message = wire.decode(ws.receive_bytes()) if binary else json.loads(ws.receive_text())
+    return message
+
+
+def test_binary_frames_round_trip_to_json():
+    encoder = FrameEncoder()
+    game = SnakeGame.new("g", "bob", GameMode.PASS_THROUGH, seed=3)
+    first = encoder.encode(game_state(game.to_state()))
+    client = wire.decode(wire.keyframe(first))["game"]
+    assert client == first.state
+    for _ in range(30):
+        game.step()
+        frame = encoder.encode(game_state(game.to_state()))
+        if frame.changes is not None:
+            message = wire.decode(wire.delta(frame))
+            assert message == json.loads(frame.delta)
+            client = apply_delta(client, message)
+        else:
+            client = wire.decode(wire.keyframe(frame))["game"]
+        assert client == frame.state
+    # Coordinates cost 4 bytes each instead of ~16 characters of JSON
+    assert len(wire.keyframe(frame)) < len(frame.keyframe)
+
+
+def test_owner_steers_and_spectates_over_binary(live_game):
+    token = create_access_token({"sub": "alice"})
+    with TestClient(app).websocket_connect(f"/api/games/ws-game/ws?token={token}") as ws:
+        keyframe = receive_state(ws)
+        assert keyframe["type"] == "keyframe"
+        ActiveGame.model_validate(keyframe["game"])
+        client = keyframe["game"]
+
+        ws.send_bytes(msgpack.packb({"type": "direction", "direction": "DOWN"}))
+        deadline = time.monotonic() + 2
+        while live_game.pending != DOWN and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert live_game.pending == DOWN
+
+        live_game.step()
+        message = receive_state(ws)
+        assert message["type"] == "delta"
+        client = apply_delta(client, message)
+        assert client == game_state(live_game.to_state())
+
+
+def test_spectators_cannot_steer(live_game):
+    with TestClient(app).websocket_connect("/api/games/ws-game/ws?format=json") as ws:
+        assert receive_state(ws, binary=False)["type"] == "keyframe"
+        ws.send_text(json.dumps({"type": "direction", "direction": "DOWN"}))
+        assert receive_state(ws, binary=False) == {"type": "error", "detail": "Not your game"}
+        ws.send_text("not json")
+        assert receive_state(ws, binary=False)["detail"] == "Malformed message"
+
+
+def test_bad_directions_are_answered_not_fatal(live_game):
+    token = create_access_token({"sub": "alice"})
+    with TestClient(app).websocket_connect(f"/api/games/ws-game/ws?format=json&token={token}") as ws:
+        assert receive_state(ws, binary=False)["type"] == "keyframe"
+        for direction in ([1], {"x": 1}, 3, "SIDEWAYS"):
+            ws.send_text(json.dumps({"type": "direction", "direction": direction}))
+            assert receive_state(ws, binary=False) == {"type": "error", "detail": "Invalid direction"}
+        # The socket is still up and steering
+        ws.send_text(json.dumps({"type": "direction", "direction": "DOWN"}))
+        deadline = time.monotonic() + 2
+        while live_game.pending != DOWN and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert live_game.pending == DOWN
+
+
+def test_heartbeat_pings_idle_sockets(live_game, monkeypatch):
+    monkeypatch.setattr(spectate, "HEARTBEAT_INTERVAL", 0.05)
+    with TestClient(app).websocket_connect("/api/games/ws-game/ws") as ws:
+        assert wire.decode(ws.receive_bytes())["type"] == "keyframe"
+        assert wire.decode(ws.receive_bytes()) == {"type": "ping"}
+        ws.send_bytes(msgpack.packb({"type": "pong"}))
+
+
+def test_unknown_game_is_closed(monkeypatch):
+    async def missing(id):
+        return False
+    monkeypatch.setattr(spectate, "game_exists", missing)
+    with TestClient(app).websocket_connect("/api/games/nope/ws") as ws:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_bytes()
+    assert exc.value.code == spectate.CLOSE_NOT_FOUND
+
+
+def test_invalid_token_is_refused(live_game):
+    expired = create_access_token({"sub": "alice"}, expires_delta=timedelta(minutes=-1))
+    for token in ("garbage", expired):
+        with TestClient(app).websocket_connect(f"/api/games/ws-game/ws?token={token}") as ws:
+            with pytest.raises(WebSocketDisconnect) as exc:
+                ws.receive_bytes()
+        assert exc.value.code == spectate.CLOSE_UNAUTHORIZED